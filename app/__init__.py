@@ -6,6 +6,8 @@ Creates and configures the Flask application
 from flask import Flask
 from flask_cors import CORS
 from config import config
+from app.utils.compression import init_compression
+from app.utils.json_provider import init_json
 import os
 
 def create_app(config_name=None):
@@ -22,21 +24,26 @@ def create_app(config_name=None):
     app = Flask(__name__, template_folder=template_dir)
     app.config.from_object(config[config_name])
     
+    # Fast JSON serialization (orjson) and compressed responses
+    init_json(app)
+    init_compression(app)
+    
     # Enable CORS
     CORS(app, 
          resources={r"/api/*": {"origins": "*"}},
          supports_credentials=False,
          methods=["GET", "POST", "OPTIONS", "PUT", "DELETE"],
          allow_headers=["Content-Type", "Authorization"],
-         expose_headers=["Content-Type"],
+         expose_headers=["Content-Type", "ETag"],
          max_age=3600)
     
     # Register API blueprints
-    from app.routes import health, geocoding, routing, favicon
+    from app.routes import health, geocoding, routing, network, favicon
     
     app.register_blueprint(health.bp)
     app.register_blueprint(geocoding.bp, url_prefix='/api')
     app.register_blueprint(routing.bp, url_prefix='/api')
+    app.register_blueprint(network.bp, url_prefix='/api')
     app.register_blueprint(favicon.bp)
     
     @app.after_request
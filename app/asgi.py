@@ -0,0 +1,154 @@
+"""
+ASGI - Serve the Flask app with async views running on the event loop
+
+Flask runs async views (async def) through asgiref.async_to_sync: each
+request holds a thread while it awaits. Served by AsyncFlaskApp, those
+views are awaited directly on the server's event loop instead, with
+Flask's request context, before/after request hooks (CORS, compression)
+and error handlers, so a worker holds as many upstream calls in flight
+as the shared async HTTP client allows. Every other view runs as WSGI
+in asgiref's thread pool, as it would under a WSGI server.
+
+Start with an ASGI server, e.g. uvicorn asgi:app (see asgi.py). Each
+worker runs the warm-up (warmup_service) at lifespan startup, before
+taking requests; under gunicorn it already ran in the master.
+"""
+import asyncio
+from io import BytesIO
+from typing import Dict
+
+from asgiref.wsgi import WsgiToAsgi
+from werkzeug.exceptions import HTTPException
+
+from app.services.warmup_service import warmup_service
+from app.utils.async_io import close_http_client, open_http_client, run_blocking
+
+
+def wsgi_environ(scope: Dict, body: bytes) -> Dict:
+    """WSGI environ of an ASGI HTTP request"""
+    script_name = scope.get('root_path', '').encode('utf8').decode('latin1')
+    path_info = scope['path'].encode('utf8').decode('latin1')
+    if path_info.startswith(script_name):
+        path_info = path_info[len(script_name):]
+
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': script_name,
+        'PATH_INFO': path_info,
+        'QUERY_STRING': scope['query_string'].decode('ascii'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': BytesIO(body),
+        'wsgi.input_terminated': True,    # whole body read, with or without Content-Length
+        'wsgi.errors': BytesIO(),
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin1')
+        if name == 'content-length':
+            key = 'CONTENT_LENGTH'
+        elif name == 'content-type':
+            key = 'CONTENT_TYPE'
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        value = value.decode('latin1')
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+class AsyncFlaskApp:
+    """ASGI application: async Flask views on the event loop, the others as WSGI"""
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.wsgi = WsgiToAsgi(flask_app)
+        self.urls = flask_app.url_map.bind('localhost')
+
+    def async_view(self, scope: Dict):
+        """The async view function a request is routed to, or None"""
+        if scope['type'] != 'http' or scope['method'] == 'OPTIONS':
+            return None
+        try:
+            endpoint, _ = self.urls.match(scope['path'], method=scope['method'])
+        except HTTPException:  # 404, 405, redirects: Flask answers
+            return None
+        view = self.flask_app.view_functions.get(endpoint)
+        return view if asyncio.iscoroutinefunction(view) else None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+
+        view = self.async_view(scope)
+        if view is None:
+            return await self.wsgi(scope, receive, send)
+
+        body = bytearray()
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+
+        response = await self.dispatch(view, wsgi_environ(scope, bytes(body)))
+
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': [
+                (name.lower().encode('latin1'), value.encode('latin1'))
+                for name, value in response.headers.to_wsgi_list()
+            ]
+        })
+        await send({'type': 'http.response.body', 'body': response.get_data()})
+
+    async def dispatch(self, view, environ: Dict):
+        """Flask's full_dispatch_request(), awaiting the view"""
+        app = self.flask_app
+        with app.request_context(environ) as context:
+            try:
+                result = app.preprocess_request()
+                if result is None:
+                    result = await view(**context.request.view_args)
+            except Exception as e:
+                try:
+                    result = app.handle_user_exception(e)
+                except Exception as unhandled:
+                    result = app.handle_exception(unhandled)
+            return app.finalize_request(result)
+
+    async def lifespan(self, receive, send):
+        """Warm-up and shared async HTTP client at startup, client closed at shutdown"""
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await run_blocking(warmup_service.run)
+                except Exception as e:
+                    # Served anyway: /ready reports the failure
+                    print(f"Warm-up failed: {e}")
+                await open_http_client()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await close_http_client()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+def create_asgi_app(flask_app=None) -> AsyncFlaskApp:
+    """ASGI application serving flask_app (default: create_app())"""
+    if flask_app is None:
+        from app import create_app
+        flask_app = create_app()
+    return AsyncFlaskApp(flask_app)
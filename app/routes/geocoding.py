@@ -1,13 +1,17 @@
 """
 Geocoding API endpoints
 """
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from app.services.geocoding_service import geocoding_service
+from app.services.gazetteer_service import gazetteer_service
+from app.utils.json_provider import json_bytes
 
 bp = Blueprint('geocoding', __name__)
 
+MAX_BATCH_ADDRESSES = 500
+
 @bp.route('/geocode', methods=['POST', 'OPTIONS'])
-def geocode_address():
+async def geocode_address():
     """
     Convert address to coordinates
     
@@ -55,7 +59,7 @@ def geocode_address():
             }), 400
         
         # Geocode the address
-        result = geocoding_service.geocode_address(address)
+        result = await geocoding_service.geocode_address_async(address)
         
         # Check if address was found
         if not result:
@@ -76,7 +80,8 @@ def geocode_address():
             },
             'display_name': result['display_name'],
             'type': result.get('type'),
-            'importance': result.get('importance')
+            'importance': result.get('importance'),
+            'source': result.get('source', 'nominatim')
         }), 200
         
     except Exception as e:
@@ -91,12 +96,17 @@ def geocode_multiple_addresses():
     """
     Geocode multiple addresses at once
     
+    Duplicate addresses (after normalization) are geocoded once. Bus stop
+    names and cached addresses resolve immediately, the others through
+    the rate-limited Nominatim queue.
+    
     Request Body:
     {
         "addresses": [
             "Avenue Habib Bourguiba, Tunis",
             "Carthage, Tunisia"
-        ]
+        ],
+        "stream": false
     }
     
     Response:
@@ -104,6 +114,7 @@ def geocode_multiple_addresses():
         "success": true,
         "results": [
             {
+                "index": 0,
                 "address": "...",
                 "coordinates": {...},
                 "found": true
@@ -111,6 +122,10 @@ def geocode_multiple_addresses():
             ...
         ]
     }
+    
+    With "stream": true (or Accept: application/x-ndjson) the results are
+    streamed as NDJSON, one line per address as soon as it resolves
+    (in any order), followed by a {"summary": {...}} line.
     """
     try:
         data = request.get_json()
@@ -129,34 +144,49 @@ def geocode_multiple_addresses():
                 'error': 'Addresses must be an array'
             }), 400
         
-        if len(addresses) > 10:
+        if len(addresses) > MAX_BATCH_ADDRESSES:
             return jsonify({
                 'success': False,
-                'error': 'Maximum 10 addresses per batch request'
+                'error': f'Maximum {MAX_BATCH_ADDRESSES} addresses per batch request'
             }), 400
         
-        # Geocode all addresses
-        results = []
+        def batch_results():
+            """One result dict per address, as they resolve"""
+            for indexes, result in geocoding_service.geocode_stream(addresses):
+                for index in indexes:
+                    if result:
+                        yield {
+                            'index': index,
+                            'address': addresses[index],
+                            'coordinates': {
+                                'latitude': result['latitude'],
+                                'longitude': result['longitude']
+                            },
+                            'display_name': result['display_name'],
+                            'source': result.get('source', 'nominatim'),
+                            'found': True
+                        }
+                    else:
+                        yield {
+                            'index': index,
+                            'address': addresses[index],
+                            'found': False,
+                            'error': 'Address not found'
+                        }
+        
+        streaming = data.get('stream') or 'application/x-ndjson' in request.headers.get('Accept', '')
         
-        for address in addresses:
-            result = geocoding_service.geocode_address(address)
+        if streaming:
+            def ndjson():
+                found = 0
+                for result in batch_results():
+                    found += result['found']
+                    yield json_bytes(result) + b'\n'
+                yield json_bytes({'summary': {'total': len(addresses), 'found': found}}) + b'\n'
             
-            if result:
-                results.append({
-                    'address': address,
-                    'coordinates': {
-                        'latitude': result['latitude'],
-                        'longitude': result['longitude']
-                    },
-                    'display_name': result['display_name'],
-                    'found': True
-                })
-            else:
-                results.append({
-                    'address': address,
-                    'found': False,
-                    'error': 'Address not found'
-                })
+            return Response(stream_with_context(ndjson()), mimetype='application/x-ndjson')
+        
+        results = sorted(batch_results(), key=lambda r: r['index'])
         
         return jsonify({
             'success': True,
@@ -169,4 +199,59 @@ def geocode_multiple_addresses():
         return jsonify({
             'success': False,
             'error': f'Internal server error: {str(e)}'
-        }), 500
\ No newline at end of file
+        }), 500
+
+
+@bp.route('/autocomplete', methods=['GET', 'OPTIONS'])
+def autocomplete():
+    """
+    Suggest bus stop names while the user types
+    
+    Query Parameters:
+        q: Partial stop name (e.g. "tunis ma")
+        limit: Maximum number of suggestions (1-20, default 10)
+    
+    Response:
+    {
+        "success": true,
+        "query": "tunis ma",
+        "results": [
+            {
+                "name": "TERMINUS TUNIS MARINE BUS",
+                "latitude": 36.8,
+                "longitude": 10.19,
+                "stops": 4,
+                "routes": 12,
+                "lines": ["20B", "..."]
+            }
+        ]
+    }
+    """
+    try:
+        query = request.args.get('q', '')
+        
+        try:
+            limit = int(request.args.get('limit', 10))
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'limit must be an integer'
+            }), 400
+        
+        if limit < 1 or limit > 20:
+            return jsonify({
+                'success': False,
+                'error': 'limit must be between 1 and 20'
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'query': query,
+            'results': gazetteer_service.autocomplete(query, limit)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Internal server error: {str(e)}'
+        }), 500
@@ -2,16 +2,31 @@
 Health check endpoint
 """
 
-from flask import Blueprint, jsonify, render_template
+from flask import Blueprint, current_app, jsonify, render_template
+from app.services.warmup_service import warmup_service
+from app.utils.cache import cache_stats
+from app.utils.compression import PrecompressedPayload
+from app.utils.rate_limiter import limiter_stats
 
 bp = Blueprint('health', __name__)
 
+# index.html rendered and compressed once (unless templates auto-reload)
+_index_page = None
+
 @bp.route('/', methods=['GET'])
 def index():
     """
     Serve the main index.html page
     """
-    return render_template('index.html')
+    global _index_page
+    if current_app.jinja_env.auto_reload:
+        return render_template('index.html')
+    
+    if _index_page is None:
+        _index_page = PrecompressedPayload(
+            render_template('index.html').encode('utf-8'), mimetype='text/html'
+        )
+    return _index_page.response()
 
 @bp.route('/health', methods=['GET'])
 def health_check():
@@ -23,4 +38,25 @@ def health_check():
         'status': 'ok',
         'message': 'TransTu API is running',
         'version': '1.0.0'
+    }), 200
+
+@bp.route('/ready', methods=['GET'])
+def readiness_check():
+    """
+    Readiness endpoint
+    200 once the network is loaded and the warm-up queries ran in this
+    process (or in the gunicorn master it was forked from), 503 before
+    """
+    status = warmup_service.status()
+    return jsonify(status), 200 if status['ready'] else 503
+
+@bp.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Metrics endpoint
+    Returns cache counters and rate limiter queues of this worker
+    """
+    return jsonify({
+        'caches': cache_stats(),
+        'rate_limiters': limiter_stats()
     }), 200
\ No newline at end of file
@@ -0,0 +1,54 @@
+"""
+Network data API endpoints
+"""
+from flask import Blueprint, jsonify
+from app.services.network_service import network_service
+from app.services.tile_service import tile_service
+
+bp = Blueprint('network', __name__)
+
+
+@bp.route('/stops', methods=['GET', 'OPTIONS'])
+def get_stops():
+    """
+    Stop table of the network (ids used by compact route results)
+
+    Clients keep it and revalidate with If-None-Match: the response is
+    a 304 without body while the network version is unchanged. The body
+    is compressed once, not per request.
+    """
+    return network_service.stop_table_payload().response()
+
+
+@bp.route('/network', methods=['GET', 'OPTIONS'])
+def get_network():
+    """
+    Every line of the network: id, bus line, direction, stop id range
+    and geometry (encoded polyline). Revalidate with If-None-Match.
+    """
+    return network_service.network_payload().response()
+
+
+@bp.route('/lines/<route_id>', methods=['GET', 'OPTIONS'])
+def get_line(route_id):
+    """One line with its stops. Revalidate with If-None-Match."""
+    payload = network_service.line_payload(route_id)
+    if payload is None:
+        return jsonify({'success': False, 'error': f'Route not found: {route_id}'}), 404
+    return payload.response()
+
+
+@bp.route('/tiles/<int:z>/<int:x>/<int:y>', methods=['GET', 'OPTIONS'])
+def get_tile(z, x, y):
+    """
+    Lines and stops intersecting a map tile (same z/x/y scheme as the
+    base map). Stops are only included from zoom STOP_MIN_ZOOM on.
+    """
+    payload = tile_service.tile_payload(z, x, y)
+    if payload is None:
+        return jsonify({
+            'success': False,
+            'error': f'Invalid tile: zoom must be between {tile_service.MIN_ZOOM} '
+                     f'and {tile_service.MAX_ZOOM}, x and y between 0 and 2^zoom - 1'
+        }), 400
+    return payload.response()
@@ -1,12 +1,72 @@
 """
 Routing API endpoints
 """
-from flask import Blueprint, request, jsonify
+import time
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from app.services.batch_routing_service import MODES, batch_routing_service
+from app.services.isochrone_service import isochrone_service
+from app.services.matrix_service import matrix_service
 from app.services.routing_service import routing_service
 from app.services.transfer_routing_service import transfer_routing_service
+from app.services.raptor_service import RaptorService
+from app.services.route_cache import route_cache
+from app.services.search_pipeline import search_pipeline, elapsed_ms
+from app.utils.async_io import run_blocking
+from app.utils.data_loader import data_loader
+from app.utils.geometry import format_path
+from app.utils.json_provider import json_bytes
+from app.utils.response_format import FORMATS, format_routes, parse_fields, parse_geometry
 
 bp = Blueprint('routing', __name__)
 
+MAX_TRANSFERS = RaptorService.MAX_TRANSFERS
+MAX_BATCH_PAIRS = 10000
+
+
+def is_integer(value, minimum, maximum=None) -> bool:
+    """value is a JSON integer (not a boolean) between minimum and maximum"""
+    return (isinstance(value, int) and not isinstance(value, bool)
+            and value >= minimum and (maximum is None or value <= maximum))
+
+
+def output_format(data):
+    """
+    Output options requested in the query string or request body:
+    format (full / compact), fields and geometry (geometry, tolerance, zoom)
+
+    Returns:
+        format_routes() keyword arguments
+
+    Raises:
+        ValueError: if an option is invalid
+    """
+    def get(name):
+        return request.args.get(name, data.get(name))
+
+    response_format = get('format') or 'full'
+    if response_format not in FORMATS:
+        raise ValueError(f'format must be one of: {", ".join(FORMATS)}')
+    return {
+        'compact': response_format == 'compact',
+        'fields': parse_fields(get('fields')),
+        'geometry': parse_geometry(get)
+    }
+
+
+def routes_body(routes, output, valid_routes=None):
+    """
+    Routes part of a response body
+
+    The compact format has no valid_routes_only copy (clients filter on
+    'valid') and names the network version its stop ids belong to.
+    """
+    body = {'routes': format_routes(routes, **output)}
+    if output['compact']:
+        body['network_version'] = data_loader.network_version
+    elif valid_routes is not None:
+        body['valid_routes_only'] = format_routes(valid_routes, **output)
+    return body
+
 
 @bp.route('/routes/direct', methods=['POST', 'OPTIONS'])
 def find_direct_routes():
@@ -17,6 +77,11 @@ def find_direct_routes():
         if not data:
             return jsonify({'success': False, 'error': 'Request body is required'}), 400
         
+        try:
+            output = output_format(data)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
         if 'start' not in data or 'end' not in data:
             return jsonify({'success': False, 'error': 'Both "start" and "end" locations are required'}), 400
         
@@ -45,7 +110,46 @@ def find_direct_routes():
         if not (-180 <= start_lon <= 180) or not (-180 <= end_lon <= 180):
             return jsonify({'success': False, 'error': 'Longitude must be between -180 and 180'}), 400
         
-        routes = routing_service.find_direct_routes(start_lat, start_lon, end_lat, end_lon)
+        walking_top_k = data.get('walking_top_k')
+        if walking_top_k is not None and not is_integer(walking_top_k, 0):
+            return jsonify({'success': False, 'error': 'walking_top_k must be a non-negative integer'}), 400
+        
+        if 'max_transfers' in data:
+            # Journey search (segment format) allowing transfers
+            max_transfers = data['max_transfers']
+            max_results = data.get('max_results', 10)
+            
+            if not is_integer(max_transfers, 0, MAX_TRANSFERS):
+                return jsonify({'success': False, 'error': f'max_transfers must be an integer between 0 and {MAX_TRANSFERS}'}), 400
+            
+            if not is_integer(max_results, 1, 20):
+                return jsonify({'success': False, 'error': 'max_results must be an integer between 1 and 20'}), 400
+            
+            routes = route_cache.get_or_compute(
+                'journeys', (start_lat, start_lon, end_lat, end_lon),
+                {'max_results': max_results, 'max_transfers': max_transfers},
+                lambda: transfer_routing_service.find_journeys(
+                    start_lat, start_lon, end_lat, end_lon,
+                    max_results=max_results, max_transfers=max_transfers, min_transfers=0
+                )
+            )
+            
+            return jsonify({
+                'success': True,
+                'start_location': {'latitude': start_lat, 'longitude': start_lon},
+                'end_location': {'latitude': end_lat, 'longitude': end_lon},
+                'max_transfers': max_transfers,
+                'routes_found': len(routes),
+                **routes_body(routes, output)
+            }), 200
+        
+        routes = route_cache.get_or_compute(
+            'direct', (start_lat, start_lon, end_lat, end_lon),
+            {'walking_top_k': walking_top_k},
+            lambda: routing_service.find_direct_routes(
+                start_lat, start_lon, end_lat, end_lon, walking_top_k=walking_top_k
+            )
+        )
         valid_routes = [r for r in routes if r['valid']]
         
         return jsonify({
@@ -53,8 +157,7 @@ def find_direct_routes():
             'start_location': {'latitude': start_lat, 'longitude': start_lon},
             'end_location': {'latitude': end_lat, 'longitude': end_lon},
             'routes_found': len(valid_routes),
-            'routes': routes,
-            'valid_routes_only': valid_routes
+            **routes_body(routes, output, valid_routes)
         }), 200
         
     except Exception as e:
@@ -62,7 +165,7 @@ def find_direct_routes():
 
 
 @bp.route('/routes/search', methods=['POST', 'OPTIONS'])
-def search_routes():
+async def search_routes():
     """Find routes using addresses or coordinates"""
     try:
         data = request.get_json()
@@ -70,10 +173,17 @@ def search_routes():
         if not data:
             return jsonify({'success': False, 'error': 'Request body is required'}), 400
         
+        try:
+            output = output_format(data)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        walking_top_k = data.get('walking_top_k')
+        if walking_top_k is not None and not is_integer(walking_top_k, 0):
+            return jsonify({'success': False, 'error': 'walking_top_k must be a non-negative integer'}), 400
+        
         if 'from' in data and 'to' in data:
             # ADDRESS-BASED SEARCH
-            from app.services.geocoding_service import geocoding_service
-            
             from_address = data['from']
             to_address = data['to']
             
@@ -83,7 +193,14 @@ def search_routes():
             if not to_address or not to_address.strip():
                 return jsonify({'success': False, 'error': 'To address cannot be empty'}), 400
             
-            from_result = geocoding_service.geocode_address(from_address)
+            # Both addresses geocoded concurrently, stops looked up as each resolves
+            started = time.perf_counter()
+            resolved = await search_pipeline.resolve_async(
+                from_address, to_address, routing_service.nearest_stops_by_route
+            )
+            from_result = resolved['from']
+            to_result = resolved['to']
+            
             if not from_result:
                 return jsonify({
                     'success': False,
@@ -91,7 +208,6 @@ def search_routes():
                     'suggestion': 'Try a more specific address or landmark in Greater Tunis'
                 }), 404
             
-            to_result = geocoding_service.geocode_address(to_address)
             if not to_result:
                 return jsonify({
                     'success': False,
@@ -104,8 +220,22 @@ def search_routes():
             end_lat = to_result['latitude']
             end_lon = to_result['longitude']
             
-            routes = routing_service.find_direct_routes(start_lat, start_lon, end_lat, end_lon)
+            routing_started = time.perf_counter()
+            routes = await run_blocking(
+                route_cache.get_or_compute,
+                'direct', (start_lat, start_lon, end_lat, end_lon),
+                {'walking_top_k': walking_top_k},
+                lambda: routing_service.find_direct_routes(
+                    start_lat, start_lon, end_lat, end_lon, walking_top_k=walking_top_k,
+                    near_start=resolved['from_candidates'], near_end=resolved['to_candidates']
+                )
+            )
             valid_routes = [r for r in routes if r['valid']]
+            timings = {
+                **resolved['timings_ms'],
+                'routing': elapsed_ms(routing_started),
+                'total': elapsed_ms(started)
+            }
             
             return jsonify({
                 'success': True,
@@ -120,8 +250,8 @@ def search_routes():
                     'coordinates': {'latitude': end_lat, 'longitude': end_lon}
                 },
                 'routes_found': len(valid_routes),
-                'routes': routes,
-                'valid_routes_only': valid_routes
+                **routes_body(routes, output, valid_routes),
+                'timings_ms': timings
             }), 200
             
         elif 'start' in data and 'end' in data:
@@ -144,7 +274,14 @@ def search_routes():
             except (ValueError, TypeError):
                 return jsonify({'success': False, 'error': 'Invalid coordinate format'}), 400
             
-            routes = routing_service.find_direct_routes(start_lat, start_lon, end_lat, end_lon)
+            routes = await run_blocking(
+                route_cache.get_or_compute,
+                'direct', (start_lat, start_lon, end_lat, end_lon),
+                {'walking_top_k': walking_top_k},
+                lambda: routing_service.find_direct_routes(
+                    start_lat, start_lon, end_lat, end_lon, walking_top_k=walking_top_k
+                )
+            )
             valid_routes = [r for r in routes if r['valid']]
             
             return jsonify({
@@ -152,8 +289,7 @@ def search_routes():
                 'start_location': {'latitude': start_lat, 'longitude': start_lon},
                 'end_location': {'latitude': end_lat, 'longitude': end_lon},
                 'routes_found': len(valid_routes),
-                'routes': routes,
-                'valid_routes_only': valid_routes
+                **routes_body(routes, output, valid_routes)
             }), 200
         
         else:
@@ -167,23 +303,30 @@ def search_routes():
 
 
 @bp.route('/routes/transfer', methods=['POST', 'OPTIONS'])
-def find_transfer_routes():
-    """Find routes with one transfer between two buses"""
+async def find_transfer_routes():
+    """Find routes with one or more transfers between buses"""
     try:
         data = request.get_json()
         
         if not data:
             return jsonify({'success': False, 'error': 'Request body is required'}), 400
         
+        try:
+            output = output_format(data)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
         max_results = data.get('max_results', 10)
+        max_transfers = data.get('max_transfers', 1)
         
-        if not isinstance(max_results, int) or max_results < 1 or max_results > 20:
+        if not is_integer(max_results, 1, 20):
             return jsonify({'success': False, 'error': 'max_results must be an integer between 1 and 20'}), 400
         
+        if not is_integer(max_transfers, 1, MAX_TRANSFERS):
+            return jsonify({'success': False, 'error': f'max_transfers must be an integer between 1 and {MAX_TRANSFERS}'}), 400
+        
         if 'from' in data and 'to' in data:
             # ADDRESS-BASED SEARCH
-            from app.services.geocoding_service import geocoding_service
-            
             from_address = data['from']
             to_address = data['to']
             
@@ -193,7 +336,14 @@ def find_transfer_routes():
             if not to_address or not to_address.strip():
                 return jsonify({'success': False, 'error': 'To address cannot be empty'}), 400
             
-            from_result = geocoding_service.geocode_address(from_address)
+            # Both addresses geocoded concurrently, stops looked up as each resolves
+            started = time.perf_counter()
+            resolved = await search_pipeline.resolve_async(
+                from_address, to_address, transfer_routing_service.stops_near
+            )
+            from_result = resolved['from']
+            to_result = resolved['to']
+            
             if not from_result:
                 return jsonify({
                     'success': False,
@@ -201,7 +351,6 @@ def find_transfer_routes():
                     'suggestion': 'Try a more specific address or landmark in Greater Tunis'
                 }), 404
             
-            to_result = geocoding_service.geocode_address(to_address)
             if not to_result:
                 return jsonify({
                     'success': False,
@@ -214,9 +363,22 @@ def find_transfer_routes():
             end_lat = to_result['latitude']
             end_lon = to_result['longitude']
             
-            routes = transfer_routing_service.find_transfer_routes(
-                start_lat, start_lon, end_lat, end_lon, max_results=max_results
+            routing_started = time.perf_counter()
+            routes = await run_blocking(
+                route_cache.get_or_compute,
+                'transfer', (start_lat, start_lon, end_lat, end_lon),
+                {'max_results': max_results, 'max_transfers': max_transfers},
+                lambda: transfer_routing_service.find_transfer_routes(
+                    start_lat, start_lon, end_lat, end_lon,
+                    max_results=max_results, max_transfers=max_transfers,
+                    near_start=resolved['from_candidates'], near_end=resolved['to_candidates']
+                )
             )
+            timings = {
+                **resolved['timings_ms'],
+                'routing': elapsed_ms(routing_started),
+                'total': elapsed_ms(started)
+            }
             
             return jsonify({
                 'success': True,
@@ -231,7 +393,8 @@ def find_transfer_routes():
                     'coordinates': {'latitude': end_lat, 'longitude': end_lon}
                 },
                 'routes_found': len(routes),
-                'routes': routes
+                **routes_body(routes, output),
+                'timings_ms': timings
             }), 200
             
         elif 'start' in data and 'end' in data:
@@ -260,8 +423,14 @@ def find_transfer_routes():
             if not (-180 <= start_lon <= 180) or not (-180 <= end_lon <= 180):
                 return jsonify({'success': False, 'error': 'Longitude must be between -180 and 180'}), 400
             
-            routes = transfer_routing_service.find_transfer_routes(
-                start_lat, start_lon, end_lat, end_lon, max_results=max_results
+            routes = await run_blocking(
+                route_cache.get_or_compute,
+                'transfer', (start_lat, start_lon, end_lat, end_lon),
+                {'max_results': max_results, 'max_transfers': max_transfers},
+                lambda: transfer_routing_service.find_transfer_routes(
+                    start_lat, start_lon, end_lat, end_lon,
+                    max_results=max_results, max_transfers=max_transfers
+                )
             )
             
             return jsonify({
@@ -269,7 +438,7 @@ def find_transfer_routes():
                 'start_location': {'latitude': start_lat, 'longitude': start_lon},
                 'end_location': {'latitude': end_lat, 'longitude': end_lon},
                 'routes_found': len(routes),
-                'routes': routes
+                **routes_body(routes, output)
             }), 200
         
         else:
@@ -282,8 +451,237 @@ def find_transfer_routes():
         import traceback
         traceback.print_exc()
         return jsonify({'success': False, 'error': f'Internal server error: {str(e)}'}), 500
+@bp.route('/routes/batch', methods=['POST', 'OPTIONS'])
+def route_batch():
+    """
+    Route many origin/destination pairs in one request
+    
+    Pairs are routed in parallel on worker processes and streamed back as
+    NDJSON: one line per pair, then a {"summary": {...}} line.
+    
+    Request Body:
+    {
+        "pairs": [
+            {"start": {"latitude": 36.80, "longitude": 10.18},
+             "end": {"latitude": 36.85, "longitude": 10.20}},
+            ...
+        ],
+        "mode": "transfer",         // or "journeys" (0+ transfers), "direct"
+        "max_results": 10,
+        "max_transfers": 1,
+        "order": "input",           // or "completion"
+        "format": "compact"         // and fields / geometry, as other searches
+    }
+    
+    Lines: {"index": 0, "routes_found": 3, "routes": [...]}
+           or {"index": 0, "error": "..."}
+    """
+    try:
+        data = request.get_json()
+        
+        if not data or not isinstance(data.get('pairs'), list):
+            return jsonify({'success': False, 'error': 'pairs array is required'}), 400
+        
+        if len(data['pairs']) > MAX_BATCH_PAIRS:
+            return jsonify({'success': False, 'error': f'Maximum {MAX_BATCH_PAIRS} pairs per batch request'}), 400
+        
+        mode = data.get('mode', 'transfer')
+        if mode not in MODES:
+            return jsonify({'success': False, 'error': f'mode must be one of: {", ".join(MODES)}'}), 400
+        
+        order = data.get('order', 'input')
+        if order not in ('input', 'completion'):
+            return jsonify({'success': False, 'error': 'order must be "input" or "completion"'}), 400
+        
+        max_results = data.get('max_results', 10)
+        max_transfers = data.get('max_transfers', 1)
+        min_allowed = 1 if mode == 'transfer' else 0
+        
+        if not is_integer(max_results, 1, 20):
+            return jsonify({'success': False, 'error': 'max_results must be an integer between 1 and 20'}), 400
+        
+        if not is_integer(max_transfers, min_allowed, MAX_TRANSFERS):
+            return jsonify({'success': False, 'error': f'max_transfers must be an integer between {min_allowed} and {MAX_TRANSFERS}'}), 400
+        
+        try:
+            output = output_format(data)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        pairs = []
+        for index, pair in enumerate(data['pairs']):
+            try:
+                start, end = pair['start'], pair['end']
+                coordinates = (
+                    float(start['latitude']), float(start['longitude']),
+                    float(end['latitude']), float(end['longitude'])
+                )
+            except (KeyError, TypeError, ValueError):
+                return jsonify({
+                    'success': False,
+                    'error': f'Pair {index}: "start" and "end" need numeric latitude and longitude'
+                }), 400
+            if not all(-90 <= lat <= 90 for lat in coordinates[::2]) or \
+                    not all(-180 <= lon <= 180 for lon in coordinates[1::2]):
+                return jsonify({'success': False, 'error': f'Pair {index}: coordinates out of range'}), 400
+            pairs.append((index, *coordinates))
+        
+        def ndjson():
+            started = time.perf_counter()
+            routed = errors = 0
+            for result in batch_routing_service.route(
+                    pairs, mode=mode,
+                    options={'max_results': max_results, 'max_transfers': max_transfers},
+                    output=output, ordered=order == 'input'):
+                routed += result.get('routes_found', 0) > 0
+                errors += 'error' in result
+                yield json_bytes(result) + b'\n'
+            yield json_bytes({'summary': {
+                'total': len(pairs),
+                'routed': routed,
+                'errors': errors,
+                'elapsed_ms': elapsed_ms(started)
+            }}) + b'\n'
+        
+        return Response(stream_with_context(ndjson()), mimetype='application/x-ndjson')
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': f'Internal server error: {str(e)}'}), 500
+
+
+@bp.route('/routes/matrix', methods=['POST', 'OPTIONS'])
+def travel_time_matrix():
+    """
+    Best travel times (and transfers) from every origin to every destination
+    
+    One search per origin covers all destinations, so this is much faster
+    than routing each pair. Only times and transfers are returned, no journeys.
+    
+    Request Body:
+    {
+        "origins": [{"latitude": 36.80, "longitude": 10.18}, ...],
+        "destinations": [{"latitude": 36.85, "longitude": 10.20}, ...],
+        "max_transfers": 2,
+        "max_minutes": 90           // optional, slower pairs are unreachable
+    }
+    
+    Response: times_minutes[i][j] and transfers[i][j] from origin i to
+    destination j (null = unreachable)
+    """
+    try:
+        data = request.get_json()
+        
+        if not data:
+            return jsonify({'success': False, 'error': 'Request body is required'}), 400
+        
+        points = {}
+        for name in ['origins', 'destinations']:
+            locations = data.get(name)
+            if not isinstance(locations, list) or not locations:
+                return jsonify({'success': False, 'error': f'{name} must be a non-empty array'}), 400
+            if len(locations) > matrix_service.MAX_POINTS:
+                return jsonify({'success': False, 'error': f'Maximum {matrix_service.MAX_POINTS} {name} per matrix'}), 400
+            
+            points[name] = []
+            for index, location in enumerate(locations):
+                try:
+                    lat, lon = float(location['latitude']), float(location['longitude'])
+                except (KeyError, TypeError, ValueError):
+                    return jsonify({'success': False, 'error': f'{name}[{index}]: numeric latitude and longitude are required'}), 400
+                if not (-90 <= lat <= 90) or not (-180 <= lon <= 180):
+                    return jsonify({'success': False, 'error': f'{name}[{index}]: coordinates out of range'}), 400
+                points[name].append((lat, lon))
+        
+        max_transfers = data.get('max_transfers', 2)
+        if not is_integer(max_transfers, 0, MAX_TRANSFERS):
+            return jsonify({'success': False, 'error': f'max_transfers must be an integer between 0 and {MAX_TRANSFERS}'}), 400
+        
+        max_minutes = data.get('max_minutes')
+        if max_minutes is not None and (not isinstance(max_minutes, (int, float)) or isinstance(max_minutes, bool) or max_minutes <= 0):
+            return jsonify({'success': False, 'error': 'max_minutes must be a positive number'}), 400
+        
+        started = time.perf_counter()
+        matrix = matrix_service.travel_times(
+            points['origins'], points['destinations'],
+            max_transfers=max_transfers, max_minutes=max_minutes
+        )
+        
+        return jsonify({
+            'success': True,
+            **matrix,
+            'elapsed_ms': elapsed_ms(started)
+        }), 200
+        
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({'success': False, 'error': f'Internal server error: {str(e)}'}), 500
+
+
+@bp.route('/isochrone', methods=['GET', 'POST', 'OPTIONS'])
+def get_isochrone():
+    """
+    Stops and area reachable from a point within a time budget
+    
+    Parameters (query string or JSON body):
+        latitude, longitude: Origin
+        minutes: Time budget (1 to 180)
+        max_transfers: Maximum number of transfers (default 2)
+        geometry, tolerance, zoom: Polygon format, as for route paths
+    
+    Response: stops reached (fastest first, with minutes and buses used)
+    and 'polygon', a closed ring of [lat, lon] enclosing the area one can
+    walk to from them in the time left. Origins are snapped to a grid
+    (ISOCHRONE_GRID meters) and the result is cached per grid cell.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        def get(name):
+            return request.args.get(name, data.get(name))
+        
+        try:
+            lat = float(get('latitude'))
+            lon = float(get('longitude'))
+            minutes = float(get('minutes'))
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'error': 'latitude, longitude and minutes are required numbers'}), 400
+        
+        if not (-90 <= lat <= 90) or not (-180 <= lon <= 180):
+            return jsonify({'success': False, 'error': 'Coordinates out of range'}), 400
+        
+        if not 1 <= minutes <= isochrone_service.MAX_MINUTES:
+            return jsonify({'success': False, 'error': f'minutes must be between 1 and {isochrone_service.MAX_MINUTES}'}), 400
+        
+        max_transfers = data.get('max_transfers', 2)
+        if 'max_transfers' in request.args:
+            max_transfers = request.args['max_transfers']
+            max_transfers = int(max_transfers) if max_transfers.isdecimal() else None
+        
+        if not is_integer(max_transfers, 0, MAX_TRANSFERS):
+            return jsonify({'success': False, 'error': f'max_transfers must be an integer between 0 and {MAX_TRANSFERS}'}), 400
+        
+        try:
+            geometry = parse_geometry(get)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        isochrone = isochrone_service.isochrone(lat, lon, minutes, max_transfers=max_transfers)
+        
+        return jsonify({
+            'success': True,
+            **isochrone,
+            'polygon': format_path(isochrone['polygon'], **geometry) if geometry else isochrone['polygon']
+        }), 200
+        
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({'success': False, 'error': f'Internal server error: {str(e)}'}), 500
+
+
 @bp.route('/routes/walking-path', methods=['POST', 'OPTIONS'])
-def get_walking_path():
+async def get_walking_path():
     """Get realistic walking path between two points using OSRM"""
     try:
         data = request.get_json()
@@ -296,20 +694,44 @@ def get_walking_path():
         end_lat = data.get('end_lat')
         end_lon = data.get('end_lon')
         
+        from app.services.walking_service import walking_service
+        
+        # Walks between two stops of the current network are cached permanently,
+        # so they run between the stops themselves, whatever coordinates were sent
+        # (stop ids of another network version are ignored)
+        cache_key = None
+        from_stop = data.get('from_stop')
+        to_stop = data.get('to_stop')
+        if data.get('network_version') == data_loader.network_version and (
+                from_stop is not None or to_stop is not None):
+            snapshot = data_loader.load_snapshot()
+            if not (is_integer(from_stop, 0, snapshot.stop_count - 1)
+                    and is_integer(to_stop, 0, snapshot.stop_count - 1)):
+                return jsonify({'success': False, 'error': 'from_stop and to_stop must be stop ids'}), 400
+            cache_key = walking_service.stop_cache_key(data_loader.network_version, from_stop, to_stop)
+            start_lat, start_lon = snapshot.stop_lat[from_stop], snapshot.stop_lon[from_stop]
+            end_lat, end_lon = snapshot.stop_lat[to_stop], snapshot.stop_lon[to_stop]
+        
         if None in [start_lat, start_lon, end_lat, end_lon]:
             return jsonify({'success': False, 'error': 'Missing coordinates'}), 400
         
-        from app.services.walking_service import walking_service
+        # Optional encoded polyline output and simplification
+        try:
+            geometry = parse_geometry(lambda name: request.args.get(name, data.get(name))) or {}
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         
-        path_result = walking_service.get_walking_route(
+        path_result = await walking_service.get_walking_route_async(
             float(start_lat), float(start_lon),
-            float(end_lat), float(end_lon)
+            float(end_lat), float(end_lon),
+            cache_key=cache_key,
+            permanent=cache_key is not None
         )
         
         if path_result:
             return jsonify({
                 'success': True,
-                'path': path_result['path'],
+                'path': format_path(path_result['path'], **geometry),
                 'distance_meters': path_result['distance_meters'],
                 'duration_minutes': path_result['duration_minutes']
             }), 200
@@ -317,7 +739,10 @@ def get_walking_path():
             # Return straight line fallback
             return jsonify({
                 'success': True,
-                'path': [[float(start_lat), float(start_lon)], [float(end_lat), float(end_lon)]],
+                'path': format_path(
+                    [[float(start_lat), float(start_lon)], [float(end_lat), float(end_lon)]],
+                    **geometry
+                ),
                 'fallback': True
             }), 200
             
@@ -0,0 +1,190 @@
+"""
+Batch Routing Service - Route many origin/destination pairs on a process pool
+
+Pairs are sorted by origin neighbourhood and cut into chunks, so one
+worker routes pairs with the same or nearby origins one after the other.
+The stops around each ORIGIN_GRID cell are looked up once per worker;
+every point of the cell (origin or destination) then only measures its
+exact distances to them, so nearby points share the index lookup and get
+the same candidates as a search of their own. Workers map the
+same compiled network snapshot file, so they share its pages instead of
+each holding a copy.
+"""
+import contextlib
+import io
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import lru_cache
+from multiprocessing import get_all_start_methods, get_context
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.utils.cache import grid_key, snap_to_grid
+
+MODES = ('transfer', 'journeys', 'direct')
+ORIGIN_GRID = 500   # meters: pairs grouped by origin cell, stop lookups shared per cell
+
+# (index, start_lat, start_lon, end_lat, end_lon)
+Pair = Tuple[int, float, float, float, float]
+
+
+def _searcher(mode: str):
+    """Routing service of a mode"""
+    if mode == 'direct':
+        from app.services.routing_service import routing_service
+        return routing_service
+    from app.services.transfer_routing_service import transfer_routing_service
+    return transfer_routing_service
+
+
+@lru_cache(maxsize=4096)
+def _cell_stops(mode: str, cell_lat: float, cell_lon: float):
+    """Entries that may be within walking distance of any point of a grid cell (cached per worker)"""
+    service = _searcher(mode)
+    # Every point of the cell is within ORIGIN_GRID meters of its center
+    return service.stop_index.candidates(cell_lat, cell_lon, service.max_walking_distance + ORIGIN_GRID)
+
+
+def _candidates(mode: str, lat: float, lon: float):
+    """Candidate stops around a point: nearest_stops_by_route() or stops_near()"""
+    service = _searcher(mode)
+    among = _cell_stops(mode, *snap_to_grid(ORIGIN_GRID, lat, lon))
+    if mode == 'direct':
+        return service.stop_index.nearest_by_route(lat, lon, service.max_walking_distance, among=among)
+    return service.stop_index.query_radius(lat, lon, service.max_walking_distance, among=among)
+
+
+def _route_pair(mode: str, options: Dict, start_lat: float, start_lon: float,
+                end_lat: float, end_lon: float) -> List[Dict]:
+    near_start = _candidates(mode, start_lat, start_lon)
+    near_end = _candidates(mode, end_lat, end_lon)
+
+    if mode == 'direct':
+        from app.services.routing_service import routing_service
+        # No walking paths: thousands of pairs must not turn into OSRM calls
+        routes = routing_service.find_direct_routes(
+            start_lat, start_lon, end_lat, end_lon, walking_top_k=0,
+            near_start=near_start, near_end=near_end
+        )
+        return [route for route in routes if route['valid']]
+
+    from app.services.transfer_routing_service import transfer_routing_service
+    return transfer_routing_service.find_journeys(
+        start_lat, start_lon, end_lat, end_lon,
+        max_results=options['max_results'],
+        max_transfers=options['max_transfers'],
+        min_transfers=1 if mode == 'transfer' else 0,
+        near_start=near_start, near_end=near_end
+    )
+
+
+def _route_chunk(mode: str, options: Dict, output: Dict, pairs: List[Pair]) -> List[Dict]:
+    """Route a chunk of pairs (runs in a pool worker)"""
+    from app.utils.response_format import format_routes
+
+    results = []
+    with contextlib.redirect_stdout(io.StringIO()):  # per-search progress prints
+        for index, *coordinates in pairs:
+            try:
+                routes = _route_pair(mode, options, *coordinates)
+                results.append({
+                    'index': index,
+                    'routes_found': len(routes),
+                    'routes': format_routes(routes, **output)
+                })
+            except Exception as e:
+                results.append({'index': index, 'error': str(e)})
+    return results
+
+
+def _init_worker():
+    """Load the network and build the services before the first chunk"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app.services.routing_service  # noqa: F401
+        import app.services.transfer_routing_service  # noqa: F401
+
+
+class BatchRoutingService:
+    """Routes batches of origin/destination pairs on worker processes"""
+
+    # Per web worker: the server runs WEB_CONCURRENCY x WORKERS routing processes,
+    # so by default they share the CPUs instead of each web worker taking them all
+    WORKERS = int(os.getenv('BATCH_WORKERS', max(
+        1, (os.cpu_count() or 1) // int(os.getenv('WEB_CONCURRENCY', os.cpu_count() or 1))
+    )))
+    CHUNK_SIZE = int(os.getenv('BATCH_CHUNK_SIZE', 25))     # pairs per task
+
+    def __init__(self, workers: int = WORKERS, chunk_size: int = CHUNK_SIZE):
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        """Worker pool, started on first use"""
+        if self._pool is None:
+            # Not fork: the web server's threads may hold locks at fork time
+            method = 'forkserver' if 'forkserver' in get_all_start_methods() else 'spawn'
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=get_context(method),
+                initializer=_init_worker
+            )
+        return self._pool
+
+    def chunks(self, pairs: List[Pair]) -> List[List[Pair]]:
+        """Pairs grouped by origin cell (ORIGIN_GRID), then by origin, in chunks"""
+        ordered = sorted(pairs, key=lambda pair: (
+            grid_key(ORIGIN_GRID, pair[1], pair[2]), pair[1], pair[2], pair[0]
+        ))
+        return [
+            ordered[i:i + self.chunk_size]
+            for i in range(0, len(ordered), self.chunk_size)
+        ]
+
+    def route(self, pairs: List[Pair], mode: str = 'transfer', options: Optional[Dict] = None,
+              output: Optional[Dict] = None, ordered: bool = True) -> Iterator[Dict]:
+        """
+        Route every pair
+
+        Args:
+            pairs: (index, start_lat, start_lon, end_lat, end_lon)
+            mode: 'transfer' (at least one transfer, like /routes/transfer),
+                  'journeys' (any number of transfers) or 'direct'
+            options: max_results and max_transfers (transfer and journeys modes)
+            output: format_routes() arguments
+            ordered: Yield in input order (else as soon as each chunk is done)
+
+        Yields:
+            {'index', 'routes_found', 'routes'} or {'index', 'error'} per pair
+        """
+        options = options or {'max_results': 10, 'max_transfers': 1}
+        output = output or {}
+        pending = {
+            self.pool.submit(_route_chunk, mode, options, output, chunk)
+            for chunk in self.chunks(pairs)
+        }
+
+        # Input order: hold results until every earlier pair is out
+        next_position = 0
+        positions = {pair[0]: position for position, pair in enumerate(pairs)}
+        held = {}
+
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for result in future.result():
+                        if not ordered:
+                            yield result
+                            continue
+                        held[positions[result['index']]] = result
+                        while next_position in held:
+                            yield held.pop(next_position)
+                            next_position += 1
+        finally:
+            # Client went away: drop the chunks not started yet
+            for future in pending:
+                future.cancel()
+
+
+# Create service instance
+batch_routing_service = BatchRoutingService()
@@ -4,11 +4,14 @@ Distance Service - Calculate distances between coordinates
 import math
 from typing import Tuple
 
+import numpy as np
+
 class DistanceService:
     """Service for calculating distances between geographic points"""
     
     EARTH_RADIUS_METERS = 6371000
     WALKING_SPEED_M_PER_MIN = 80  # Average walking speed
+    MINUTES_PER_STOP = 3  # Average bus time between consecutive stops
     
     @staticmethod
     def haversine_distance(lat1: float, lon1: float, 
@@ -38,6 +41,70 @@ class DistanceService:
         distance = DistanceService.EARTH_RADIUS_METERS * c
         return distance
     
+    @staticmethod
+    def haversine_many(lat, lon, lats, lons) -> np.ndarray:
+        """
+        Batched Haversine distance in a single NumPy call
+        
+        Same formula as haversine_distance, so results agree with the
+        scalar version to floating point rounding.
+        
+        Args:
+            lat, lon: Origin coordinates, scalars or arrays of N points
+            lats, lons: Array of M target coordinates
+        
+        Returns:
+            Distances in meters, shape (M,) for a single origin
+            or (N, M) for N origins
+        """
+        lat1_rad, lon1, lat2_rad, lon2 = DistanceService._broadcast(lat, lon, lats, lons)
+        delta_lat = lat2_rad - lat1_rad
+        delta_lon = np.radians(lon2 - lon1)
+        
+        a = (np.sin(delta_lat / 2) ** 2 +
+             np.cos(lat1_rad) * np.cos(lat2_rad) *
+             np.sin(delta_lon / 2) ** 2)
+        c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+        
+        return DistanceService.EARTH_RADIUS_METERS * c
+    
+    @staticmethod
+    def equirectangular_many(lat, lon, lats, lons) -> np.ndarray:
+        """
+        Fast batched distance using the equirectangular approximation
+        
+        Error bound: for distances under 1 km and latitudes within ±60°
+        the result differs from haversine_many by less than 0.1 mm,
+        which is far below stop coordinate precision. Do not use it for
+        long distances (error grows with the cube of the distance).
+        
+        Args:
+            lat, lon: Origin coordinates, scalars or arrays of N points
+            lats, lons: Array of M target coordinates
+        
+        Returns:
+            Distances in meters, shape (M,) or (N, M) like haversine_many
+        """
+        lat1_rad, lon1, lat2_rad, lon2 = DistanceService._broadcast(lat, lon, lats, lons)
+        x = np.radians(lon2 - lon1) * np.cos((lat1_rad + lat2_rad) / 2)
+        y = lat2_rad - lat1_rad
+        
+        return DistanceService.EARTH_RADIUS_METERS * np.hypot(x, y)
+    
+    @staticmethod
+    def _broadcast(lat, lon, lats, lons):
+        """Shape origins as a column when there are several of them"""
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        
+        if lat.ndim == 1:
+            lat = lat[:, np.newaxis]
+            lon = lon[:, np.newaxis]
+        
+        return np.radians(lat), lon, np.radians(lats), lons
+    
     @staticmethod
     def calculate_walking_time(distance_meters: float) -> float:
         """
@@ -62,8 +129,7 @@ class DistanceService:
         Returns:
             Estimated duration in minutes
         """
-        MINUTES_PER_STOP = 3
-        return stops_count * MINUTES_PER_STOP
+        return stops_count * DistanceService.MINUTES_PER_STOP
 
 
 # Create service instance
@@ -0,0 +1,225 @@
+"""
+Gazetteer Service - Geocode and autocomplete bus stop names locally
+
+Places are built from the stop names of the network: direction suffixes
+("-ALLER", "RETOUR") are stripped, names are accent-folded, and stops
+sharing a name are grouped into one place per neighbourhood (the same
+name can exist in several towns). Lookups use a sorted prefix list and a
+trigram index, both in memory.
+"""
+import re
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.services.distance_service import distance_service
+from app.utils.data_loader import data_loader
+from app.utils.text import normalize_address
+
+# Direction suffix of stop names, e.g. "CITE BEN NASR-ALLER", "ZAHROUNI RETOUR"
+DIRECTION_SUFFIX = re.compile(r'[\s\-]+(ALLER|RETOUR)\s*$', re.IGNORECASE)
+
+
+# Words that don't tell places apart ("TERMINUS TUNIS MARINE BUS" = "tunis marine")
+GENERIC_WORDS = {'terminus', 'station', 'arret', 'bus'}
+
+
+def place_key(name: str) -> str:
+    """Canonical form of a stop name or query (folded, no direction suffix)"""
+    return normalize_address(DIRECTION_SUFFIX.sub('', name))
+
+
+def core_key(key: str) -> str:
+    """Place key without generic words (unless nothing else is left)"""
+    core = ' '.join(word for word in key.split(' ') if word not in GENERIC_WORDS)
+    return core or key
+
+
+def trigrams(key: str) -> set:
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class GazetteerService:
+    """In-memory index of the named places (stops) of the network"""
+
+    # Stops with the same name further apart than this are different places
+    CLUSTER_RADIUS = 1000       # meters
+    # Minimum trigram similarity for a fuzzy geocoding match
+    GEOCODE_MIN_SIMILARITY = 0.75
+    AUTOCOMPLETE_MIN_SIMILARITY = 0.3
+
+    def __init__(self):
+        self.snapshot = data_loader.load_snapshot()
+        self.places: List[Dict] = []
+        self._place_keys: List[str] = []
+        self._by_key: Dict[str, List[int]] = defaultdict(list)
+        self._by_core: Dict[str, List[int]] = defaultdict(list)
+        self._prefixes = []         # sorted (text, place id): each key from each word on
+        self._trigrams: Dict[str, List[int]] = defaultdict(list)
+        self._place_trigrams: List[int] = []
+
+        self._build()
+
+    def _build(self):
+        snapshot = self.snapshot
+        lat, lon = snapshot.stop_lat, snapshot.stop_lon
+        bus_names = snapshot.route_bus_name_sid
+
+        # Stop entries by canonical name
+        entries_by_key = defaultdict(list)
+        names_by_key = defaultdict(Counter)
+        order = np.argsort(snapshot.stop_name_sid, kind='stable')
+        sids, starts = np.unique(snapshot.stop_name_sid[order], return_index=True)
+        for sid, entries in zip(sids.tolist(), np.split(order, starts[1:])):
+            name = snapshot.string(sid)
+            key = place_key(name)
+            if not key:
+                continue
+            entries_by_key[key].extend(entries.tolist())
+            names_by_key[key][DIRECTION_SUFFIX.sub('', name).strip()] += len(entries)
+
+        for key in sorted(entries_by_key):
+            display_name = names_by_key[key].most_common(1)[0][0]
+
+            # Greedy clustering of the stops sharing this name
+            clusters = []
+            for entry in entries_by_key[key]:
+                for cluster in clusters:
+                    if distance_service.haversine_distance(
+                            cluster['lat'], cluster['lon'], lat[entry], lon[entry]
+                    ) <= self.CLUSTER_RADIUS:
+                        cluster['entries'].append(entry)
+                        break
+                else:
+                    clusters.append({'lat': lat[entry], 'lon': lon[entry], 'entries': [entry]})
+
+            for cluster in clusters:
+                entries = np.asarray(cluster['entries'])
+                routes = np.unique(snapshot.stop_route[entries])
+                lines = sorted({snapshot.string(sid) for sid in bus_names[routes].tolist()})
+
+                place_id = len(self.places)
+                self.places.append({
+                    'name': display_name,
+                    'latitude': round(float(lat[entries].mean()), 7),
+                    'longitude': round(float(lon[entries].mean()), 7),
+                    'stops': len(entries),
+                    'routes': len(routes),
+                    'lines': lines
+                })
+                self._place_keys.append(key)
+                self._by_key[key].append(place_id)
+                self._by_core[core_key(key)].append(place_id)
+
+                words = key.split(' ')
+                for i in range(len(words)):
+                    self._prefixes.append((' '.join(words[i:]), place_id))
+
+                grams = trigrams(core_key(key))
+                self._place_trigrams.append(len(grams))
+                for gram in grams:
+                    self._trigrams[gram].append(place_id)
+
+        self._prefixes.sort()
+
+    def _prefix_matches(self, query: str) -> List[int]:
+        """Places with a word sequence starting with query, whole names first"""
+        matches = {}
+        i = bisect_left(self._prefixes, (query,))
+        while i < len(self._prefixes) and self._prefixes[i][0].startswith(query):
+            text, place_id = self._prefixes[i]
+            whole = self._place_keys[place_id] == text
+            matches[place_id] = matches.get(place_id, False) or whole
+            i += 1
+
+        return sorted(matches, key=lambda p: (
+            not matches[p], -self.places[p]['routes'], self.places[p]['name']
+        ))
+
+    def _fuzzy_matches(self, query: str, min_similarity: float):
+        """(similarity, place id) by trigram similarity (Jaccard), best first"""
+        grams = trigrams(core_key(query))
+        common = Counter()
+        for gram in grams:
+            common.update(self._trigrams.get(gram, ()))
+
+        scored = []
+        for place_id, shared in common.items():
+            similarity = shared / (len(grams) + self._place_trigrams[place_id] - shared)
+            if similarity >= min_similarity:
+                scored.append((similarity, place_id))
+
+        scored.sort(key=lambda s: (-s[0], -self.places[s[1]]['routes']))
+        return scored
+
+    def geocode(self, query: str) -> Optional[Dict]:
+        """
+        Geocode a query naming a stop
+
+        Args:
+            query: Stop, terminus or landmark name (any case / accents)
+
+        Returns:
+            Dict in the geocoding result format, or None if no stop matches
+        """
+        key = place_key(query)
+        if not key:
+            return None
+
+        candidates = self._by_key.get(key) or self._by_core.get(core_key(key))
+        if candidates:
+            # Same name in several places: the best served one
+            place_id = max(candidates, key=lambda p: self.places[p]['routes'])
+            similarity = 1.0
+        else:
+            matches = self._fuzzy_matches(key, self.GEOCODE_MIN_SIMILARITY)
+            if not matches:
+                return None
+            similarity, place_id = matches[0]
+
+        place = self.places[place_id]
+        return {
+            'latitude': place['latitude'],
+            'longitude': place['longitude'],
+            'display_name': f"{place['name']} (bus stop)",
+            'address': query,
+            'type': 'bus_stop',
+            'importance': round(similarity, 3),
+            'source': 'gazetteer'
+        }
+
+    def autocomplete(self, query: str, limit: int = 10) -> List[Dict]:
+        """
+        Stop names matching what the user typed so far
+
+        Prefix matches come first (best served places first), then fuzzy
+        (trigram) matches for typos.
+
+        Args:
+            query: Partial stop name
+            limit: Maximum number of suggestions
+
+        Returns:
+            List of places: name, latitude, longitude, stops, routes, lines
+        """
+        key = place_key(query)
+        if not key:
+            return []
+
+        results = self._prefix_matches(key)[:limit]
+        if len(results) < limit:
+            seen = set(results)
+            for _, place_id in self._fuzzy_matches(key, self.AUTOCOMPLETE_MIN_SIMILARITY):
+                if place_id not in seen:
+                    results.append(place_id)
+                    if len(results) >= limit:
+                        break
+
+        return [self.places[place_id] for place_id in results]
+
+
+# Create service instance
+gazetteer_service = GazetteerService()
@@ -2,9 +2,18 @@
 Geocoding Service - Convert addresses to coordinates
 Uses Nominatim (OpenStreetMap) API
 """
+import os
 import requests
 import time
-from typing import Optional, Dict, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Optional, Dict, Iterator, List, Tuple
+
+from app.services.gazetteer_service import gazetteer_service
+from app.utils.async_io import http_client, httpx, run_blocking
+from app.utils.cache import MISS, TwoTierCache
+from app.utils.rate_limiter import RateLimitExceeded, SingleFlight, TokenBucketLimiter
+from app.utils.text import normalize_address
 
 class GeocodingService:
     """Service for converting addresses to geographic coordinates"""
@@ -14,15 +23,50 @@ class GeocodingService:
     USER_AGENT = "TransTuRouteApp/1.0"
     COUNTRY_CODE = "tn"  # Tunisia
     
-    # Rate limiting
-    LAST_REQUEST_TIME = 0
-    MIN_REQUEST_INTERVAL = 1.0  # seconds between requests (Nominatim policy)
+    # Rate limiting, shared by all workers (Nominatim policy: 1 request per second)
+    MIN_REQUEST_INTERVAL = 1.0  # seconds between requests
+    MAX_RATE_LIMIT_WAIT = float(os.getenv('NOMINATIM_MAX_WAIT', 10))  # seconds
+    LIMITER = TokenBucketLimiter(
+        'nominatim',
+        rate=1.0 / MIN_REQUEST_INTERVAL,
+        state_path=os.getenv(
+            'NOMINATIM_RATE_LIMIT_PATH',
+            str(Path(__file__).resolve().parent.parent.parent / 'data' / 'cache' / 'nominatim.ratelimit')
+        ) or None
+    )
+    
+    # Concurrent lookups of the same address share one Nominatim request
+    FLIGHTS = SingleFlight('nominatim_lookups')
+    
+    # Nominatim lookups in flight per batch request
+    BATCH_WORKERS = 2
+    
+    # Results cache, keyed on the normalized address and shared by all workers
+    # (empty GEOCODING_CACHE_PATH = memory only)
+    CACHE_TTL = float(os.getenv('GEOCODING_CACHE_TTL', 30 * 24 * 3600))           # seconds
+    NEGATIVE_CACHE_TTL = float(os.getenv('GEOCODING_NEGATIVE_CACHE_TTL', 3600))    # seconds
+    CACHE = TwoTierCache(
+        'geocoding',
+        ttl=CACHE_TTL,
+        memory_entries=int(os.getenv('GEOCODING_CACHE_MEMORY_ENTRIES', 5000)),
+        disk_path=os.getenv(
+            'GEOCODING_CACHE_PATH',
+            str(Path(__file__).resolve().parent.parent.parent / 'data' / 'cache' / 'geocoding.sqlite')
+        ) or None,
+        disk_entries=int(os.getenv('GEOCODING_CACHE_DISK_ENTRIES', 100000))
+    )
     
     @classmethod
     def geocode_address(cls, address: str) -> Optional[Dict]:
         """
         Convert address to coordinates using Nominatim API
         
+        Queries naming a bus stop are answered by the local gazetteer.
+        Other results are cached under the normalized address; addresses
+        that are not found are cached too, for NEGATIVE_CACHE_TTL. Cache
+        hits don't wait for the rate limiter. Addresses normalizing to an
+        empty key (no letter or digit) are neither cached nor coalesced.
+        
         Args:
             address: Address string (e.g., "Avenue Habib Bourguiba, Tunis")
         
@@ -39,66 +83,241 @@ class GeocodingService:
         if not address or not address.strip():
             return None
         
+        key = normalize_address(address)
+        result = cls._geocode_local(address, key)
+        if result is not MISS:
+            return result
+        return cls._geocode_upstream(address, key)
+    
+    @classmethod
+    def _geocode_upstream(cls, address: str, key: str) -> Optional[Dict]:
+        """geocode_address() after a gazetteer and cache miss: one Nominatim lookup per key"""
+        try:
+            result = cls.FLIGHTS.do(key, lambda: cls._lookup(key, address)) if key \
+                else cls._lookup(key, address)
+        except RateLimitExceeded as e:
+            print(f"Geocoding rate limit: {e}")
+            return None
+        except requests.RequestException as e:
+            # Errors are not cached: the next search asks Nominatim again
+            print(f"Geocoding API error: {e}")
+            return None
+        except (KeyError, ValueError) as e:
+            print(f"Geocoding parse error: {e}")
+            return None
+        
+        return {**result, 'address': address} if result else None
+    
+    @classmethod
+    async def geocode_address_async(cls, address: str) -> Optional[Dict]:
+        """
+        geocode_address() for async views: Nominatim is queried through the
+        shared async client, without holding a thread while it answers.
+        Without the client (not served by asgi.py), runs geocode_address()
+        in the thread pool.
+        """
+        client = http_client()
+        if client is None:
+            return await run_blocking(cls.geocode_address, address)
+        
+        if not address or not address.strip():
+            return None
+        
+        key = normalize_address(address)
+        # Gazetteer and blocking SQLite cache lookups: off the event loop
+        result = await run_blocking(cls._geocode_local, address, key)
+        if result is not MISS:
+            return result
+        
+        try:
+            result = await cls.FLIGHTS.do_async(key, lambda: cls._lookup_async(client, key, address)) \
+                if key else await cls._lookup_async(client, key, address)
+        except RateLimitExceeded as e:
+            print(f"Geocoding rate limit: {e}")
+            return None
+        except httpx.HTTPError as e:
+            print(f"Geocoding API error: {e}")
+            return None
+        except (KeyError, ValueError) as e:
+            print(f"Geocoding parse error: {e}")
+            return None
+        
+        return {**result, 'address': address} if result else None
+    
+    @classmethod
+    def _geocode_local(cls, address: str, key: str):
+        """Result from the gazetteer or the cache, or MISS if Nominatim is needed"""
+        # Stop names are resolved locally, without Nominatim
+        result = gazetteer_service.geocode(address)
+        if result:
+            return result
+        
+        if not key:
+            return MISS
+        cached = cls.CACHE.get(key, MISS)
+        if cached is MISS:
+            return MISS
+        return {**cached, 'address': address} if cached else None
+    
+    @classmethod
+    def _lookup(cls, key: str, address: str) -> Optional[Dict]:
+        """Query Nominatim and cache the result (None if not found)"""
         # Rate limiting - respect Nominatim's usage policy
         cls._wait_for_rate_limit()
         
-        # Prepare request
-        params = {
+        # Another worker may have cached it while this one was queued
+        cached = cls.CACHE.get(key, MISS, count=False) if key else MISS
+        if cached is not MISS:
+            return cached
+        
+        result = cls._query_nominatim(address)
+        
+        cls._store(key, result)
+        return result
+    
+    @classmethod
+    async def _lookup_async(cls, client, key: str, address: str) -> Optional[Dict]:
+        """_lookup() through the async client"""
+        await cls._wait_for_rate_limit_async()
+        
+        cached = await run_blocking(cls.CACHE.get, key, MISS, count=False) if key else MISS
+        if cached is not MISS:
+            return cached
+        
+        response = await client.get(
+            cls.BASE_URL,
+            params=cls._nominatim_params(address),
+            headers={'User-Agent': cls.USER_AGENT},
+            timeout=10
+        )
+        response.raise_for_status()
+        result = cls._parse_results(response.json())
+        
+        await run_blocking(cls._store, key, result)
+        return result
+    
+    @classmethod
+    def _store(cls, key: str, result: Optional[Dict]):
+        """Cache a Nominatim result (None: for NEGATIVE_CACHE_TTL; empty key: not cached)"""
+        if key:
+            cls.CACHE.set(key, result, ttl=cls.NEGATIVE_CACHE_TTL if result is None else None)
+    
+    @classmethod
+    def _nominatim_params(cls, address: str) -> Dict:
+        return {
             'q': address.strip(),
             'format': 'json',
             'limit': 1,
             'countrycodes': cls.COUNTRY_CODE
         }
+    
+    @staticmethod
+    def _parse_results(results: List[Dict]) -> Optional[Dict]:
+        """Best match of a Nominatim response, or None"""
+        if results and len(results) > 0:
+            result = results[0]
+            
+            return {
+                'latitude': float(result['lat']),
+                'longitude': float(result['lon']),
+                'display_name': result['display_name'],
+                'type': result.get('type', 'unknown'),
+                'importance': result.get('importance', 0)
+            }
+        
+        return None
+    
+    @classmethod
+    def _query_nominatim(cls, address: str) -> Optional[Dict]:
+        """
+        Look an address up on Nominatim (caller waits for the rate limiter)
+        
+        Returns:
+            Best match (without the 'address' field), or None if not found
+        
+        Raises:
+            requests.RequestException, KeyError, ValueError
+        """
+        # Prepare request
+        params = cls._nominatim_params(address)
         
         headers = {
             'User-Agent': cls.USER_AGENT
         }
         
-        try:
-            response = requests.get(
-                cls.BASE_URL, 
-                params=params, 
-                headers=headers,
-                timeout=10
-            )
-            response.raise_for_status()
-            
-            results = response.json()
-            
-            if results and len(results) > 0:
-                result = results[0]
-                
-                return {
-                    'latitude': float(result['lat']),
-                    'longitude': float(result['lon']),
-                    'display_name': result['display_name'],
-                    'address': address,
-                    'type': result.get('type', 'unknown'),
-                    'importance': result.get('importance', 0)
-                }
-            
-            return None
-            
-        except requests.RequestException as e:
-            print(f"Geocoding API error: {e}")
-            return None
-        except (KeyError, ValueError) as e:
-            print(f"Geocoding parse error: {e}")
-            return None
+        response = requests.get(
+            cls.BASE_URL, 
+            params=params, 
+            headers=headers,
+            timeout=10
+        )
+        response.raise_for_status()
+        
+        return cls._parse_results(response.json())
     
     @classmethod
     def _wait_for_rate_limit(cls):
         """
-        Ensure we don't exceed Nominatim's rate limit (1 request per second)
+        Wait for a Nominatim slot (1 request per second across all workers)
+        
+        Raises:
+            RateLimitExceeded: if the queue is longer than MAX_RATE_LIMIT_WAIT
+        """
+        cls.LIMITER.acquire(max_wait=cls.MAX_RATE_LIMIT_WAIT)
+    
+    @classmethod
+    async def _wait_for_rate_limit_async(cls):
+        """_wait_for_rate_limit() without blocking the event loop"""
+        await cls.LIMITER.acquire_async(max_wait=cls.MAX_RATE_LIMIT_WAIT)
+    
+    @classmethod
+    def geocode_stream(cls, addresses: List[str]) -> Iterator[Tuple[List[int], Optional[Dict]]]:
+        """
+        Geocode many addresses, yielding results as they resolve
+        
+        Addresses are deduplicated after normalization (except those
+        normalizing to an empty key, looked up one by one). Gazetteer and cache
+        hits are yielded first, without waiting; the rest go through the
+        rate-limited Nominatim queue, BATCH_WORKERS at a time (so a batch
+        never fills the queue and other users' searches keep their turn).
+        
+        Args:
+            addresses: List of address strings
+        
+        Yields:
+            (indexes in addresses sharing the result, result or None)
         """
-        current_time = time.time()
-        time_since_last = current_time - cls.LAST_REQUEST_TIME
+        groups = {}
+        for index, address in enumerate(addresses):
+            if not isinstance(address, str) or not address.strip():
+                yield [index], None
+                continue
+            key = normalize_address(address)
+            groups.setdefault(key or index, []).append(index)    # empty key: alone
+        
+        misses = []
+        for group, indexes in groups.items():
+            key = group if isinstance(group, str) else ''
+            result = cls._geocode_local(addresses[indexes[0]], key)
+            if result is MISS:
+                misses.append((key, indexes))
+            else:
+                yield indexes, result
         
-        if time_since_last < cls.MIN_REQUEST_INTERVAL:
-            sleep_time = cls.MIN_REQUEST_INTERVAL - time_since_last
-            time.sleep(sleep_time)
+        if not misses:
+            return
         
-        cls.LAST_REQUEST_TIME = time.time()
+        executor = ThreadPoolExecutor(max_workers=cls.BATCH_WORKERS)
+        try:
+            futures = {
+                executor.submit(cls._geocode_upstream, addresses[indexes[0]], key): indexes
+                for key, indexes in misses
+            }
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        finally:
+            # Client gone: drop the lookups that have not started
+            executor.shutdown(wait=False, cancel_futures=True)
     
     @classmethod
     def geocode_multiple(cls, addresses: list) -> Dict[str, Optional[Dict]]:
@@ -113,8 +332,9 @@ class GeocodingService:
         """
         results = {}
         
-        for address in addresses:
-            results[address] = cls.geocode_address(address)
+        for indexes, result in cls.geocode_stream(addresses):
+            for index in indexes:
+                results[addresses[index]] = result
             
         return results
 
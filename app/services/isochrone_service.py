@@ -0,0 +1,132 @@
+"""
+Isochrone Service - Area reachable from a point within a time budget
+
+One one-to-all RAPTOR search, cut off at the budget, gives the earliest
+arrival at every stop (walking at WALKING_SPEED_M_PER_MIN, riding at
+MINUTES_PER_STOP per stop as estimate_bus_duration() does). The area
+around each reached stop is what the time left allows to walk, capped at
+the walking distance of the searches; the polygon is the convex hull of
+those areas, an outer bound of the reachable area.
+
+Results are cached per origin snapped to a grid: the search runs from the
+cell center, so every point of a cell gets the same isochrone.
+"""
+import os
+from typing import Dict
+
+import numpy as np
+
+from app.services.distance_service import distance_service
+from app.services.raptor_service import INF
+from app.services.route_cache import RouteCache
+from app.services.transfer_routing_service import transfer_routing_service
+from app.utils.cache import snap_to_grid
+from app.utils.geometry import circle, convex_hull
+
+
+class IsochroneService:
+    """Stops and area reachable within a number of minutes"""
+
+    MAX_MINUTES = 180
+    GRID = float(os.getenv('ISOCHRONE_GRID', 100))                      # meters
+    CACHE_ENTRIES = int(os.getenv('ISOCHRONE_CACHE_ENTRIES', 500))
+
+    def __init__(self, grid: float = GRID, cache_entries: int = CACHE_ENTRIES):
+        """
+        Args:
+            grid: Grid size in meters origins are snapped to (0 = no snapping, no caching)
+            cache_entries: Isochrones kept in memory
+        """
+        self.snapshot = transfer_routing_service.snapshot
+        self.raptor = transfer_routing_service.raptor
+        self.max_walking_distance = transfer_routing_service.max_walking_distance
+        self.cache = RouteCache(grid=grid, max_entries=cache_entries, name='isochrone')
+
+    def arrival_times(self, lat: float, lon: float, minutes: float, max_transfers: int = 2):
+        """
+        Earliest arrival at every stop entry within the budget
+
+        Returns:
+            (minutes per entry (inf = not reached), buses used per entry)
+        """
+        result = self.raptor.search(lat, lon, max_transfers=max_transfers, time_limit=minutes)
+
+        times = np.full(self.snapshot.stop_count, INF)
+        buses = np.zeros(self.snapshot.stop_count, dtype=np.int64)
+        # By number of buses: ties go to fewer buses
+        labels = [(0, result.board[0])]
+        for k in range(1, result.max_rides + 1):
+            labels.append((k, result.ride[k]))
+            if k < len(result.board):
+                labels.append((k, result.board[k]))
+        for k, label in labels:
+            better = label < times
+            times[better] = label[better]
+            buses[better] = k
+
+        return times, buses
+
+    def _isochrone(self, lat: float, lon: float, minutes: float, max_transfers: int) -> Dict:
+        snapshot = self.snapshot
+        walk_speed = distance_service.WALKING_SPEED_M_PER_MIN
+        times, buses = self.arrival_times(lat, lon, minutes, max_transfers)
+
+        # Fastest first, then one stop per location (both directions often share one)
+        reached = np.flatnonzero(times <= minutes)
+        reached = reached[np.argsort(times[reached], kind='stable')]
+        locations = np.stack([snapshot.stop_lat_e6[reached], snapshot.stop_lon_e6[reached]], axis=1)
+        _, first = np.unique(locations, axis=0, return_index=True)
+        reached = reached[np.sort(first)]
+
+        stops = []
+        area = circle(lat, lon, min(minutes * walk_speed, self.max_walking_distance))
+        for entry in reached.tolist():
+            stop = snapshot.stop_dict(entry)
+            stops.append({
+                'stop_id': entry,
+                'name': stop['stop_name'],
+                'latitude': stop['latitude'],
+                'longitude': stop['longitude'],
+                'minutes': round(float(times[entry]), 1),
+                'buses': int(buses[entry])
+            })
+            walk = min((minutes - times[entry]) * walk_speed, self.max_walking_distance)
+            area += circle(stop['latitude'], stop['longitude'], walk, count=8)
+
+        return {
+            'network_version': snapshot.version,
+            'origin': {'latitude': lat, 'longitude': lon},
+            'minutes': minutes,
+            'max_transfers': max_transfers,
+            'stops_count': len(stops),
+            'stops': stops,
+            'polygon': [[round(value, 6) for value in point] for point in convex_hull(area)]
+        }
+
+    def isochrone(self, lat: float, lon: float, minutes: float, max_transfers: int = 2) -> Dict:
+        """
+        Stops and area reachable from a point
+
+        Args:
+            lat, lon: Origin (snapped to the grid)
+            minutes: Time budget
+            max_transfers: Maximum number of transfers
+
+        Returns:
+            {
+                'network_version', 'origin' (snapped), 'minutes', 'max_transfers',
+                'stops_count', 'stops': [{stop_id, name, latitude, longitude,
+                minutes, buses}] fastest first, 'polygon': closed ring of [lat, lon]
+            }
+            Shared between requests: do not modify.
+        """
+        lat, lon = snap_to_grid(self.cache.grid, lat, lon)
+        minutes = float(minutes)
+        return self.cache.get_or_compute(
+            'isochrone', (lat, lon), {'minutes': minutes, 'max_transfers': max_transfers},
+            lambda: self._isochrone(lat, lon, minutes, max_transfers)
+        )
+
+
+# Create service instance
+isochrone_service = IsochroneService()
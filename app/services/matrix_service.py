@@ -0,0 +1,119 @@
+"""
+Matrix Service - Travel times between sets of origins and destinations
+
+A one-to-all RAPTOR search from an origin already holds the arrival time
+at every stop for every number of buses, so one search per origin is
+enough: each destination reads the best arrival over the stops within
+walking distance of it. Destination stops are looked up once for the
+whole matrix.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.distance_service import distance_service
+from app.services.raptor_service import INF
+from app.services.transfer_routing_service import transfer_routing_service
+
+# (latitude, longitude)
+Point = Tuple[float, float]
+
+
+class MatrixService:
+    """N x M matrices of best bus travel times and transfers"""
+
+    MAX_POINTS = 500    # origins, and destinations, per matrix
+
+    def __init__(self):
+        self.snapshot = transfer_routing_service.snapshot
+        self.raptor = transfer_routing_service.raptor
+
+    def _destination_stops(self, destinations: Sequence[Point]):
+        """Stops near every destination, flattened: (entries, walk minutes, destination index)"""
+        entries, distances, owners = [], [], []
+        for index, (lat, lon) in enumerate(destinations):
+            near, near_distances = transfer_routing_service.stops_near(lat, lon)
+            entries.append(near)
+            distances.append(near_distances)
+            owners.append(np.full(len(near), index, dtype=np.int64))
+
+        walk_minutes = np.concatenate(distances) / distance_service.WALKING_SPEED_M_PER_MIN
+        return np.concatenate(entries).astype(np.int64), walk_minutes, np.concatenate(owners)
+
+    def _row(self, origin: Point, destination_count: int, entries: np.ndarray,
+             walk_minutes: np.ndarray, owners: np.ndarray, max_transfers: int,
+             time_limit: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Best time and transfers from one origin to every destination"""
+        result = self.raptor.search(*origin, max_transfers=max_transfers, time_limit=time_limit)
+
+        best = np.full(destination_count, INF)
+        rides = np.zeros(destination_count, dtype=np.int64)
+        for k in range(1, result.max_rides + 1):
+            times = np.full(destination_count, INF)
+            np.minimum.at(times, owners, result.ride[k][entries] + walk_minutes)
+            # Fewer buses win ties, as in destination_arrivals()
+            better = times < best
+            best[better] = times[better]
+            rides[better] = k
+
+        best[best > time_limit] = INF
+        return best, rides - 1
+
+    def travel_times(self, origins: Sequence[Point], destinations: Sequence[Point],
+                     max_transfers: int = 2, max_minutes: Optional[float] = None) -> Dict:
+        """
+        Best bus travel time from every origin to every destination
+
+        Times are those of the fastest journey find_journeys() returns for
+        the pair (walk, buses, walk; at least one bus), before rounding.
+
+        Args:
+            origins, destinations: (latitude, longitude) points
+            max_transfers: Maximum number of transfers per journey
+            max_minutes: Leave pairs slower than this unreachable (also
+                         prunes the searches)
+
+        Returns:
+            {
+                'network_version', 'origins', 'destinations',
+                'times_minutes': rows per origin, one value per destination
+                                 (minutes, 1 decimal; None = unreachable),
+                'transfers': same shape (None = unreachable),
+                'reachable': number of reachable pairs
+            }
+        """
+        destination_count = len(destinations)
+        time_limit = INF if max_minutes is None else float(max_minutes)
+        entries, walk_minutes, owners = self._destination_stops(destinations)
+
+        times = np.full((len(origins), destination_count), INF)
+        transfers = np.zeros((len(origins), destination_count), dtype=np.int64)
+        rows = {}   # repeated origins are searched once
+        for i, origin in enumerate(origins):
+            origin = (float(origin[0]), float(origin[1]))
+            if origin not in rows:
+                rows[origin] = self._row(origin, destination_count, entries, walk_minutes,
+                                         owners, max_transfers, time_limit)
+            times[i], transfers[i] = rows[origin]
+
+        reachable = np.isfinite(times)
+        return {
+            'network_version': self.snapshot.version,
+            'origins': len(origins),
+            'destinations': destination_count,
+            'times_minutes': self._rows(np.round(times, 1), reachable),
+            'transfers': self._rows(transfers, reachable),
+            'reachable': int(reachable.sum())
+        }
+
+    @staticmethod
+    def _rows(values: np.ndarray, reachable: np.ndarray) -> List[List]:
+        """Matrix as nested lists, None where unreachable"""
+        return [
+            [value if ok else None for value, ok in zip(row, row_ok)]
+            for row, row_ok in zip(values.tolist(), reachable.tolist())
+        ]
+
+
+# Create service instance
+matrix_service = MatrixService()
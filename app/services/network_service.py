@@ -0,0 +1,166 @@
+"""
+Network Service - Static network data for clients
+
+Payloads only depend on the network snapshot, so they are built (and
+compressed) once per network version and served with the version as ETag.
+"""
+import threading
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+from app.utils.compression import PrecompressedPayload
+from app.utils.data_loader import data_loader
+from app.utils.geometry import encode_polyline
+from app.utils.json_provider import json_bytes
+
+
+class NetworkService:
+    """Stop table, line list and line details: per-version network payloads"""
+
+    def __init__(self):
+        self.snapshot = data_loader.load_snapshot()
+        self._stop_table = None
+        self._payloads: Dict[str, PrecompressedPayload] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> str:
+        """Network version, used as ETag of every payload"""
+        return self.snapshot.version
+
+    def stop_table(self) -> Dict:
+        """
+        Every stop entry, in columns (stop id = position in the columns)
+
+        Compact route results refer to stops by these ids. Names and route
+        ids are interned: 'name' and 'route' hold indexes into 'names' and
+        'routes'.
+
+        Returns:
+            {
+                'network_version', 'count', 'names', 'routes',
+                'name', 'number', 'route', 'latitude', 'longitude'
+            }
+        """
+        if self._stop_table is None:
+            snapshot = self.snapshot
+            name_sids, names = np.unique(snapshot.stop_name_sid, return_inverse=True)
+
+            self._stop_table = {
+                'network_version': snapshot.version,
+                'count': snapshot.stop_count,
+                'names': [snapshot.string(sid) for sid in name_sids.tolist()],
+                'routes': [snapshot.string(sid) for sid in snapshot.route_id_sid.tolist()],
+                'name': names.tolist(),
+                'number': snapshot.stop_number.tolist(),
+                'route': snapshot.stop_route.tolist(),
+                'latitude': snapshot.stop_lat.round(6).tolist(),
+                'longitude': snapshot.stop_lon.round(6).tolist()
+            }
+        return self._stop_table
+
+    def _line_polyline(self, route_idx: int) -> str:
+        """Encoded polyline through the stops of a route"""
+        entries = self.snapshot.route_slice(route_idx)
+        return encode_polyline(zip(
+            self.snapshot.stop_lat[entries].tolist(), self.snapshot.stop_lon[entries].tolist()
+        ))
+
+    def _line_info(self, route_idx: int) -> Dict:
+        snapshot = self.snapshot
+        entries = snapshot.route_slice(route_idx)
+        return {
+            'route_id': snapshot.string(snapshot.route_id_sid[route_idx]),
+            'bus_line': snapshot.string(snapshot.route_bus_name_sid[route_idx]),
+            'type': snapshot.string(snapshot.route_type_sid[route_idx]),
+            'direction': snapshot.string(snapshot.route_direction_sid[route_idx]),
+            'stops_count': entries.stop - entries.start
+        }
+
+    def network(self) -> Dict:
+        """
+        Every line of the network with its geometry
+
+        Lines cover the stop ids first_stop_id to last_stop_id (inclusive)
+        of the stop table; 'line' is an encoded polyline through them.
+        """
+        lines = []
+        for route_idx in range(self.snapshot.route_count):
+            entries = self.snapshot.route_slice(route_idx)
+            lines.append({
+                **self._line_info(route_idx),
+                'first_stop_id': entries.start,
+                'last_stop_id': entries.stop - 1,
+                'line': self._line_polyline(route_idx)
+            })
+
+        return {
+            'network_version': self.version,
+            'type': self.snapshot.network_type,
+            'metadata': self.snapshot.metadata,
+            'route_count': self.snapshot.route_count,
+            'stop_count': self.snapshot.stop_count,
+            'lines': lines
+        }
+
+    def line(self, route_idx: int) -> Dict:
+        """One line with its stops (stop_id, name, number, coordinates)"""
+        snapshot = self.snapshot
+        entries = snapshot.route_slice(route_idx)
+        stops = []
+        for entry in range(entries.start, entries.stop):
+            stop = snapshot.stop_dict(entry)
+            stops.append({
+                'stop_id': entry,
+                'name': stop['stop_name'],
+                'number': stop['stop_number'],
+                'latitude': stop['latitude'],
+                'longitude': stop['longitude']
+            })
+
+        return {
+            'network_version': self.version,
+            **self._line_info(route_idx),
+            'stops': stops,
+            'line': self._line_polyline(route_idx)
+        }
+
+    def _payload(self, key: str, build: Callable[[], Dict]) -> PrecompressedPayload:
+        """Payload built and compressed on first use, then kept"""
+        payload = self._payloads.get(key)
+        if payload is None:
+            with self._lock:
+                payload = self._payloads.get(key)
+                if payload is None:
+                    etag = self.version if key == 'stops' else f'{self.version}.{key}'
+                    payload = self._payloads[key] = PrecompressedPayload(
+                        json_bytes(build()), etag=etag
+                    )
+        return payload
+
+    def stop_table_payload(self) -> PrecompressedPayload:
+        """stop_table() serialized and compressed, ETag = network version"""
+        return self._payload('stops', self.stop_table)
+
+    def network_payload(self) -> PrecompressedPayload:
+        """network() serialized and compressed"""
+        return self._payload('network', self.network)
+
+    def line_payload(self, route_id: str) -> Optional[PrecompressedPayload]:
+        """line() of a route serialized and compressed, None if there is no such route"""
+        route_idx = self.snapshot.route_index(route_id)
+        if route_idx is None:
+            return None
+        return self._payload(f'line-{route_idx}', lambda: self.line(route_idx))
+
+    def warm_up(self):
+        """Build every payload now instead of on first request"""
+        self.stop_table_payload()
+        self.network_payload()
+        for route_idx in range(self.snapshot.route_count):
+            self._payload(f'line-{route_idx}', lambda: self.line(route_idx))
+
+
+# Create service instance
+network_service = NetworkService()
@@ -0,0 +1,296 @@
+"""
+RAPTOR Service - Round-based transit search over the compiled network
+
+Round k of the search computes the earliest arrival at every stop using
+exactly k buses (RAPTOR, Delling et al.), so a single pass yields the
+optimal journey for every number of transfers. The network has no
+timetables: riding costs DistanceService.MINUTES_PER_STOP per stop and
+transfers walk along the precomputed footpath table.
+"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.distance_service import distance_service
+from app.utils.data_loader import data_loader
+
+INF = np.inf
+
+
+class RaptorResult:
+    """
+    Labels of one search, kept per round so journeys can be rebuilt
+
+    board[k][e]: earliest time (minutes) standing at entry e ready to board
+                 bus number k + 1 (k = 0 is the walk from the origin)
+    ride[k][e]:  earliest arrival at entry e on bus number k (k >= 1)
+    """
+
+    def __init__(self, board: List[np.ndarray], board_from: List[np.ndarray],
+                 board_walk: List[np.ndarray], ride: List[np.ndarray],
+                 ride_from: List[np.ndarray]):
+        self.board = board
+        self.board_from = board_from
+        self.board_walk = board_walk
+        self.ride = ride
+        self.ride_from = ride_from
+
+    @property
+    def max_rides(self) -> int:
+        return len(self.ride) - 1
+
+    def destination_arrivals(self, targets: np.ndarray, distances: np.ndarray,
+                             min_rides: int = 1) -> List[Tuple[float, int, int, float]]:
+        """
+        Journeys ending with a walk from one of the target stops
+
+        A journey with k buses is kept only if it is faster than every
+        journey with fewer buses (Pareto optimal in time and transfers).
+
+        Args:
+            targets: Stop entries within walking distance of the destination
+            distances: Walking distance from each target to the destination
+            min_rides: Ignore journeys with fewer buses
+
+        Returns:
+            List of (total minutes, buses, last stop entry, final walk meters),
+            fastest first
+        """
+        candidates = []
+        best_fewer = INF
+        walk_minutes = np.asarray(distances, dtype=np.float64) / distance_service.WALKING_SPEED_M_PER_MIN
+
+        for rides in range(max(min_rides, 1), self.max_rides + 1):
+            times = self.ride[rides][targets] + walk_minutes
+            for i in np.flatnonzero(times < best_fewer):
+                candidates.append((float(times[i]), rides, int(targets[i]), float(distances[i])))
+            if len(times):
+                best_fewer = min(best_fewer, float(times.min()))
+
+        candidates.sort(key=lambda c: (c[0], c[1]))
+        return candidates
+
+    def journey(self, rides: int, entry: int) -> List[Dict]:
+        """
+        Rebuild the legs of the journey reaching entry on bus number `rides`
+
+        Returns:
+            Alternating walk / bus legs:
+            {'type': 'walk', 'from': entry or None (origin), 'to': entry, 'distance': meters}
+            {'type': 'bus', 'board': entry, 'alight': entry}
+        """
+        legs = []
+        alight = entry
+
+        for k in range(rides, 0, -1):
+            board = int(self.ride_from[k][alight])
+            legs.append({'type': 'bus', 'board': board, 'alight': alight})
+
+            walked_from = int(self.board_from[k - 1][board])
+            legs.append({
+                'type': 'walk',
+                'from': walked_from if walked_from >= 0 else None,
+                'to': board,
+                'distance': float(self.board_walk[k - 1][board])
+            })
+            alight = walked_from
+
+        legs.reverse()
+        return legs
+
+
+class RaptorService:
+    """Round-based (RAPTOR) search engine over route/stop arrays"""
+
+    MAX_TRANSFERS = 3
+
+    def __init__(self, max_walking_distance: int = 500):
+        self.max_walking_distance = max_walking_distance
+        self.snapshot = data_loader.load_snapshot()
+        self.stop_index = data_loader.get_stop_index(max_walking_distance)
+
+        snapshot = self.snapshot
+        # Line of every entry: no transfers between two variants of the same bus name
+        self._line = snapshot.route_bus_name_sid[snapshot.stop_route]
+        # Footpath table built with a smaller radius: walks come from the stop index
+        self._use_footpath_table = snapshot.footpath_radius >= max_walking_distance
+
+    def search(self, lat: float, lon: float, max_transfers: int = 2,
+               targets: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+               min_transfers: int = 0,
+               time_limit: float = INF,
+               origin: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> RaptorResult:
+        """
+        Run a one-to-all search from a point
+
+        Args:
+            lat, lon: Origin coordinates
+            max_transfers: Number of transfers (rounds - 1) to explore
+            targets: Optional (entries, walking distances) around a destination,
+                     used to prune labels that cannot improve on it
+            min_transfers: Journeys with fewer transfers don't prune the others
+            time_limit: Discard labels later than this many minutes
+            origin: Optional (entries, walking distances) around the origin,
+                    if already computed
+
+        Returns:
+            RaptorResult
+        """
+        snapshot = self.snapshot
+        stop_count = snapshot.stop_count
+        walk_speed = distance_service.WALKING_SPEED_M_PER_MIN
+        min_rides = min_transfers + 1
+
+        best_board = np.full(stop_count, INF)
+        best_ride = np.full(stop_count, INF)
+        dest_bound = INF
+        if targets is not None:
+            target_entries, target_distances = targets
+            target_walk = np.asarray(target_distances, dtype=np.float64) / walk_speed
+
+        # Round 0: walk from the origin
+        if origin is None:
+            origin = self.stop_index.query_radius(lat, lon, self.max_walking_distance)
+        entries, distances = origin
+        board0 = np.full(stop_count, INF)
+        board0[entries] = distances / walk_speed
+        board0[board0 > time_limit] = INF
+        walk0 = np.zeros(stop_count)
+        walk0[entries] = distances
+
+        board = [board0]
+        board_from = [np.full(stop_count, -1, dtype=np.int32)]
+        board_walk = [walk0]
+        ride = [np.full(stop_count, INF)]
+        ride_from = [np.full(stop_count, -1, dtype=np.int32)]
+        if min_rides <= 1:
+            best_board = board0.copy()
+
+        for k in range(1, max_transfers + 2):
+            ride_k, ride_from_k = self._scan_routes(board[k - 1])
+
+            accept = (ride_k < best_ride) & (ride_k < dest_bound) & (ride_k <= time_limit)
+            ride_k[~accept] = INF
+            ride_from_k[~accept] = -1
+            ride.append(ride_k)
+            ride_from.append(ride_from_k)
+
+            if k >= min_rides:
+                np.minimum(best_ride, ride_k, out=best_ride)
+                if targets is not None and len(target_entries):
+                    dest_bound = min(dest_bound, float(np.min(ride_k[target_entries] + target_walk)))
+
+            if k == max_transfers + 1:
+                break
+
+            board_k, board_from_k, walk_k = self._relax_footpaths(ride_k)
+            accept = (board_k < best_board) & (board_k < dest_bound) & (board_k <= time_limit)
+            board_k[~accept] = INF
+            board_from_k[~accept] = -1
+            board.append(board_k)
+            board_from.append(board_from_k)
+            board_walk.append(walk_k)
+
+            if k + 1 >= min_rides:
+                np.minimum(best_board, board_k, out=best_board)
+
+            if not np.isfinite(board_k).any():
+                break
+
+        return RaptorResult(board, board_from, board_walk, ride, ride_from)
+
+    def _scan_routes(self, board_times: np.ndarray):
+        """
+        Ride every route from the stops where it can be boarded
+
+        Arrival at position j is min over boarding positions i < j of
+        board_times[i] + MINUTES_PER_STOP * (j - i), i.e. a running minimum
+        of board_times[i] - MINUTES_PER_STOP * i along the route.
+        """
+        snapshot = self.snapshot
+        per_stop = distance_service.MINUTES_PER_STOP
+        ride = np.full(snapshot.stop_count, INF)
+        ride_from = np.full(snapshot.stop_count, -1, dtype=np.int32)
+
+        reachable = np.flatnonzero(np.isfinite(board_times))
+        for route_idx in np.unique(snapshot.stop_route[reachable]):
+            start = int(snapshot.route_offsets[route_idx])
+            end = int(snapshot.route_offsets[route_idx + 1])
+            count = end - start
+            if count < 2:
+                continue
+
+            position = np.arange(count)
+            offset_times = board_times[start:end] - per_stop * position
+            running_min = np.minimum.accumulate(offset_times)
+
+            # Position where the running minimum was last set = boarding stop
+            new_min = np.empty(count, dtype=bool)
+            new_min[0] = True
+            np.less(offset_times[1:], running_min[:-1], out=new_min[1:])
+            boarded_at = np.maximum.accumulate(np.where(new_min, position, 0))
+
+            ride[start + 1:end] = running_min[:-1] + per_stop * position[1:]
+            ride_from[start + 1:end] = boarded_at[:-1] + start
+
+        unreached = ~np.isfinite(ride)
+        ride_from[unreached] = -1
+        return ride, ride_from
+
+    def _relax_footpaths(self, ride: np.ndarray):
+        """Walk from every stop reached by bus to the stops of other lines nearby"""
+        snapshot = self.snapshot
+        stop_count = snapshot.stop_count
+        board = np.full(stop_count, INF)
+        board_from = np.full(stop_count, -1, dtype=np.int32)
+        walk = np.zeros(stop_count)
+
+        sources = np.flatnonzero(np.isfinite(ride))
+        edge_source, edge_target, edge_distance = self._footpath_edges(sources)
+        if len(edge_source) == 0:
+            return board, board_from, walk
+
+        usable = ((edge_distance <= self.max_walking_distance) &
+                  (self._line[edge_source] != self._line[edge_target]))
+        edge_source = edge_source[usable]
+        edge_target = edge_target[usable]
+        edge_distance = edge_distance[usable]
+        edge_time = ride[edge_source] + edge_distance / distance_service.WALKING_SPEED_M_PER_MIN
+
+        # Earliest arrival per target stop
+        order = np.lexsort((edge_time, edge_target))
+        _, first = np.unique(edge_target[order], return_index=True)
+        best = order[first]
+
+        targets = edge_target[best]
+        board[targets] = edge_time[best]
+        board_from[targets] = edge_source[best]
+        walk[targets] = edge_distance[best]
+        return board, board_from, walk
+
+    def _footpath_edges(self, sources: np.ndarray):
+        """(source, target, meters) of the walks from every source entry"""
+        snapshot = self.snapshot
+        if not self._use_footpath_table:
+            edge_source, edge_target, edge_distance = [], [], []
+            for source in sources.tolist():
+                entries, distances = self.stop_index.query_radius(
+                    snapshot.stop_lat[source], snapshot.stop_lon[source], self.max_walking_distance
+                )
+                edge_source.append(np.full(len(entries), source, dtype=np.int64))
+                edge_target.append(entries)
+                edge_distance.append(distances)
+            if not edge_source:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+            return (np.concatenate(edge_source), np.concatenate(edge_target).astype(np.int64),
+                    np.concatenate(edge_distance).astype(np.float64))
+
+        starts = snapshot.footpath_offsets[sources]
+        counts = snapshot.footpath_offsets[sources + 1] - starts
+        total = int(counts.sum())
+
+        # Gather the CSR slices of all sources at once
+        first_out = np.cumsum(counts) - counts
+        edges = np.arange(total) - np.repeat(first_out, counts) + np.repeat(starts, counts)
+        return (np.repeat(sources, counts), snapshot.footpath_targets[edges],
+                snapshot.footpath_distance[edges].astype(np.float64))
@@ -0,0 +1,102 @@
+"""
+Route Cache - Reuse search results for nearby origin/destination pairs
+
+Results are keyed on the search kind, both endpoints snapped to a grid,
+the search parameters and the network version. A new network snapshot
+has a new version, so results computed on older data are never served:
+they are simply not found and age out of the LRU.
+
+Results are shared between requests and must not be modified by callers.
+"""
+import os
+from typing import Any, Callable, Dict, Tuple
+
+from app.utils.cache import MISS, TwoTierCache, grid_key
+from app.utils.data_loader import data_loader
+from app.utils.rate_limiter import SingleFlight
+
+
+class RouteCache:
+    """LRU + TTL cache of direct and transfer search results"""
+
+    GRID = float(os.getenv('ROUTE_CACHE_GRID', 25))                     # meters
+    TTL = float(os.getenv('ROUTE_CACHE_TTL', 15 * 60))                  # seconds
+    MAX_ENTRIES = int(os.getenv('ROUTE_CACHE_MAX_ENTRIES', 5000))
+    # Optional SQLite file shared by the workers (empty = memory only)
+    PATH = os.getenv('ROUTE_CACHE_PATH', '')
+
+    def __init__(self, grid: float = GRID, ttl: float = TTL,
+                 max_entries: int = MAX_ENTRIES, path: str = PATH, name: str = 'route'):
+        """
+        Initialize route cache
+
+        Args:
+            grid: Grid size in meters endpoints are snapped to (0 = no caching)
+            ttl: Time to live of a result in seconds
+            max_entries: Results kept in memory
+            path: SQLite file for a shared disk tier, or empty for memory only
+            name: What is cached, names the cache ('<name>s') in /metrics
+        """
+        self.grid = grid
+        self.cache = TwoTierCache(
+            f'{name}s', ttl=ttl, memory_entries=max_entries,
+            disk_path=path or None, disk_entries=max_entries * 10
+        )
+        # Identical searches arriving together are computed once
+        self.flights = SingleFlight(f'{name}_searches')
+
+    def key(self, kind: str, *coordinates: float, **params) -> str:
+        """
+        Cache key of a search
+
+        Args:
+            kind: Search kind, e.g. 'direct' or 'transfer'
+            *coordinates: Endpoints, e.g. start_lat, start_lon, end_lat, end_lon
+                          (snapped to the grid)
+            **params: Every other parameter the result depends on
+        """
+        options = ','.join(f'{name}={params[name]}' for name in sorted(params))
+        cells = grid_key(self.grid, *coordinates)
+        return f"{kind}:{data_loader.network_version}:{cells}:{options}"
+
+    def get_or_compute(self, kind: str, coordinates: Tuple[float, ...],
+                       params: Dict[str, Any], compute: Callable[[], Any]) -> Any:
+        """
+        Cached result of a search, computing and caching it on a miss
+
+        The result of the first search in a grid cell pair is served for
+        the whole cell pair, so walking distances may be off by up to
+        about the grid size.
+
+        Args:
+            kind: Search kind, e.g. 'direct' or 'transfer'
+            coordinates: (start_lat, start_lon, end_lat, end_lon), or the
+                         points the search depends on
+            params: Every other parameter the result depends on
+            compute: Runs the search for the exact coordinates
+
+        Returns:
+            The search result
+        """
+        if self.grid <= 0:
+            return compute()
+
+        key = self.key(kind, *coordinates, **params)
+        result = self.cache.get(key, MISS)
+        if result is not MISS:
+            return result
+
+        def search():
+            # Another request may have finished the same search meanwhile
+            cached = self.cache.get(key, MISS, count=False)
+            if cached is not MISS:
+                return cached
+            found = compute()
+            self.cache.set(key, found)
+            return found
+
+        return self.flights.do(key, search)
+
+
+# Create service instance
+route_cache = RouteCache()
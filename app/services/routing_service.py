@@ -2,6 +2,9 @@
 Routing Service - Find routes between locations
 """
 from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
 from app.services.distance_service import distance_service
 from app.utils.data_loader import data_loader
 from app.services.walking_service import walking_service
@@ -19,6 +22,20 @@ class RoutingService:
         """
         self.max_walking_distance = max_walking_distance
         self.bus_data = data_loader.load_bus_data()
+        self.snapshot = data_loader.load_snapshot()
+        self.stop_index = data_loader.get_stop_index(max_walking_distance)
+    
+    def _stop_with_distance(self, entry: int, distance: float) -> Dict:
+        """Stop dict for a snapshot entry, annotated with walking distance"""
+        route_idx = int(self.snapshot.stop_route[entry])
+        route = self.bus_data['routes'][route_idx]
+        position = entry - int(self.snapshot.route_offsets[route_idx])
+        return {
+            **route['stops'][position],
+            'distance': round(distance),
+            'position': position,
+            'entry': int(entry)
+        }
     
     def find_nearest_stop(self, lat: float, lon: float, 
                          route: Dict) -> Optional[Dict]:
@@ -32,23 +49,35 @@ class RoutingService:
         Returns:
             Nearest stop with distance, or None if none within max_walking_distance
         """
-        nearest = None
-        min_distance = float('inf')
+        route_idx = self.snapshot.route_index(route['id'])
         
-        for stop in route['stops']:
-            distance = distance_service.haversine_distance(
-                lat, lon, 
-                stop['latitude'], stop['longitude']
+        if route_idx is not None:
+            entries, distances = self.stop_index.query_radius(
+                lat, lon, self.max_walking_distance
             )
-            
-            if distance < min_distance and distance <= self.max_walking_distance:
-                min_distance = distance
-                nearest = {
-                    **stop,
-                    'distance': round(distance)
-                }
-        
-        return nearest
+            for entry, distance in zip(entries.tolist(), distances.tolist()):
+                if self.snapshot.stop_route[entry] == route_idx:
+                    return self._stop_with_distance(entry, distance)
+            return None
+        
+        # Route not part of the loaded network: scan its stops
+        if not route['stops']:
+            return None
+        
+        distances = distance_service.haversine_many(
+            lat, lon,
+            [stop['latitude'] for stop in route['stops']],
+            [stop['longitude'] for stop in route['stops']]
+        )
+        position = int(distances.argmin())
+        
+        if distances[position] > self.max_walking_distance:
+            return None
+        
+        return {
+            **route['stops'][position],
+            'distance': round(float(distances[position]))
+        }
     
     def can_travel_between_stops(self, route: Dict, 
                                  start_stop: Dict, 
@@ -76,8 +105,14 @@ class RoutingService:
                 'reason': 'Stop not found on this route'
             }
         
-        start_number = start_stop['stop_number']
-        end_number = end_stop['stop_number']
+        # Order along the route: array positions when known (O(1), robust to
+        # irregular stop numbering), stop numbers otherwise
+        if 'position' in start_stop and 'position' in end_stop:
+            start_number = start_stop['position']
+            end_number = end_stop['position']
+        else:
+            start_number = start_stop['stop_number']
+            end_number = end_stop['stop_number']
         
         # Check if same stop
         if start_number == end_number:
@@ -102,116 +137,145 @@ class RoutingService:
                 'reason': 'Would require traveling backwards (try opposite direction)'
             }
     
+    def nearest_stops_by_route(self, lat: float, lon: float) -> Dict[int, Tuple[int, float]]:
+        """
+        Nearest stop of every route within walking distance of a point
+        
+        Returns:
+            Dict route index -> (stop entry, distance in meters)
+        """
+        return self.stop_index.nearest_by_route(lat, lon, self.max_walking_distance)
+    
     def find_direct_routes(self, start_lat: float, start_lon: float,
-                          end_lat: float, end_lon: float) -> List[Dict]:
+                          end_lat: float, end_lon: float,
+                          walking_top_k: Optional[int] = None,
+                          near_start: Optional[Dict] = None,
+                          near_end: Optional[Dict] = None) -> List[Dict]:
         """
         Find all direct routes (no transfers) between two locations
         
+        Routes are ranked on straight-line walking estimates; realistic
+        walking paths (OSRM) are then fetched for the best valid routes
+        only. Other routes keep the estimates and get a path reference
+        (request body for /api/routes/walking-path) instead of a path.
+        
         Args:
             start_lat, start_lon: Starting coordinates
             end_lat, end_lon: Ending coordinates
+            walking_top_k: Number of valid routes with walking paths
+                           (None = every valid route, 0 = none)
+            near_start, near_end: nearest_stops_by_route() of each endpoint,
+                                  if already computed
         
         Returns:
             List of route options with validation results
         """
         results = []
         
-        for route in self.bus_data['routes']:
-            # Find nearest stops at start and end locations
-            start_stop = self.find_nearest_stop(start_lat, start_lon, route)
-            end_stop = self.find_nearest_stop(end_lat, end_lon, route)
+        if near_start is None or near_end is None:
+            # Only routes serving both neighbourhoods can be direct routes
+            candidate_routes = np.intersect1d(
+                self.stop_index.routes_near(start_lat, start_lon, self.max_walking_distance),
+                self.stop_index.routes_near(end_lat, end_lon, self.max_walking_distance)
+            )
+            if not len(candidate_routes):
+                return results
             
-            if start_stop and end_stop:
-                # Validate if travel is possible
-                validation = self.can_travel_between_stops(route, start_stop, end_stop)
-                
-                # Calculate walking distances and times
-                walking_to_start = start_stop['distance']
-                walking_to_end = end_stop['distance']
-                walking_time_start = round(
-                    distance_service.calculate_walking_time(walking_to_start)
-                )
-                walking_time_end = round(
-                    distance_service.calculate_walking_time(walking_to_end)
-                )
-                
-                # Calculate total time if valid
-                total_time = None
-                if validation['valid']:
-                    total_time = (
-                        walking_time_start + 
-                        validation['estimated_minutes'] + 
-                        walking_time_end
-                    )
-                    # Get realistic walking path to start stop
-                walk_to_start = walking_service.get_walking_route(
-                    start_lat, start_lon,
-                    start_stop['latitude'], start_stop['longitude']
+            # Nearest stop of each candidate route around each endpoint
+            near_start = self.stop_index.nearest_by_route(
+                start_lat, start_lon, self.max_walking_distance, candidate_routes
+            )
+            near_end = self.stop_index.nearest_by_route(
+                end_lat, end_lon, self.max_walking_distance, candidate_routes
+            )
+        
+        for route_idx in sorted(near_start.keys() & near_end.keys()):
+            route = self.bus_data['routes'][route_idx]
+            start_stop = self._stop_with_distance(*near_start[route_idx])
+            end_stop = self._stop_with_distance(*near_end[route_idx])
+            
+            # Validate if travel is possible
+            validation = self.can_travel_between_stops(route, start_stop, end_stop)
+            
+            # Calculate walking distances and times
+            walking_to_start = start_stop['distance']
+            walking_to_end = end_stop['distance']
+            walking_time_start = round(
+                distance_service.calculate_walking_time(walking_to_start)
+            )
+            walking_time_end = round(
+                distance_service.calculate_walking_time(walking_to_end)
+            )
+            
+            # Calculate total time if valid
+            total_time = None
+            if validation['valid']:
+                total_time = (
+                    walking_time_start + 
+                    validation['estimated_minutes'] + 
+                    walking_time_end
                 )
-                if not walk_to_start:
-                    walk_to_start = walking_service.get_straight_line_fallback(
+            
+            # Get intermediate stops between start and end
+            intermediate_stops = []
+            if validation['valid']:
+                first_entry = start_stop['entry']
+                stops = route['stops'][start_stop['position']:end_stop['position'] + 1]
+                for offset, stop in enumerate(stops):
+                    intermediate_stops.append({
+                        'stop_id': first_entry + offset,
+                        'name': stop['stop_name'],
+                        'number': stop['stop_number'],
+                        'coordinates': {
+                            'latitude': stop['latitude'],
+                            'longitude': stop['longitude']
+                        }
+                    })
+            
+            results.append({
+                'bus_line': route['bus_name'],
+                'direction': route['direction'],
+                'route_id': route['id'],
+                'valid': validation['valid'],
+                'start_stop': {
+                    'stop_id': start_stop['entry'],
+                    'name': start_stop['stop_name'],
+                    'number': start_stop['stop_number'],
+                    'coordinates': {
+                        'latitude': start_stop['latitude'],
+                        'longitude': start_stop['longitude']
+                    }
+                },
+                'end_stop': {
+                    'stop_id': end_stop['entry'],
+                    'name': end_stop['stop_name'],
+                    'number': end_stop['stop_number'],
+                    'coordinates': {
+                        'latitude': end_stop['latitude'],
+                        'longitude': end_stop['longitude']
+                    }
+                },
+                'intermediate_stops': intermediate_stops,
+                'walking': {
+                    'to_start_meters': walking_to_start,
+                    'to_start_minutes': walking_time_start,
+                    'to_start_path': None,
+                    'to_start_path_ref': self._walking_path_ref(
                         start_lat, start_lon,
                         start_stop['latitude'], start_stop['longitude']
-                    )
-
-                # Get realistic walking path from end stop
-                walk_from_end = walking_service.get_walking_route(
-                    end_stop['latitude'], end_stop['longitude'],
-                    end_lat, end_lon
-                )
-                if not walk_from_end:
-                    walk_from_end = walking_service.get_straight_line_fallback(
+                    ),
+                    'from_end_meters': walking_to_end,
+                    'from_end_minutes': walking_time_end,
+                    'from_end_path': None,
+                    'from_end_path_ref': self._walking_path_ref(
                         end_stop['latitude'], end_stop['longitude'],
                         end_lat, end_lon
-                    )
-                
- # Get intermediate stops between start and end
-                intermediate_stops = []
-                if validation['valid']:
-                    for stop in route['stops']:
-                        if start_stop['stop_number'] <= stop['stop_number'] <= end_stop['stop_number']:
-                            intermediate_stops.append({
-                                'name': stop['stop_name'],
-                                'number': stop['stop_number'],
-                                'coordinates': {
-                                    'latitude': stop['latitude'],
-                                    'longitude': stop['longitude']
-                                }
-                            })
-                
-                results.append({
-                    'bus_line': route['bus_name'],
-                    'direction': route['direction'],
-                    'route_id': route['id'],
-                    'valid': validation['valid'],
-                    'start_stop': {
-                        'name': start_stop['stop_name'],
-                        'number': start_stop['stop_number'],
-                        'coordinates': {
-                            'latitude': start_stop['latitude'],
-                            'longitude': start_stop['longitude']
-                        }
-                    },
-                    'end_stop': {
-                        'name': end_stop['stop_name'],
-                        'number': end_stop['stop_number'],
-                        'coordinates': {
-                            'latitude': end_stop['latitude'],
-                            'longitude': end_stop['longitude']
-                        }
-                    },
-                    'intermediate_stops': intermediate_stops,
-                    'walking': {
-                        'to_start_meters': walk_to_start['distance_meters'],
-                        'to_start_minutes': round(walk_to_start['duration_minutes']),
-                        'to_start_path': walk_to_start['path'],  
-                        'from_end_meters': walk_from_end['distance_meters'],
-                        'from_end_minutes': round(walk_from_end['duration_minutes']),
-                        'from_end_path': walk_from_end['path']  
-                    },
-                    'validation': validation,
-                    'total_time_minutes': total_time
-                })
+                    ),
+                    'estimated': True
+                },
+                'validation': validation,
+                'total_time_minutes': total_time
+            })
         
         # Sort results: valid routes first, then by total time
         results.sort(key=lambda x: (
@@ -219,7 +283,42 @@ class RoutingService:
             x['total_time_minutes'] if x['total_time_minutes'] else float('inf')
         ))
         
+        # Realistic walking paths for the best valid routes only, fetched concurrently
+        valid_results = [r for r in results if r['valid']]
+        if walking_top_k is not None:
+            valid_results = valid_results[:walking_top_k]
+        self._resolve_walking([r['walking'] for r in valid_results])
+        
         return results
+    
+    @staticmethod
+    def _walking_path_ref(start_lat: float, start_lon: float,
+                          end_lat: float, end_lon: float) -> Dict:
+        """Request body resolving a walking path via /api/routes/walking-path"""
+        return {
+            'start_lat': start_lat,
+            'start_lon': start_lon,
+            'end_lat': end_lat,
+            'end_lon': end_lon
+        }
+    
+    def _resolve_walking(self, walkings: List[Dict]):
+        """Replace walking estimates with realistic paths (OSRM)"""
+        legs = [
+            (walking, leg, walking.pop(f'{leg}_path_ref'))
+            for walking in walkings
+            for leg in ('to_start', 'from_end')
+        ]
+        walks = walking_service.get_walking_routes([
+            (ref['start_lat'], ref['start_lon'], ref['end_lat'], ref['end_lon'])
+            for _, _, ref in legs
+        ])
+        
+        for (walking, leg, _), walk in zip(legs, walks):
+            walking[f'{leg}_meters'] = walk['distance_meters']
+            walking[f'{leg}_minutes'] = round(walk['duration_minutes'])
+            walking[f'{leg}_path'] = walk['path']
+            walking['estimated'] = False
 
 
 # Create service instance
@@ -0,0 +1,85 @@
+"""
+Search Pipeline - Resolve both ends of an address search concurrently
+
+Both endpoints are resolved together on the event loop: each geocodes
+its address, then immediately looks up the stops around it (in the
+async_io thread pool), while the other may still be waiting for
+Nominatim. Every stage is timed so the response can show where the time
+went.
+"""
+import asyncio
+import time
+from typing import Any, Callable, Dict
+
+from app.services.geocoding_service import geocoding_service
+from app.utils.async_io import run_blocking
+
+
+def elapsed_ms(start: float) -> float:
+    """Milliseconds since a time.perf_counter() value"""
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+class SearchPipeline:
+    """Concurrent geocoding + candidate lookup for the two ends of a search"""
+
+    async def _resolve_endpoint(self, name: str, address: str,
+                                candidates: Callable[[float, float], Any]) -> Dict:
+        timings = {}
+
+        start = time.perf_counter()
+        location = await geocoding_service.geocode_address_async(address)
+        timings[f'geocode_{name}'] = elapsed_ms(start)
+
+        found = None
+        if location:
+            start = time.perf_counter()
+            found = await run_blocking(candidates, location['latitude'], location['longitude'])
+            timings[f'candidates_{name}'] = elapsed_ms(start)
+
+        return {'location': location, 'candidates': found, 'timings': timings}
+
+    async def resolve_async(self, from_address: str, to_address: str,
+                            candidates: Callable[[float, float], Any]) -> Dict:
+        """
+        Geocode both addresses and look up their candidate stops
+
+        Args:
+            from_address, to_address: Addresses to resolve
+            candidates: Called with (lat, lon) of each endpoint as soon as
+                        it is geocoded, e.g. routing_service.nearest_stops_by_route
+
+        Returns:
+            {
+                'from': geocoding result or None,
+                'to': geocoding result or None,
+                'from_candidates': candidates(from) or None,
+                'to_candidates': candidates(to) or None,
+                'timings_ms': {'geocode_from', 'candidates_from',
+                               'geocode_to', 'candidates_to', 'resolve'}
+            }
+        """
+        start = time.perf_counter()
+        origin, destination = await asyncio.gather(
+            self._resolve_endpoint('from', from_address, candidates),
+            self._resolve_endpoint('to', to_address, candidates)
+        )
+        return self._resolved(origin, destination, start)
+
+    @staticmethod
+    def _resolved(origin: Dict, destination: Dict, start: float) -> Dict:
+        return {
+            'from': origin['location'],
+            'to': destination['location'],
+            'from_candidates': origin['candidates'],
+            'to_candidates': destination['candidates'],
+            'timings_ms': {
+                **origin['timings'],
+                **destination['timings'],
+                'resolve': elapsed_ms(start)
+            }
+        }
+
+
+# Create service instance
+search_pipeline = SearchPipeline()
@@ -0,0 +1,192 @@
+"""
+Tile Service - Stops and lines intersecting a map tile (z/x/y)
+
+Tiles use the Web Mercator scheme of the base map, so the client can
+request exactly the tiles it shows. A tile holds the lines whose stop to
+stop segments cross it (as encoded polylines simplified for its zoom) and,
+from STOP_MIN_ZOOM on, its stops, found with the spatial index. Tiles are
+built on first request, then kept compressed per network version.
+"""
+import math
+import os
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from app.services.distance_service import distance_service
+from app.utils.cache import LRUCache, MISS
+from app.utils.compression import PrecompressedPayload
+from app.utils.data_loader import data_loader
+from app.utils.geometry import encode_polyline, simplify, zoom_tolerance
+from app.utils.json_provider import json_bytes
+
+# (south, west, north, east) in degrees
+Bounds = Tuple[float, float, float, float]
+
+
+def tile_bounds(z: int, x: int, y: int) -> Bounds:
+    """Bounds of a Web Mercator tile"""
+    n = 2 ** z
+
+    def latitude(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return latitude(y + 1), x / n * 360 - 180, latitude(y), (x + 1) / n * 360 - 180
+
+
+def tiles_covering(bounds: Bounds, z: int) -> Iterable[Tuple[int, int]]:
+    """(x, y) of the tiles of zoom z covering bounds"""
+    south, west, north, east = bounds
+    n = 2 ** z
+
+    def column(lon):
+        return min(n - 1, int((lon + 180) / 360 * n))
+
+    def row(lat):
+        lat = math.radians(lat)
+        return min(n - 1, int((1 - math.asinh(math.tan(lat)) / math.pi) / 2 * n))
+
+    for x in range(column(west), column(east) + 1):
+        for y in range(row(north), row(south) + 1):
+            yield x, y
+
+
+class TileService:
+    """Builds and caches network tiles"""
+
+    MIN_ZOOM = 8
+    MAX_ZOOM = 18
+    STOP_MIN_ZOOM = int(os.getenv('TILE_STOP_MIN_ZOOM', 14))   # fewer stops would mislead
+    CACHE_ENTRIES = int(os.getenv('TILE_CACHE_ENTRIES', 20000))
+
+    def __init__(self, cache_entries: int = CACHE_ENTRIES):
+        self.snapshot = data_loader.load_snapshot()
+        self.stop_index = data_loader.get_stop_index()
+        self.cache = LRUCache(cache_entries)
+
+        # Stop to stop segments of every route: entry -> entry + 1
+        snapshot = self.snapshot
+        last_entries = snapshot.route_offsets[1:] - 1
+        starts = np.setdiff1d(np.arange(snapshot.stop_count - 1), last_entries)
+        lat, lon = snapshot.stop_lat, snapshot.stop_lon
+        self._segments = starts
+        self._seg_south = np.minimum(lat[starts], lat[starts + 1])
+        self._seg_north = np.maximum(lat[starts], lat[starts + 1])
+        self._seg_west = np.minimum(lon[starts], lon[starts + 1])
+        self._seg_east = np.maximum(lon[starts], lon[starts + 1])
+
+    @property
+    def bounds(self) -> Bounds:
+        """Bounds of the whole network"""
+        lat, lon = self.snapshot.stop_lat, self.snapshot.stop_lon
+        return float(lat.min()), float(lon.min()), float(lat.max()), float(lon.max())
+
+    def _stops(self, bounds: Bounds):
+        """Stops inside bounds, one per location (stops of both directions often share one)"""
+        south, west, north, east = bounds
+        center_lat, center_lon = (south + north) / 2, (west + east) / 2
+        radius = distance_service.haversine_distance(south, west, north, east) / 2
+
+        entries = self.stop_index.candidates(center_lat, center_lon, radius)
+        lat = self.snapshot.stop_lat[entries]
+        lon = self.snapshot.stop_lon[entries]
+        inside = (lat >= south) & (lat < north) & (lon >= west) & (lon < east)
+
+        stops, seen = [], set()
+        for entry in entries[inside].tolist():
+            location = (int(self.snapshot.stop_lat_e6[entry]), int(self.snapshot.stop_lon_e6[entry]))
+            if location in seen:
+                continue
+            seen.add(location)
+            stop = self.snapshot.stop_dict(entry)
+            stops.append({
+                'stop_id': entry,
+                'name': stop['stop_name'],
+                'latitude': stop['latitude'],
+                'longitude': stop['longitude']
+            })
+        return stops
+
+    def _lines(self, bounds: Bounds, tolerance: float):
+        """Pieces of lines crossing bounds (runs of consecutive segments)"""
+        south, west, north, east = bounds
+        crossing = self._segments[
+            (self._seg_north >= south) & (self._seg_south < north) &
+            (self._seg_east >= west) & (self._seg_west < east)
+        ].tolist()
+
+        snapshot = self.snapshot
+        lines = []
+        run_start = None
+        for i, entry in enumerate(crossing):
+            if run_start is None:
+                run_start = entry
+            # A run ends where the next crossing segment doesn't continue it
+            if i + 1 < len(crossing) and crossing[i + 1] == entry + 1:
+                continue
+
+            entries = slice(run_start, entry + 2)
+            route_idx = int(snapshot.stop_route[run_start])
+            points = list(zip(snapshot.stop_lat[entries].tolist(), snapshot.stop_lon[entries].tolist()))
+            lines.append({
+                'route_id': snapshot.string(snapshot.route_id_sid[route_idx]),
+                'bus_line': snapshot.string(snapshot.route_bus_name_sid[route_idx]),
+                'line': encode_polyline(simplify(points, tolerance))
+            })
+            run_start = None
+        return lines
+
+    def tile(self, z: int, x: int, y: int) -> Dict:
+        """
+        Content of a tile
+
+        Returns:
+            {'network_version', 'z', 'x', 'y', 'bounds', 'lines': [{route_id,
+             bus_line, line (encoded polyline)}], 'stops': [{stop_id, name,
+             latitude, longitude}]}
+        """
+        bounds = tile_bounds(z, x, y)
+        tolerance = zoom_tolerance(z, (bounds[0] + bounds[2]) / 2)
+        return {
+            'network_version': self.snapshot.version,
+            'z': z, 'x': x, 'y': y,
+            'bounds': [round(value, 6) for value in bounds],
+            'lines': self._lines(bounds, tolerance),
+            'stops': self._stops(bounds) if z >= self.STOP_MIN_ZOOM else []
+        }
+
+    def tile_payload(self, z: int, x: int, y: int) -> Optional[PrecompressedPayload]:
+        """
+        Compressed tile, cached per network version
+
+        Returns:
+            Payload, or None if z/x/y is not a valid tile
+        """
+        if not self.MIN_ZOOM <= z <= self.MAX_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            return None
+
+        key = f'{self.snapshot.version}/{z}/{x}/{y}'
+        payload = self.cache.get(key)
+        if payload is MISS:
+            payload = PrecompressedPayload(json_bytes(self.tile(z, x, y)), etag=key.replace('/', '.'))
+            self.cache.set(key, payload)
+        return payload
+
+    def prerender(self, zooms: Iterable[int]) -> int:
+        """
+        Build the tiles covering the network at some zoom levels ahead of
+        requests (e.g. the low zooms, whose tiles hold the most lines)
+
+        Returns:
+            Number of tiles built
+        """
+        count = 0
+        for z in zooms:
+            for x, y in tiles_covering(self.bounds, z):
+                self.tile_payload(z, x, y)
+                count += 1
+        return count
+
+
+# Create service instance
+tile_service = TileService()
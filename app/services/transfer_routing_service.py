@@ -1,379 +1,263 @@
 """
-Transfer Routing Service - Find routes with one transfer
-FIXED VERSION v2: Properly filters out wrong-direction routes
+Transfer Routing Service - Find routes with transfers between buses
+Journeys come from the round-based RAPTOR search (raptor_service.py),
+which is optimal for every number of transfers.
 """
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from app.services.distance_service import distance_service
+from app.services.raptor_service import RaptorService
 from app.utils.data_loader import data_loader
 
 class TransferRoutingService:
-    """Find routes requiring one transfer between two buses"""
-    
+    """Find routes requiring one or more transfers between buses"""
+
     def __init__(self, max_walking_distance: int = 500):
         self.max_walking_distance = max_walking_distance
         self.bus_data = data_loader.load_bus_data()
-    
+        self.snapshot = data_loader.load_snapshot()
+        self.stop_index = data_loader.get_stop_index(max_walking_distance)
+        self.raptor = RaptorService(max_walking_distance)
+
     def find_transfer_routes(self, start_lat: float, start_lon: float,
                             end_lat: float, end_lon: float,
-                            max_results: int = 10) -> List[Dict]:
+                            max_results: int = 10,
+                            max_transfers: int = 1,
+                            near_start: Optional[Tuple] = None,
+                            near_end: Optional[Tuple] = None) -> List[Dict]:
         """
-        Find routes requiring one transfer between two buses
+        Find routes requiring at least one transfer between buses
         """
-        results = []
-        checked_combinations = set()
-        
-        # STEP 1: Find all buses with stops near START location
-        # This now returns ONLY buses where we can travel forward
-        buses_near_start = self._find_buses_near_location_for_boarding(start_lat, start_lon)
-        
-        if not buses_near_start:
-            print("No buses found near start location with forward travel possible")
-            return []
-        
-        print(f"Found {len(buses_near_start)} usable buses near start location")
-        
-        # STEP 2: For each bus near START
-        for bus_A_info in buses_near_start:
-            bus_A = bus_A_info['route']
-            boarding_stop_A = bus_A_info['nearest_stop']
-            
-            print(f"  Checking Bus {bus_A['bus_name']} ({bus_A['direction']}) from stop #{boarding_stop_A['stop_number']} ({bus_A_info['stops_ahead']} stops ahead)")
-            
-            # STEP 3: Find all potential transfer points on bus_A
-            transfer_points_checked = 0
-            for stop_A in bus_A['stops']:
-                if stop_A['stop_number'] <= boarding_stop_A['stop_number']:
-                    continue
-                
-                transfer_points_checked += 1
-                
-                # STEP 4: Find buses near this potential transfer stop
-                buses_near_transfer = self._find_buses_near_location_for_boarding(
-                    stop_A['latitude'], 
-                    stop_A['longitude']
-                )
-                
-                # STEP 5: For each bus at transfer point
-                for bus_B_info in buses_near_transfer:
-                    bus_B = bus_B_info['route']
-                    boarding_stop_B = bus_B_info['nearest_stop']
-                    
-                    # Skip if same bus line (including variants like 23 and 23E)
-                    # Extract base bus number for comparison
-                    base_A = ''.join(c for c in bus_A['bus_name'] if c.isdigit())
-                    base_B = ''.join(c for c in bus_B['bus_name'] if c.isdigit())
-                    if bus_A['bus_name'] == bus_B['bus_name']:
-                        continue
-                    
-                    combination_key = (
-                        bus_A['id'], 
-                        stop_A['stop_number'],
-                        bus_B['id'],
-                        boarding_stop_B['stop_number']
-                    )
-                    
-                    if combination_key in checked_combinations:
-                        continue
-                    
-                    checked_combinations.add(combination_key)
-                    
-                    # STEP 6: Check if this bus can reach destination
-                    for stop_B in bus_B['stops']:
-                        if stop_B['stop_number'] <= boarding_stop_B['stop_number']:
-                            continue
-                        
-                        distance_to_dest = distance_service.haversine_distance(
-                            stop_B['latitude'], stop_B['longitude'],
-                            end_lat, end_lon
-                        )
-                        
-                        if distance_to_dest <= self.max_walking_distance:
-                            route_details = self._build_transfer_route(
-                                start_lat, start_lon,
-                                bus_A, boarding_stop_A, stop_A,
-                                bus_B, boarding_stop_B, stop_B,
-                                end_lat, end_lon,
-                                distance_to_dest
-                            )
-                            
-                            if route_details['valid']:
-                                results.append(route_details)
-                                print(f"    ✓ Found route: {bus_A['bus_name']} → {bus_B['bus_name']}")
-                                
-                                if len(results) >= max_results * 5:
-                                    break
-                        
-                        # Don't check too many stops ahead
-                        if stop_B['stop_number'] - boarding_stop_B['stop_number'] > 20:
-                            break
-                
-                if len(results) >= max_results * 5:
-                    break
-            
-            if len(results) >= max_results * 5:
-                break
-        
-        print(f"Found {len(results)} valid transfer routes")
-        
-        results.sort(key=lambda x: x['total_time_minutes'])
-        seen_combinations = {}
-
-        for route in results:  # ← CHANGE 'routes' TO 'results'
-            # Create a unique key for this bus combination
-            bus1 = route['segments'][1]['bus_line']  # First bus
-            bus2 = route['segments'][3]['bus_line']  # Second bus (after transfer)
-            combination_key = f"{bus1}_{bus2}"
-            
-            # Keep only the fastest route for each combination
-            if combination_key not in seen_combinations:
-                seen_combinations[combination_key] = route
-            else:
-                # Compare total time, keep the faster one
-                existing_time = seen_combinations[combination_key]['total_time_minutes']
-                new_time = route['total_time_minutes']
-                if new_time < existing_time:
-                    seen_combinations[combination_key] = route
-
-        # Convert back to list
-        deduplicated_routes = list(seen_combinations.values())
-
-        # Sort by total time
-        deduplicated_routes.sort(key=lambda x: x['total_time_minutes'])
-
-        # Return limited results
-        return deduplicated_routes[:max_results]
-    
-    
-    def _find_buses_near_location_for_boarding(self, lat: float, lon: float, 
-                                                min_stops_ahead: int = 5) -> List[Dict]:
+        return self.find_journeys(
+            start_lat, start_lon, end_lat, end_lon,
+            max_results=max_results,
+            max_transfers=max_transfers,
+            min_transfers=1,
+            near_start=near_start,
+            near_end=near_end
+        )
+
+    def stops_near(self, lat: float, lon: float):
+        """(stop entries, walking distances) within walking distance of a point"""
+        return self.stop_index.query_radius(lat, lon, self.max_walking_distance)
+
+    def find_journeys(self, start_lat: float, start_lon: float,
+                      end_lat: float, end_lon: float,
+                      max_results: int = 10,
+                      max_transfers: int = 1,
+                      min_transfers: int = 0,
+                      near_start: Optional[Tuple] = None,
+                      near_end: Optional[Tuple] = None) -> List[Dict]:
         """
-        Find buses where we can board and travel FORWARD for at least min_stops_ahead stops.
-        This filters out buses where we'd be boarding near the end of the line.
+        Find the fastest bus journeys between two locations
+
+        Args:
+            start_lat, start_lon: Starting coordinates
+            end_lat, end_lon: Ending coordinates
+            max_results: Maximum number of journeys returned
+            max_transfers: Maximum number of transfers per journey
+            min_transfers: Minimum number of transfers per journey
+            near_start, near_end: stops_near() of each endpoint, if already computed
+
+        Returns:
+            List of journeys (segment format), fastest first, at most one
+            per combination of bus lines
         """
-        nearby_buses = []
-        
-        for route in self.bus_data['routes']:
-            total_stops = len(route['stops'])
-            
-            # Find the nearest stop on this route
-            best_stop = None
-            min_distance = float('inf')
-            
-            for stop in route['stops']:
-                distance = distance_service.haversine_distance(
-                    lat, lon,
-                    stop['latitude'], stop['longitude']
-                )
-                
-                if distance <= self.max_walking_distance:
-                    stops_ahead = total_stops - stop['stop_number']
-                    
-                    # Only consider this stop if there are enough stops ahead
-                    if stops_ahead >= min_stops_ahead:
-                        if distance < min_distance:
-                            min_distance = distance
-                            best_stop = {
-                                **stop, 
-                                'distance': round(distance),
-                                'stops_ahead': stops_ahead
-                            }
-            
-            if best_stop:
-                nearby_buses.append({
-                    'route': route,
-                    'nearest_stop': best_stop,
-                    'stops_ahead': best_stop['stops_ahead']
-                })
-        
-        # Sort by: most stops ahead first, then by walking distance (OUTSIDE the loop!)
-        nearby_buses.sort(key=lambda x: (-x['stops_ahead'], x['nearest_stop']['distance']))
-        
-        return nearby_buses
-    
-    def _get_intermediate_stops(self, route: Dict, start_num: int, end_num: int) -> List[Dict]:
-        """Get all stops between start and end stop numbers (inclusive)"""
-        stops = []
-        for stop in route['stops']:
-            if start_num <= stop['stop_number'] <= end_num:
-                stops.append({
-                    'name': stop['stop_name'],
-                    'number': stop['stop_number'],
-                    'coordinates': {
-                        'latitude': stop['latitude'],
-                        'longitude': stop['longitude']
-                    }
-                })
-        return stops        
-        
-    def _find_buses_near_location(self, lat: float, lon: float) -> List[Dict]:
-            """
-            Find all buses with stops within walking distance (legacy method).
-            Used for finding destination stops.
-            """
-            nearby_buses = []
-            
-            for route in self.bus_data['routes']:
-                nearest_stop = None
-                min_distance = float('inf')
-                
-                for stop in route['stops']:
-                    distance = distance_service.haversine_distance(
-                        lat, lon,
-                        stop['latitude'], stop['longitude']
-                    )
-                    
-                    if distance < min_distance and distance <= self.max_walking_distance:
-                        min_distance = distance
-                        nearest_stop = {**stop, 'distance': round(distance)}
-                
-                if nearest_stop:
-                    nearby_buses.append({
-                        'route': route,
-                        'nearest_stop': nearest_stop
-                    })
-            
-            return nearby_buses
-    
-    def _build_transfer_route(self, start_lat: float, start_lon: float,
-                             bus_A: Dict, boarding_A: Dict, transfer_A: Dict,
-                             bus_B: Dict, boarding_B: Dict, alighting_B: Dict,
-                             end_lat: float, end_lon: float,
-                             walk_to_end: float) -> Dict:
-        """Build complete transfer route details with timing - FAST VERSION (no OSRM)"""
-        
-        transfer_distance = distance_service.haversine_distance(
-            transfer_A['latitude'], transfer_A['longitude'],
-            boarding_B['latitude'], boarding_B['longitude']
+        targets, target_distances = near_end or self.stops_near(end_lat, end_lon)
+
+        if not len(targets):
+            print("No bus stops found near destination")
+            return []
+
+        result = self.raptor.search(
+            start_lat, start_lon,
+            max_transfers=max_transfers,
+            targets=(targets, target_distances),
+            min_transfers=min_transfers,
+            origin=near_start
         )
-        
-        if transfer_distance > self.max_walking_distance:
-            return {'valid': False, 'reason': 'Transfer distance too far'}
-        
-        # ===== USE SIMPLE DISTANCE CALCULATIONS (NO API CALLS) =====
-        
-        walk_to_start = boarding_A['distance']
-        walk_time_start = round(distance_service.calculate_walking_time(walk_to_start))
-        
-        stops_on_A = transfer_A['stop_number'] - boarding_A['stop_number']
-        bus_time_A = distance_service.estimate_bus_duration(stops_on_A)
-        
-        transfer_walk_time = round(distance_service.calculate_walking_time(transfer_distance))
-        
-        stops_on_B = alighting_B['stop_number'] - boarding_B['stop_number']
-        bus_time_B = distance_service.estimate_bus_duration(stops_on_B)
-        
-        walk_time_end = round(distance_service.calculate_walking_time(walk_to_end))
-        
-        total_time = (walk_time_start + bus_time_A + transfer_walk_time + 
-                     bus_time_B + walk_time_end)
-        
+
+        # Candidates come fastest first: keep the first journey of each bus combination
+        journeys = {}
+        for _, rides, entry, walk_to_end in result.destination_arrivals(
+                targets, target_distances, min_rides=min_transfers + 1):
+            legs = result.journey(rides, entry)
+            buses = tuple(
+                self._route_for_entry(leg['board'])['bus_name']
+                for leg in legs if leg['type'] == 'bus'
+            )
+
+            if buses in journeys:
+                continue
+
+            journeys[buses] = self._build_journey(legs, walk_to_end)
+
+            if len(journeys) >= max_results:
+                break
+
+        routes = list(journeys.values())
+        routes.sort(key=lambda x: (x['total_time_minutes'], x['summary']['total_transfers']))
+
+        print(f"Found {len(routes)} journeys with {min_transfers}-{max_transfers} transfers")
+
+        return routes
+
+    def _route_for_entry(self, entry: int) -> Dict:
+        """Route dict a snapshot stop entry belongs to"""
+        return self.bus_data['routes'][int(self.snapshot.stop_route[entry])]
+
+    def _stop_for_entry(self, entry: int) -> Dict:
+        """Stop dict of a snapshot stop entry"""
+        route_idx = int(self.snapshot.stop_route[entry])
+        position = entry - int(self.snapshot.route_offsets[route_idx])
+        return self.bus_data['routes'][route_idx]['stops'][position]
+
+    def _stop_summary(self, entry: int) -> Dict:
+        stop = self._stop_for_entry(entry)
         return {
-            'valid': True,
-            'type': 'transfer',
-            'total_time_minutes': total_time,
-            'summary': {
-                'description': f'Take Bus {bus_A["bus_name"]}, transfer to Bus {bus_B["bus_name"]}',
-                'total_walking_meters': round(walk_to_start + transfer_distance + walk_to_end),
-                'total_bus_stops': stops_on_A + stops_on_B,
-                'total_transfers': 1,
-                'buses_used': [bus_A['bus_name'], bus_B['bus_name']]
-            },
-            'segments': [
-                {
-                    'step': 1,
-                    'type': 'walk',
-                    'instruction': f'Walk to {boarding_A["stop_name"]}',
-                    'distance_meters': walk_to_start,
-                    'duration_minutes': walk_time_start,
-                    'path': None,  # No OSRM path - will use straight line fallback
-                    'details': {
-                        'to_stop': boarding_A['stop_name'],
-                        'coordinates': {
-                            'latitude': boarding_A['latitude'],
-                            'longitude': boarding_A['longitude']
+            'stop_id': int(entry),
+            'name': stop['stop_name'],
+            'number': stop['stop_number'],
+            'coordinates': {
+                'latitude': stop['latitude'],
+                'longitude': stop['longitude']
+            }
+        }
+
+    def _get_intermediate_stops(self, board_entry: int, alight_entry: int) -> List[Dict]:
+        """Get all stops ridden between boarding and alighting (inclusive)"""
+        return [
+            self._stop_summary(entry)
+            for entry in range(board_entry, alight_entry + 1)
+        ]
+
+    def _build_journey(self, legs: List[Dict], walk_to_end: float) -> Dict:
+        """Build complete journey details with timing - FAST VERSION (no OSRM)"""
+
+        segments = []
+        buses = []
+        total_time = 0
+        total_walking = 0
+        total_stops = 0
+
+        for leg in legs:
+            step = len(segments) + 1
+
+            if leg['type'] == 'walk':
+                distance = leg['distance']
+                walk_time = round(distance_service.calculate_walking_time(distance))
+                to_stop = self._stop_for_entry(leg['to'])
+
+                if leg['from'] is None:
+                    segment = {
+                        'step': step,
+                        'type': 'walk',
+                        'instruction': f'Walk to {to_stop["stop_name"]}',
+                        'distance_meters': round(distance),
+                        'duration_minutes': walk_time,
+                        'path': None,  # No OSRM path - will use straight line fallback
+                        'details': {
+                            'to_stop': to_stop['stop_name'],
+                            'to_stop_id': int(leg['to']),
+                            'coordinates': {
+                                'latitude': to_stop['latitude'],
+                                'longitude': to_stop['longitude']
+                            }
                         }
                     }
-                },
-                {
-                    'step': 2,
-                    'type': 'bus',
-                    'instruction': f'Take Bus {bus_A["bus_name"]} ({bus_A["direction"]})',
-                    'bus_line': bus_A['bus_name'],
-                    'direction': bus_A['direction'],
-                    'board_at': {
-                        'name': boarding_A['stop_name'],
-                        'number': boarding_A['stop_number'],
-                        'coordinates': {
-                            'latitude': boarding_A['latitude'],
-                            'longitude': boarding_A['longitude']
+                else:
+                    from_stop = self._stop_for_entry(leg['from'])
+                    segment = {
+                        'step': step,
+                        'type': 'walk',
+                        'instruction': f'Walk to {to_stop["stop_name"]} for transfer',
+                        'distance_meters': round(distance),
+                        'duration_minutes': walk_time,
+                        'path': None,  # No OSRM path - will use straight line fallback
+                        # Request body for /api/routes/walking-path (cached per network version)
+                        'path_ref': {
+                            'start_lat': from_stop['latitude'],
+                            'start_lon': from_stop['longitude'],
+                            'end_lat': to_stop['latitude'],
+                            'end_lon': to_stop['longitude'],
+                            'from_stop': leg['from'],
+                            'to_stop': leg['to'],
+                            'network_version': self.snapshot.version
+                        },
+                        'details': {
+                            'from_stop': from_stop['stop_name'],
+                            'from_stop_id': int(leg['from']),
+                            'to_stop': to_stop['stop_name'],
+                            'to_stop_id': int(leg['to']),
+                            'is_transfer': True
                         }
-                    },
-                    'alight_at': {
-                        'name': transfer_A['stop_name'],
-                        'number': transfer_A['stop_number'],
-                        'coordinates': {
-                            'latitude': transfer_A['latitude'],
-                            'longitude': transfer_A['longitude']
-                        }
-                    },
-                    'stops_count': stops_on_A,
-                    'duration_minutes': bus_time_A,
-                    'intermediate_stops': self._get_intermediate_stops(bus_A, boarding_A['stop_number'], transfer_A['stop_number'])
-                },
-                {
-                    'step': 3,
-                    'type': 'walk',
-                    'instruction': f'Walk to {boarding_B["stop_name"]} for transfer',
-                    'distance_meters': round(transfer_distance),
-                    'duration_minutes': transfer_walk_time,
-                    'path': None,  # No OSRM path - will use straight line fallback
-                    'details': {
-                        'from_stop': transfer_A['stop_name'],
-                        'to_stop': boarding_B['stop_name'],
-                        'is_transfer': True
                     }
-                },
-                {
-                    'step': 4,
+
+                total_walking += distance
+                total_time += walk_time
+            else:
+                route = self._route_for_entry(leg['board'])
+                stops_count = leg['alight'] - leg['board']
+                bus_time = distance_service.estimate_bus_duration(stops_count)
+
+                segment = {
+                    'step': step,
                     'type': 'bus',
-                    'instruction': f'Take Bus {bus_B["bus_name"]} ({bus_B["direction"]})',
-                    'bus_line': bus_B['bus_name'],
-                    'direction': bus_B['direction'],
-                    'board_at': {
-                        'name': boarding_B['stop_name'],
-                        'number': boarding_B['stop_number'],
-                        'coordinates': {
-                            'latitude': boarding_B['latitude'],
-                            'longitude': boarding_B['longitude']
-                        }
-                    },
-                    'alight_at': {
-                        'name': alighting_B['stop_name'],
-                        'number': alighting_B['stop_number'],
-                        'coordinates': {
-                            'latitude': alighting_B['latitude'],
-                            'longitude': alighting_B['longitude']
-                        }
-                    },
-                    'stops_count': stops_on_B,
-                    'duration_minutes': bus_time_B,
-                    'intermediate_stops': self._get_intermediate_stops(bus_B, boarding_B['stop_number'], alighting_B['stop_number'])
-                },
-                {
-                    'step': 5,
-                    'type': 'walk',
-                    'instruction': 'Walk to destination',
-                    'distance_meters': round(walk_to_end),
-                    'duration_minutes': walk_time_end,
-                    'path': None,  # No OSRM path - will use straight line fallback
-                    'details': {
-                        'from_stop': alighting_B['stop_name'],
-                        'to_destination': True
-                    }
+                    'instruction': f'Take Bus {route["bus_name"]} ({route["direction"]})',
+                    'bus_line': route['bus_name'],
+                    'direction': route['direction'],
+                    'route_id': route['id'],
+                    'board_at': self._stop_summary(leg['board']),
+                    'alight_at': self._stop_summary(leg['alight']),
+                    'stops_count': stops_count,
+                    'duration_minutes': bus_time,
+                    'intermediate_stops': self._get_intermediate_stops(leg['board'], leg['alight'])
                 }
-            ]
+
+                buses.append(route['bus_name'])
+                total_stops += stops_count
+                total_time += bus_time
+
+            segments.append(segment)
+
+        walk_time_end = round(distance_service.calculate_walking_time(walk_to_end))
+        total_time += walk_time_end
+        total_walking += walk_to_end
+
+        segments.append({
+            'step': len(segments) + 1,
+            'type': 'walk',
+            'instruction': 'Walk to destination',
+            'distance_meters': round(walk_to_end),
+            'duration_minutes': walk_time_end,
+            'path': None,  # No OSRM path - will use straight line fallback
+            'details': {
+                'from_stop': self._stop_for_entry(legs[-1]['alight'])['stop_name'],
+                'from_stop_id': int(legs[-1]['alight']),
+                'to_destination': True
+            }
+        })
+
+        if len(buses) == 1:
+            description = f'Take Bus {buses[0]}'
+        else:
+            description = f'Take Bus {buses[0]}, transfer to Bus {buses[1]}'
+            for bus in buses[2:]:
+                description += f', then Bus {bus}'
+
+        return {
+            'valid': True,
+            'type': 'transfer' if len(buses) > 1 else 'direct',
+            'total_time_minutes': total_time,
+            'summary': {
+                'description': description,
+                'total_walking_meters': round(total_walking),
+                'total_bus_stops': total_stops,
+                'total_transfers': len(buses) - 1,
+                'buses_used': buses
+            },
+            'segments': segments
         }
 
 
 # Create service instance
-transfer_routing_service = TransferRoutingService()
\ No newline at end of file
+transfer_routing_service = TransferRoutingService()
@@ -1,65 +1,243 @@
 """
 Walking Service - Get realistic walking routes using OSRM API
 """
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
 import requests
+from requests.adapters import HTTPAdapter
 from typing import Optional, Dict, List, Tuple
 
+from app.utils.async_io import http_client, httpx, run_blocking
+from app.utils.cache import TwoTierCache, grid_key
+
+# (start_lat, start_lon, end_lat, end_lon)
+Leg = Tuple[float, float, float, float]
+
+
 class WalkingService:
     """Service for getting realistic walking routes via OSRM"""
-    
+
     # OSRM Demo server (free, no API key needed)
-    BASE_URL = "https://router.project-osrm.org/route/v1/foot"
-    
-    @classmethod
-    def get_walking_route(cls, start_lat: float, start_lon: float, 
-                          end_lat: float, end_lon: float) -> Optional[Dict]:
+    BASE_URL = f"{os.getenv('OSRM_BASE_URL', 'https://router.project-osrm.org/route/v1')}/foot"
+
+    TIMEOUT = 10                # seconds, per HTTP request
+    POOL_SIZE = int(os.getenv('OSRM_POOL_SIZE', 16))               # kept-alive connections
+    MAX_CONCURRENCY = int(os.getenv('OSRM_MAX_CONCURRENCY', 8))   # legs in flight per batch
+    DEADLINE = float(os.getenv('OSRM_DEADLINE', 5))               # seconds, per batch
+
+    # Walking path cache (empty WALKING_CACHE_PATH = memory only)
+    CACHE_PATH = os.getenv(
+        'WALKING_CACHE_PATH',
+        str(Path(__file__).resolve().parent.parent.parent / 'data' / 'cache' / 'walking.sqlite')
+    )
+    CACHE_TTL = float(os.getenv('WALKING_CACHE_TTL', 30 * 24 * 3600))  # seconds
+    CACHE_GRID = float(os.getenv('WALKING_CACHE_GRID', 25))            # meters
+    CACHE_MEMORY_ENTRIES = int(os.getenv('WALKING_CACHE_MEMORY_ENTRIES', 10000))
+    CACHE_DISK_ENTRIES = int(os.getenv('WALKING_CACHE_DISK_ENTRIES', 500000))
+
+    def __init__(self, base_url: str = BASE_URL, pool_size: int = POOL_SIZE,
+                 cache: Optional[TwoTierCache] = None, cache_grid: float = CACHE_GRID):
+        """
+        Initialize walking service
+
+        Args:
+            base_url: OSRM route endpoint for the foot profile
+            pool_size: Number of connections kept alive (and worker threads)
+            cache: Cache for walking routes (None = no caching)
+            cache_grid: Grid size in meters endpoints are snapped to in cache keys
+        """
+        self.base_url = base_url.rstrip('/')
+        self.cache = cache
+        self.cache_grid = cache_grid
+
+        # One session: connections are reused instead of a new TCP/TLS handshake per call
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='osrm')
+
+    def cache_key(self, start_lat: float, start_lon: float,
+                  end_lat: float, end_lon: float) -> str:
+        """Cache key of a leg: both endpoints snapped to the cache grid"""
+        return 'walk:' + grid_key(self.cache_grid, start_lat, start_lon, end_lat, end_lon)
+
+    @staticmethod
+    def stop_cache_key(network_version: str, from_stop: int, to_stop: int) -> str:
+        """Cache key of a walk between two stops (snapshot entries) of a network version"""
+        return f"stops:{network_version}:{from_stop}:{to_stop}"
+
+    def get_walking_route(self, start_lat: float, start_lon: float,
+                          end_lat: float, end_lon: float,
+                          timeout: Optional[float] = None,
+                          cache_key: Optional[str] = None,
+                          permanent: bool = False) -> Optional[Dict]:
         """
         Get realistic walking route between two points
-        
+
+        Routes are cached under cache_key, by default the endpoints snapped
+        to the cache grid (so a cached path may start or end up to about
+        cache_grid meters from the requested points).
+
         Args:
             start_lat, start_lon: Starting coordinates
             end_lat, end_lon: Ending coordinates
-        
+            timeout: HTTP timeout in seconds (default TIMEOUT)
+            cache_key: Cache key (default: snapped endpoints)
+            permanent: Cache without expiry (e.g. walks between stops)
+
         Returns:
             Dict with distance, duration, and geometry (list of coordinates)
         """
+        if self.cache is None:
+            return self._fetch_walking_route(start_lat, start_lon, end_lat, end_lon, timeout)
+
+        key = cache_key or self.cache_key(start_lat, start_lon, end_lat, end_lon)
+        route = self.cache.get(key)
+        if route is None:
+            route = self._fetch_walking_route(start_lat, start_lon, end_lat, end_lon, timeout)
+            # Failures are not cached: OSRM is asked again next time
+            if route is not None:
+                self.cache.set(key, route, permanent=permanent)
+        return route
+
+    async def get_walking_route_async(self, start_lat: float, start_lon: float,
+                                      end_lat: float, end_lon: float,
+                                      timeout: Optional[float] = None,
+                                      cache_key: Optional[str] = None,
+                                      permanent: bool = False) -> Optional[Dict]:
+        """
+        get_walking_route() for async views: OSRM is called through the
+        shared async client. Without the client (not served by asgi.py),
+        runs get_walking_route() in the thread pool.
+        """
+        client = http_client()
+        if client is None:
+            return await run_blocking(
+                self.get_walking_route, start_lat, start_lon, end_lat, end_lon,
+                timeout=timeout, cache_key=cache_key, permanent=permanent
+            )
+
+        key = cache_key or self.cache_key(start_lat, start_lon, end_lat, end_lon)
+        # The disk tier is blocking SQLite: off the event loop
+        route = await run_blocking(self.cache.get, key) if self.cache is not None else None
+        if route is None:
+            try:
+                url, params = self._route_request(start_lat, start_lon, end_lat, end_lon)
+                response = await client.get(url, params=params, timeout=timeout or self.TIMEOUT)
+                response.raise_for_status()
+                route = self._parse_route(response.json())
+            except httpx.HTTPError as e:
+                print(f"OSRM API error: {e}")
+                return None
+            except (KeyError, IndexError, ValueError) as e:
+                print(f"OSRM parse error: {e}")
+                return None
+            if route is not None and self.cache is not None:
+                await run_blocking(self.cache.set, key, route, permanent=permanent)
+        return route
+
+    def _route_request(self, start_lat: float, start_lon: float,
+                       end_lat: float, end_lon: float) -> Tuple[str, Dict]:
+        """URL and query parameters of an OSRM walking route request"""
+        # OSRM expects coordinates as lon,lat (reversed!)
+        url = f"{self.base_url}/{start_lon},{start_lat};{end_lon},{end_lat}"
+
+        params = {
+            'overview': 'full',      # Get full route geometry
+            'geometries': 'geojson', # Return as GeoJSON coordinates
+            'steps': 'false'
+        }
+        return url, params
+
+    @staticmethod
+    def _parse_route(data: Dict) -> Optional[Dict]:
+        """Route dict of an OSRM response, or None if OSRM found no route"""
+        if data['code'] != 'Ok' or not data['routes']:
+            return None
+
+        route = data['routes'][0]
+
+        # Extract coordinates (OSRM returns [lon, lat], we need [lat, lon])
+        coordinates = route['geometry']['coordinates']
+        path = [[coord[1], coord[0]] for coord in coordinates]  # Flip to [lat, lon]
+
+        return {
+            'distance_meters': round(route['distance']),
+            'duration_minutes': round(route['duration'] / 60, 1),
+            'path': path  # List of [lat, lon] coordinates
+        }
+
+    def _fetch_walking_route(self, start_lat: float, start_lon: float,
+                             end_lat: float, end_lon: float,
+                             timeout: Optional[float] = None) -> Optional[Dict]:
+        """Request a walking route from OSRM"""
         try:
-            # OSRM expects coordinates as lon,lat (reversed!)
-            url = f"{cls.BASE_URL}/{start_lon},{start_lat};{end_lon},{end_lat}"
-            
-            params = {
-                'overview': 'full',      # Get full route geometry
-                'geometries': 'geojson', # Return as GeoJSON coordinates
-                'steps': 'false'
-            }
-            
-            response = requests.get(url, params=params, timeout=10)
+            url, params = self._route_request(start_lat, start_lon, end_lat, end_lon)
+
+            response = self.session.get(url, params=params, timeout=timeout or self.TIMEOUT)
             response.raise_for_status()
-            
-            data = response.json()
-            
-            if data['code'] != 'Ok' or not data['routes']:
-                return None
-            
-            route = data['routes'][0]
-            
-            # Extract coordinates (OSRM returns [lon, lat], we need [lat, lon])
-            coordinates = route['geometry']['coordinates']
-            path = [[coord[1], coord[0]] for coord in coordinates]  # Flip to [lat, lon]
-            
-            return {
-                'distance_meters': round(route['distance']),
-                'duration_minutes': round(route['duration'] / 60, 1),
-                'path': path  # List of [lat, lon] coordinates
-            }
-            
+
+            return self._parse_route(response.json())
+
         except requests.RequestException as e:
             print(f"OSRM API error: {e}")
             return None
-        except (KeyError, IndexError) as e:
+        except (KeyError, IndexError, ValueError) as e:
             print(f"OSRM parse error: {e}")
             return None
-    
+
+    def get_walking_routes(self, legs: List[Leg],
+                           max_concurrency: int = MAX_CONCURRENCY,
+                           deadline: float = DEADLINE) -> List[Dict]:
+        """
+        Get walking routes for several legs concurrently
+
+        At most max_concurrency legs are requested at once. Legs that fail
+        or are not done within the deadline get the straight line fallback.
+
+        Args:
+            legs: List of (start_lat, start_lon, end_lat, end_lon)
+            max_concurrency: Maximum number of requests in flight
+            deadline: Total time budget in seconds for the whole batch
+
+        Returns:
+            One route dict per leg, in order (never None)
+        """
+        results = [None] * len(legs)
+        expires = time.monotonic() + deadline
+        pending = {}
+        next_leg = 0
+
+        while next_leg < len(legs) or pending:
+            remaining = expires - time.monotonic()
+            if remaining <= 0:
+                break
+
+            # Keep the window full
+            while next_leg < len(legs) and len(pending) < max_concurrency:
+                future = self._executor.submit(
+                    self.get_walking_route, *legs[next_leg], timeout=remaining
+                )
+                pending[future] = next_leg
+                next_leg += 1
+
+            done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[pending.pop(future)] = future.result()
+
+        # Requests still running finish in the background, bounded by their timeout
+        for future in pending:
+            future.cancel()
+
+        return [
+            result or self.get_straight_line_fallback(*leg)
+            for leg, result in zip(legs, results)
+        ]
+
     @classmethod
     def get_straight_line_fallback(cls, start_lat: float, start_lon: float,
                                     end_lat: float, end_lon: float) -> Dict:
@@ -67,12 +245,12 @@ class WalkingService:
         Fallback: Return straight line if OSRM fails
         """
         from app.services.distance_service import distance_service
-        
+
         distance = distance_service.haversine_distance(
             start_lat, start_lon, end_lat, end_lon
         )
         walking_time = distance_service.calculate_walking_time(distance)
-        
+
         return {
             'distance_meters': round(distance),
             'duration_minutes': round(walking_time, 1),
@@ -84,4 +262,10 @@ class WalkingService:
 
 
 # Create service instance
-walking_service = WalkingService()
\ No newline at end of file
+walking_service = WalkingService(cache=TwoTierCache(
+    'walking',
+    ttl=WalkingService.CACHE_TTL,
+    memory_entries=WalkingService.CACHE_MEMORY_ENTRIES,
+    disk_path=WalkingService.CACHE_PATH or None,
+    disk_entries=WalkingService.CACHE_DISK_ENTRIES
+))
@@ -0,0 +1,124 @@
+"""
+Warm-up Service - Exercise every search path before serving traffic
+
+Importing the services maps the network snapshot and builds the spatial
+indexes; the warm-up then builds the static payloads and low zoom tiles
+and runs a few searches of each kind, so lazily built structures exist,
+snapshot pages are resident and the first real request is not slower
+than the others. Under gunicorn (gunicorn.conf.py) this runs once in the
+master, before the workers are forked: they start warm and share it.
+Otherwise each process runs it at start-up: ASGI lifespan startup
+(uvicorn asgi:app) or before the development server starts (run.py).
+
+Nothing here may start threads or open upstream connections (thread
+pools and sockets do not survive a fork): only local CPU-bound work.
+"""
+import contextlib
+import io
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+# Sample points around Greater Tunis
+POINTS: List[Tuple[float, float]] = [
+    (36.8008, 10.1865),    # TUNIS MARINE
+    (36.7927, 10.0944),    # PÉPINIÉRE
+    (36.7181, 9.8944),     # RELAIS BORJ EL AMRI
+    (36.8065, 10.1815),    # Avenue Habib Bourguiba
+    (36.5528, 9.9026),     # EPICIER LAGRAA
+    (36.8600, 10.3000),    # La Marsa
+]
+
+
+class WarmupService:
+    """Runs the warm-up and reports readiness"""
+
+    TILE_MAX_ZOOM = int(os.getenv('WARMUP_TILE_MAX_ZOOM', 12))   # tiles prerendered up to this zoom
+
+    def __init__(self):
+        self.state = 'pending'      # pending, running, ready or failed
+        self.error = None
+        self.timings_ms: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _stages(self) -> List[Tuple[str, Callable[[], object]]]:
+        from app.services.gazetteer_service import gazetteer_service
+        from app.services.isochrone_service import isochrone_service
+        from app.services.matrix_service import matrix_service
+        from app.services.network_service import network_service
+        from app.services.routing_service import routing_service
+        from app.services.tile_service import tile_service
+        from app.services.transfer_routing_service import transfer_routing_service
+
+        pairs = list(zip(POINTS, POINTS[1:] + POINTS[:1]))
+        return [
+            ('network', network_service.warm_up),
+            ('tiles', lambda: tile_service.prerender(
+                range(tile_service.MIN_ZOOM, self.TILE_MAX_ZOOM + 1))),
+            ('direct', lambda: [
+                routing_service.find_direct_routes(*start, *end, walking_top_k=0)
+                for start, end in pairs
+            ]),
+            ('transfer', lambda: [
+                transfer_routing_service.find_journeys(*start, *end, max_transfers=2)
+                for start, end in pairs
+            ]),
+            ('matrix', lambda: matrix_service.travel_times(POINTS, POINTS)),
+            ('isochrone', lambda: isochrone_service.isochrone(*POINTS[0], 30)),
+            ('autocomplete', lambda: gazetteer_service.autocomplete('tunis', 10))
+        ]
+
+    def run(self) -> Dict[str, float]:
+        """
+        Run every warm-up stage (once: later calls return the first timings)
+
+        Returns:
+            Milliseconds per stage, and 'total'
+
+        Raises:
+            Exception: of the failing stage (state is then 'failed')
+        """
+        with self._lock:
+            if self.state == 'ready':
+                return self.timings_ms
+            self.state = 'running'
+
+            started = time.perf_counter()
+            try:
+                for name, stage in self._stages():
+                    start = time.perf_counter()
+                    with contextlib.redirect_stdout(io.StringIO()):   # per-search progress prints
+                        stage()
+                    self.timings_ms[name] = round((time.perf_counter() - start) * 1000, 2)
+            except Exception as e:
+                self.state = 'failed'
+                self.error = f'{name}: {e}'
+                raise
+
+            self.timings_ms['total'] = round((time.perf_counter() - started) * 1000, 2)
+            self.state = 'ready'
+            return self.timings_ms
+
+    @property
+    def ready(self) -> bool:
+        return self.state == 'ready'
+
+    def status(self) -> Dict:
+        """Readiness of this process, for the /ready endpoint"""
+        from app.utils.data_loader import data_loader
+
+        status = {
+            'ready': self.ready,
+            'state': self.state,
+            'pid': os.getpid(),
+            'network_version': data_loader.network_version,
+            'warmup_ms': self.timings_ms
+        }
+        if self.error:
+            status['error'] = self.error
+        return status
+
+
+# Create service instance
+warmup_service = WarmupService()
@@ -0,0 +1,65 @@
+"""
+Async I/O - Shared async HTTP client and executor for async views
+
+Under the ASGI server (asgi.py) the upstream-bound views (geocoding,
+walking paths, address searches) run on the event loop: Nominatim and
+OSRM are called through one shared httpx.AsyncClient, so a worker holds
+many upstream calls in flight without a thread each. CPU-bound work
+(route searches, stop lookups) runs in a thread pool, off the loop.
+
+Without an open client (WSGI server, tests) the same views fall back to
+the synchronous services, run in the thread pool.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+
+try:
+    import httpx
+except ImportError:  # optional dependency: async views use the synchronous services
+    httpx = None
+
+MAX_CONNECTIONS = int(os.getenv('ASYNC_HTTP_MAX_CONNECTIONS', 200))    # upstream, per worker
+EXECUTOR_WORKERS = int(os.getenv('ASYNC_EXECUTOR_WORKERS', 8))         # CPU-bound work
+
+_executor = ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS, thread_name_prefix='async-cpu')
+_client = None
+_client_loop = None
+
+
+async def open_http_client():
+    """Open the shared client on the running loop (ASGI lifespan startup)"""
+    global _client, _client_loop
+    if httpx is None:
+        print("httpx is not installed: upstream calls stay synchronous")
+        return
+    _client = httpx.AsyncClient(limits=httpx.Limits(
+        max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS // 4
+    ))
+    _client_loop = asyncio.get_running_loop()
+
+
+async def close_http_client():
+    """Close the shared client (ASGI lifespan shutdown)"""
+    global _client, _client_loop
+    if _client is not None:
+        await _client.aclose()
+    _client = _client_loop = None
+
+
+def http_client() -> Optional['httpx.AsyncClient']:
+    """Shared client if it was opened on the running loop, else None (synchronous mode)"""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+    return _client if loop is _client_loop else None
+
+
+async def run_blocking(func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking or CPU-bound call in the thread pool and wait for it"""
+    return await asyncio.get_running_loop().run_in_executor(
+        _executor, partial(func, *args, **kwargs)
+    )
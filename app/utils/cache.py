@@ -0,0 +1,319 @@
+"""
+Cache - Two-tier (memory + SQLite) key/value cache
+
+The memory tier is a per-process LRU; the disk tier is a SQLite file
+shared by every worker on the machine. Values must be JSON serializable.
+Entries expire after a TTL unless stored as permanent, and both tiers
+evict the least recently used entries beyond their size limit.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Sentinel for cache misses (None is a valid cached value)
+MISS = object()
+
+METERS_PER_DEGREE = 111320
+
+# Every cache created, by name, for the /metrics endpoint
+_registry: Dict[str, 'TwoTierCache'] = {}
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU cache with per-entry expiry"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (expires_at or None, value)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return MISS
+            expires_at, value = item
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                return MISS
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, expires_at: Optional[float] = None):
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCache:
+    """
+    Disk cache in a SQLite table, safe across threads and processes
+
+    Every thread gets its own connection, and so does every process: a
+    connection opened before a fork (e.g. in a preloading master) is not
+    used by the children. WAL mode lets readers run while another worker
+    writes.
+
+    Reads don't write: the recency used for eviction (accessed_at) is
+    refreshed at most every touch_interval seconds per entry, in batches
+    written with the next write or every FLUSH_TOUCHES refreshes.
+    """
+
+    EVICT_EVERY = 100      # writes between two eviction passes
+    TOUCH_INTERVAL = 60    # seconds, default accessed_at granularity
+    FLUSH_TOUCHES = 1000   # pending accessed_at refreshes written without waiting for a write
+
+    def __init__(self, path: str, table: str = 'cache', max_entries: int = 100000,
+                 touch_interval: float = TOUCH_INTERVAL):
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self.touch_interval = touch_interval
+        self.evictions = 0
+        self._local = threading.local()
+        self._writes = 0
+        self._touched: Dict[str, float] = {}    # key -> accessed_at not written yet
+        self._touched_lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        db = self._connection()
+        db.execute(
+            f'CREATE TABLE IF NOT EXISTS {table} ('
+            ' key TEXT PRIMARY KEY,'
+            ' value TEXT NOT NULL,'
+            ' expires_at REAL,'          # NULL = permanent
+            ' accessed_at REAL NOT NULL)'
+        )
+        db.execute(f'CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed_at)')
+        db.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=5)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def __len__(self):
+        return self._connection().execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+
+    def get(self, key: str):
+        """(value, expires_at) for key, or MISS"""
+        db = self._connection()
+        row = db.execute(
+            f'SELECT value, expires_at, accessed_at FROM {self.table} WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return MISS
+
+        value, expires_at, accessed_at = row
+        now = time.time()
+        if expires_at is not None and expires_at <= now:
+            return MISS
+
+        # Recency for LRU eviction, coarse and batched
+        if now - accessed_at >= self.touch_interval:
+            with self._touched_lock:
+                self._touched[key] = now
+                flush = len(self._touched) >= self.FLUSH_TOUCHES
+            if flush:
+                self._flush_touched(db)
+                db.commit()
+        return json.loads(value), expires_at
+
+    def _flush_touched(self, db: sqlite3.Connection):
+        """Write the pending accessed_at refreshes (caller commits)"""
+        with self._touched_lock:
+            touched, self._touched = self._touched, {}
+        if touched:
+            db.executemany(
+                f'UPDATE {self.table} SET accessed_at = ? WHERE key = ?',
+                [(accessed_at, key) for key, accessed_at in touched.items()]
+            )
+
+    def set(self, key: str, value: Any, expires_at: Optional[float] = None):
+        db = self._connection()
+        db.execute(
+            f'INSERT OR REPLACE INTO {self.table} (key, value, expires_at, accessed_at)'
+            ' VALUES (?, ?, ?, ?)',
+            (key, json.dumps(value, separators=(',', ':')), expires_at, time.time())
+        )
+        self._flush_touched(db)
+        db.commit()
+
+        self._writes += 1
+        if self._writes % self.EVICT_EVERY == 0:
+            self.evict()
+
+    def evict(self):
+        """
+        Drop expired entries, then the least recently used beyond
+        max_entries (entries with a TTL go before permanent ones)
+        """
+        db = self._connection()
+        self._flush_touched(db)
+        removed = db.execute(
+            f'DELETE FROM {self.table} WHERE expires_at IS NOT NULL AND expires_at <= ?',
+            (time.time(),)
+        ).rowcount
+
+        excess = len(self) - self.max_entries
+        if excess > 0:
+            removed += db.execute(
+                f'DELETE FROM {self.table} WHERE key IN ('
+                f' SELECT key FROM {self.table}'
+                f' ORDER BY expires_at IS NULL, accessed_at LIMIT ?)',
+                (excess,)
+            ).rowcount
+
+        db.commit()
+        self.evictions += removed
+
+    def clear(self):
+        db = self._connection()
+        db.execute(f'DELETE FROM {self.table}')
+        db.commit()
+
+
+class TwoTierCache:
+    """In-process LRU in front of an optional SQLite store, with hit/miss counters"""
+
+    def __init__(self, name: str, ttl: Optional[float] = None,
+                 memory_entries: int = 10000,
+                 disk_path: Optional[str] = None, disk_entries: int = 100000):
+        """
+        Initialize cache
+
+        Args:
+            name: Cache name (SQLite table, key in cache_stats())
+            ttl: Default time to live in seconds (None = never expires)
+            memory_entries: Size of the in-process LRU
+            disk_path: SQLite file, or None for a memory-only cache
+            disk_entries: Maximum number of entries on disk
+        """
+        self.name = name
+        self.ttl = ttl
+        self.memory = LRUCache(memory_entries)
+        self.disk = SQLiteCache(
+            disk_path, name, disk_entries,
+            touch_interval=ttl / 10 if ttl else SQLiteCache.TOUCH_INTERVAL
+        ) if disk_path else None
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        _registry[name] = self
+
+    def get(self, key: str, default: Any = None, count: bool = True) -> Any:
+        """
+        Cached value for key, or default
+
+        Args:
+            count: Update the hit/miss counters (False for re-checks)
+        """
+        value = self.memory.get(key)
+        if value is not MISS:
+            self.memory_hits += count
+            return value
+
+        if self.disk is not None:
+            try:
+                entry = self.disk.get(key)
+            except sqlite3.Error as e:
+                print(f"Cache {self.name} read error: {e}")
+                entry = MISS
+            if entry is not MISS:
+                self.disk_hits += count
+                value, expires_at = entry
+                self.memory.set(key, value, expires_at)
+                return value
+
+        self.misses += count
+        return default
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, permanent: bool = False):
+        """
+        Store a value in both tiers
+
+        Args:
+            key: Cache key
+            value: JSON serializable value
+            ttl: Time to live in seconds (default: cache ttl)
+            permanent: Never expires (still subject to size eviction)
+        """
+        ttl = ttl if ttl is not None else self.ttl
+        expires_at = None if permanent or ttl is None else time.time() + ttl
+
+        self.memory.set(key, value, expires_at)
+        if self.disk is not None:
+            try:
+                self.disk.set(key, value, expires_at)
+            except sqlite3.Error as e:
+                print(f"Cache {self.name} write error: {e}")
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and sizes of both tiers"""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        stats = {
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': round((lookups - self.misses) / lookups, 4) if lookups else None,
+            'memory_entries': len(self.memory),
+            'memory_evictions': self.memory.evictions
+        }
+        if self.disk is not None:
+            stats['disk_entries'] = len(self.disk)
+            stats['disk_evictions'] = self.disk.evictions
+        return stats
+
+
+def grid_key(grid: float, *coordinates: float) -> str:
+    """
+    Cache key part for coordinates snapped to a grid of `grid` meters
+
+    Latitude and longitude use the same step in degrees, so cells are
+    grid meters high and a bit narrower (cos(latitude)) than that wide.
+    """
+    step = grid / METERS_PER_DEGREE
+    return f"{grid:g}:" + ':'.join(str(round(value / step)) for value in coordinates)
+
+
+def snap_to_grid(grid: float, *coordinates: float) -> Tuple[float, ...]:
+    """Center of the grid_key() cell of coordinates (unchanged if grid <= 0)"""
+    if grid <= 0:
+        return coordinates
+    step = grid / METERS_PER_DEGREE
+    return tuple(round(value / step) * step for value in coordinates)
+
+
+def cache_stats() -> Dict[str, Dict]:
+    """Stats of every cache in this process"""
+    return {name: cache.stats() for name, cache in _registry.items()}
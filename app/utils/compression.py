@@ -0,0 +1,163 @@
+"""
+Compression - Content-Encoding negotiation for responses
+
+Dynamic responses above a size threshold are compressed on the fly with
+brotli (if installed) or gzip, whichever the client accepts. Static
+payloads are compressed once, at the highest level, by
+PrecompressedPayload and served as-is.
+"""
+import gzip
+import hashlib
+from typing import Dict, Optional
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # optional dependency: gzip only
+    brotli = None
+
+# Preferred first
+ENCODINGS = ('br', 'gzip') if brotli else ('gzip',)
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'application/x-ndjson', 'application/javascript',
+    'text/html', 'text/css', 'text/plain', 'text/javascript', 'image/svg+xml'
+}
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Best encoding the client accepts
+
+    Args:
+        accept_encoding: Accept-Encoding header value
+
+    Returns:
+        'br', 'gzip', or None for identity
+    """
+    if not accept_encoding:
+        return None
+
+    accepted = {}
+    for part in accept_encoding.lower().split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+
+    best = None
+    for encoding in ENCODINGS:
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if quality > 0 and (best is None or quality > best[1]):
+            best = (encoding, quality)
+    return best[0] if best else None
+
+
+def compress(data: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    """
+    Compress data
+
+    Args:
+        data: Raw bytes
+        encoding: 'br' or 'gzip'
+        level: Brotli quality (0-11) or gzip level (1-9), None = maximum
+    """
+    if encoding == 'br':
+        return brotli.compress(data, quality=11 if level is None else level)
+    return gzip.compress(data, compresslevel=9 if level is None else level, mtime=0)
+
+
+class PrecompressedPayload:
+    """
+    Immutable response body stored in every encoding
+
+    ETags are strong and differ per encoding (as the bytes do); a client
+    revalidating any of them gets a 304 while the payload is unchanged.
+    """
+
+    def __init__(self, data: bytes, mimetype: str = 'application/json',
+                 etag: Optional[str] = None, cache_control: str = 'no-cache'):
+        """
+        Args:
+            data: Uncompressed body
+            mimetype: Content type
+            etag: Entity tag (default: hash of data)
+            cache_control: Cache-Control header value
+        """
+        self.mimetype = mimetype
+        self.cache_control = cache_control
+        self.etag = etag or hashlib.sha256(data).hexdigest()[:32]
+        self.bodies: Dict[Optional[str], bytes] = {None: data}
+
+        for encoding in ENCODINGS:
+            compressed = compress(data, encoding)
+            if len(compressed) < len(data):
+                self.bodies[encoding] = compressed
+
+    def _etag(self, encoding: Optional[str]) -> str:
+        return f'{self.etag}-{encoding}' if encoding else self.etag
+
+    def response(self) -> Response:
+        """Response for the current request: 304, or the best encoded body"""
+        encoding = negotiate(request.headers.get('Accept-Encoding'))
+        if encoding not in self.bodies:
+            encoding = None
+
+        known = {self._etag(e) for e in self.bodies}
+        if request.if_none_match.star_tag or any(
+                tag in known for tag in request.if_none_match.as_set()):
+            response = Response(status=304)
+        else:
+            response = Response(self.bodies[encoding], mimetype=self.mimetype)
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+
+        response.set_etag(self._etag(encoding))
+        response.headers['Cache-Control'] = self.cache_control
+        response.vary.add('Accept-Encoding')
+        return response
+
+
+def init_compression(app):
+    """
+    Compress responses on the fly
+
+    Settings (app.config): COMPRESS_MIN_SIZE (bytes, smaller responses
+    are sent as-is), COMPRESS_GZIP_LEVEL, COMPRESS_BROTLI_QUALITY.
+    """
+    min_size = app.config.get('COMPRESS_MIN_SIZE', 1024)
+    levels = {
+        'gzip': app.config.get('COMPRESS_GZIP_LEVEL', 6),
+        'br': app.config.get('COMPRESS_BROTLI_QUALITY', 4)
+    }
+
+    @app.after_request
+    def compress_response(response):
+        if (response.status_code != 200 or response.direct_passthrough
+                or response.is_streamed or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+
+        encoding = negotiate(request.headers.get('Accept-Encoding'))
+        if encoding is None:
+            return response
+
+        response.set_data(compress(data, encoding, levels[encoding]))
+        response.headers['Content-Encoding'] = encoding
+
+        # Different bytes: a strong ETag of the identity body no longer applies
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
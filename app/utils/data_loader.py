@@ -1,61 +1,177 @@
 """
 Data Loader - Load and cache bus route data
+
+Route data is served from a compiled, memory-mapped network snapshot
+(see app/utils/network_snapshot.py). The snapshot is rebuilt automatically
+when it is missing or out of date with bus_routes.json.
 """
 import json
+from collections.abc import Sequence
 from pathlib import Path
 from typing import Dict, List, Optional
 
+from app.utils.network_snapshot import (
+    DEFAULT_FOOTPATH_RADIUS, NetworkSnapshot, default_source_path,
+    snapshot_path_for, source_digest
+)
+
+
+class RouteSequence(Sequence):
+    """
+    List-like view of the routes in a snapshot.
+    Route dicts are materialized on first access and then cached.
+    """
+
+    def __init__(self, snapshot: NetworkSnapshot):
+        self._snapshot = snapshot
+        self._routes: List[Optional[Dict]] = [None] * snapshot.route_count
+
+    def __len__(self) -> int:
+        return len(self._routes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        route = self._routes[index]
+        if route is None:
+            route = self._snapshot.route_dict(index)
+            self._routes[index] = route
+        return route
+
+
 class DataLoader:
     """Singleton class to load and cache bus route data"""
-    
+
     _instance = None
     _bus_data = None
-    
+    _snapshot = None
+    _stop_indexes = None
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(DataLoader, cls).__new__(cls)
         return cls._instance
-    
+
     def load_bus_data(self, file_path: str = None) -> Dict:
         """
-        Load bus routes from JSON file (cached after first load)
-        
+        Load bus routes (cached after first load)
+
         Args:
             file_path: Path to bus_routes.json (optional)
-        
+
         Returns:
             Dict containing all bus route data
         """
         if self._bus_data is not None:
             return self._bus_data
-        
-        if file_path is None:
-            # Default path relative to project root
-            base_dir = Path(__file__).resolve().parent.parent.parent
-            file_path = base_dir / 'data' / 'bus_routes.json'
-        
+
+        snapshot = self.load_snapshot(file_path)
+        self._bus_data = {
+            'type': snapshot.network_type,
+            'routes': RouteSequence(snapshot),
+            'metadata': snapshot.metadata
+        }
+
+        print(f"✅ Loaded {snapshot.route_count} bus routes")
+        return self._bus_data
+
+    def load_snapshot(self, file_path: str = None) -> NetworkSnapshot:
+        """
+        Memory-map the compiled network snapshot, compiling it first if it
+        is missing or stale
+
+        Args:
+            file_path: Path to bus_routes.json (optional)
+
+        Returns:
+            NetworkSnapshot
+        """
+        if self._snapshot is not None:
+            return self._snapshot
+
+        source_path = Path(file_path) if file_path else default_source_path()
+        if not source_path.exists():
+            raise FileNotFoundError(f"Bus data file not found: {source_path}")
+
+        snapshot_path = snapshot_path_for(source_path)
+        digest = source_digest(source_path)
+
+        snapshot = None
+        if snapshot_path.exists():
+            try:
+                snapshot = NetworkSnapshot.open(snapshot_path)
+            except ValueError:
+                snapshot = None
+            if snapshot is not None and (
+                    snapshot.version != digest or
+                    snapshot.footpath_radius != DEFAULT_FOOTPATH_RADIUS):
+                snapshot = None
+
+        if snapshot is None:
+            snapshot = self._compile_snapshot(source_path, snapshot_path)
+
+        self._snapshot = snapshot
+        return snapshot
+
+    def _compile_snapshot(self, source_path: Path,
+                          snapshot_path: Path) -> NetworkSnapshot:
+        """Compile the snapshot, falling back to memory if the file can't be written"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                self._bus_data = json.load(f)
-            
-            print(f"✅ Loaded {len(self._bus_data['routes'])} bus routes")
-            return self._bus_data
-            
-        except FileNotFoundError:
-            raise FileNotFoundError(f"Bus data file not found: {file_path}")
+            return NetworkSnapshot.open(
+                NetworkSnapshot.compile(source_path, snapshot_path)
+            )
+        except OSError as e:
+            print(f"⚠️ Could not write network snapshot ({e}), using in-memory copy")
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON in bus data file: {e}")
+
+        with open(source_path, 'rb') as f:
+            raw = f.read()
+        try:
+            bus_data = json.loads(raw.decode('utf-8'))
         except json.JSONDecodeError as e:
             raise ValueError(f"Invalid JSON in bus data file: {e}")
-    
+        return NetworkSnapshot.from_bytes(
+            NetworkSnapshot.build(bus_data, source_digest(source_path))
+        )
+
+    def get_stop_index(self, cell_size: float = 500):
+        """
+        Spatial index over all stops (built once per cell size)
+
+        Args:
+            cell_size: Grid cell size in meters, usually the max walking distance
+
+        Returns:
+            StopSpatialIndex
+        """
+        from app.utils.spatial_index import StopSpatialIndex
+
+        if self._stop_indexes is None:
+            self._stop_indexes = {}
+        if cell_size not in self._stop_indexes:
+            self._stop_indexes[cell_size] = StopSpatialIndex(
+                self.load_snapshot(), cell_size
+            )
+        return self._stop_indexes[cell_size]
+
+    @property
+    def network_version(self) -> str:
+        """Version (source hash) of the loaded network"""
+        return self.load_snapshot().version
+
     def get_route_by_id(self, route_id: str) -> Optional[Dict]:
         """Get a specific route by ID"""
         if self._bus_data is None:
             self.load_bus_data()
-        
-        for route in self._bus_data['routes']:
-            if route['id'] == route_id:
-                return route
-        return None
-    
+
+        route_idx = self._snapshot.route_index(route_id)
+        if route_idx is None:
+            return None
+        return self._bus_data['routes'][route_idx]
+
     def get_all_routes(self) -> List[Dict]:
         """Get all routes"""
         if self._bus_data is None:
@@ -64,4 +180,4 @@ class DataLoader:
 
 
 # Create singleton instance
-data_loader = DataLoader()
\ No newline at end of file
+data_loader = DataLoader()
@@ -0,0 +1,62 @@
+"""
+Footpaths - Precomputed stop-to-stop walking transfers
+
+For every stop entry, lists the stops on other routes within walking
+radius together with the straight-line distance. The table is stored in
+CSR form inside the network snapshot:
+
+    footpath_offsets[e] .. footpath_offsets[e + 1]  ->  slice of
+    footpath_targets / footpath_distance for entry e (nearest first)
+"""
+from typing import Dict
+
+import numpy as np
+
+from app.services.distance_service import distance_service
+from app.utils.network_snapshot import NetworkSnapshot
+from app.utils.spatial_index import StopSpatialIndex
+
+
+def build_footpaths(snapshot: NetworkSnapshot, radius: float) -> Dict[str, np.ndarray]:
+    """
+    Compute the footpath table for a network
+
+    Args:
+        snapshot: Network snapshot (footpath arrays not required)
+        radius: Maximum walking distance in meters
+
+    Returns:
+        Dict with footpath_offsets, footpath_targets and footpath_distance arrays
+    """
+    index = StopSpatialIndex(snapshot, cell_size=radius)
+    lat, lon = snapshot.stop_lat, snapshot.stop_lon
+    stop_route = snapshot.stop_route
+
+    sources, targets, distances = [], [], []
+
+    # One distance matrix per grid cell: its stops x the stops around it
+    for cell, candidates in index.cell_neighbourhoods(radius):
+        matrix = distance_service.haversine_many(
+            lat[cell], lon[cell], lat[candidates], lon[candidates]
+        )
+        other_route = stop_route[cell][:, np.newaxis] != stop_route[candidates][np.newaxis, :]
+        rows, cols = np.nonzero((matrix <= radius) & other_route)
+
+        sources.append(cell[rows])
+        targets.append(candidates[cols])
+        distances.append(matrix[rows, cols])
+
+    sources = np.concatenate(sources) if sources else np.empty(0, dtype=np.int32)
+    targets = np.concatenate(targets) if targets else np.empty(0, dtype=np.int32)
+    distances = np.concatenate(distances) if distances else np.empty(0)
+
+    # Group by source entry, nearest first (ties keep network order)
+    order = np.lexsort((targets, distances, sources))
+    offsets = np.zeros(snapshot.stop_count + 1, dtype='<i4')
+    offsets[1:] = np.cumsum(np.bincount(sources, minlength=snapshot.stop_count))
+
+    return {
+        'footpath_offsets': offsets,
+        'footpath_targets': targets[order].astype('<i4'),
+        'footpath_distance': distances[order].astype('<f4'),
+    }
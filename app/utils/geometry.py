@@ -0,0 +1,188 @@
+"""
+Geometry - Polyline encoding and simplification of [lat, lon] paths
+
+Paths are encoded with the Google encoded polyline algorithm (precision
+5, about 1 m), which most map libraries decode (e.g. Leaflet plugins,
+@mapbox/polyline). Simplification is Douglas-Peucker with a tolerance in
+meters, computed on a local equirectangular projection.
+"""
+import math
+from typing import List, Optional, Sequence
+
+METERS_PER_DEGREE = 111320
+# Web Mercator ground resolution at the equator, zoom 0, 256 px tiles
+METERS_PER_PIXEL_Z0 = 156543.03
+
+ENCODINGS = ('coordinates', 'polyline')
+
+
+def _encode_value(value: int, chunks: List[str]):
+    value = ~(value << 1) if value < 0 else value << 1
+    while value >= 0x20:
+        chunks.append(chr((0x20 | (value & 0x1f)) + 63))
+        value >>= 5
+    chunks.append(chr(value + 63))
+
+
+def encode_polyline(points: Sequence[Sequence[float]], precision: int = 5) -> str:
+    """
+    Encode [lat, lon] points as a polyline string
+
+    Args:
+        points: List of [lat, lon]
+        precision: Decimal digits kept (5 = Google format)
+
+    Returns:
+        Encoded polyline
+    """
+    factor = 10 ** precision
+    chunks = []
+    prev_lat = prev_lon = 0
+    for lat, lon in points:
+        lat, lon = round(lat * factor), round(lon * factor)
+        _encode_value(lat - prev_lat, chunks)
+        _encode_value(lon - prev_lon, chunks)
+        prev_lat, prev_lon = lat, lon
+    return ''.join(chunks)
+
+
+def decode_polyline(encoded: str, precision: int = 5) -> List[List[float]]:
+    """Decode a polyline string into [lat, lon] points"""
+    factor = 10 ** precision
+    points = []
+    index = lat = lon = 0
+    while index < len(encoded):
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                byte = ord(encoded[index]) - 63
+                index += 1
+                result |= (byte & 0x1f) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lon += deltas[1]
+        points.append([lat / factor, lon / factor])
+    return points
+
+
+def _segment_distance(px, py, ax, ay, bx, by) -> float:
+    """Distance from point p to segment ab (projected coordinates)"""
+    dx, dy = bx - ax, by - ay
+    length2 = dx * dx + dy * dy
+    if length2 == 0:
+        return math.hypot(px - ax, py - ay)
+    t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / length2))
+    return math.hypot(px - ax - t * dx, py - ay - t * dy)
+
+
+def simplify(points: Sequence[Sequence[float]], tolerance: float) -> List:
+    """
+    Douglas-Peucker simplification
+
+    Args:
+        points: List of [lat, lon]
+        tolerance: Maximum distance in meters between the simplified and
+                   the original path
+
+    Returns:
+        Subset of points, first and last always kept
+    """
+    if tolerance <= 0 or len(points) < 3:
+        return list(points)
+
+    scale_x = METERS_PER_DEGREE * math.cos(math.radians(points[0][0]))
+    xy = [(lon * scale_x, lat * METERS_PER_DEGREE) for lat, lon in points]
+
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        ax, ay = xy[first]
+        bx, by = xy[last]
+        worst, worst_distance = None, tolerance
+        for i in range(first + 1, last):
+            distance = _segment_distance(*xy[i], ax, ay, bx, by)
+            if distance > worst_distance:
+                worst, worst_distance = i, distance
+        if worst is not None:
+            keep[worst] = True
+            stack.append((first, worst))
+            stack.append((worst, last))
+
+    return [point for point, kept in zip(points, keep) if kept]
+
+
+def circle(lat: float, lon: float, radius: float, count: int = 16) -> List[List[float]]:
+    """count points on a circle of radius meters around a point"""
+    dlat = radius / METERS_PER_DEGREE
+    dlon = dlat / math.cos(math.radians(lat))
+    return [
+        [lat + dlat * math.sin(2 * math.pi * i / count), lon + dlon * math.cos(2 * math.pi * i / count)]
+        for i in range(count)
+    ]
+
+
+def convex_hull(points: Sequence[Sequence[float]]) -> List[List[float]]:
+    """
+    Convex hull (Andrew's monotone chain)
+
+    Args:
+        points: List of [lat, lon]
+
+    Returns:
+        Closed ring of [lat, lon], counterclockwise on a map (first point repeated last)
+    """
+    # x = lon, y = lat: convexity doesn't depend on the scale of the axes
+    xy = sorted({(lon, lat) for lat, lon in points})
+    if len(xy) < 3:
+        return [[lat, lon] for lon, lat in xy]
+
+    def cross(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+    def chain(ordered):
+        hull = []
+        for point in ordered:
+            while len(hull) >= 2 and cross(hull[-2], hull[-1], point) <= 0:
+                hull.pop()
+            hull.append(point)
+        return hull[:-1]
+
+    ring = chain(xy) + chain(reversed(xy))
+    return [[lat, lon] for lon, lat in ring + ring[:1]]
+
+
+def zoom_tolerance(zoom: float, latitude: float = 0.0) -> float:
+    """Size in meters of one map pixel at a zoom level: detail below it is invisible"""
+    return METERS_PER_PIXEL_Z0 * math.cos(math.radians(latitude)) / 2 ** zoom
+
+
+def format_path(points: Optional[Sequence[Sequence[float]]], encoding: str = 'coordinates',
+                tolerance: Optional[float] = None, zoom: Optional[float] = None):
+    """
+    Path in the requested geometry format
+
+    Args:
+        points: List of [lat, lon], or None
+        encoding: 'coordinates' (list of [lat, lon]) or 'polyline' (string)
+        tolerance: Simplification tolerance in meters
+        zoom: Map zoom level the path is drawn at, sets the tolerance to
+              one pixel (ignored if tolerance is given)
+
+    Returns:
+        List of points, polyline string, or None if points is None
+    """
+    if not points:
+        return points
+    if tolerance is None and zoom is not None:
+        tolerance = zoom_tolerance(zoom, points[0][0])
+    if tolerance:
+        points = simplify(points, tolerance)
+    if encoding == 'polyline':
+        return encode_polyline(points)
+    return points
@@ -0,0 +1,65 @@
+"""
+JSON Provider - Fast JSON serialization for API responses
+
+Uses orjson when it is installed (several times faster than the standard
+library on large route results, and serializes numpy values directly),
+otherwise Flask's default provider.
+"""
+import json
+from typing import Any
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson"""
+
+    OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) if orjson else 0
+    # Insertion order is already deterministic, sorting only costs time
+    sort_keys = False
+
+    def dumps_bytes(self, obj: Any, indent: bool = False) -> bytes:
+        """Serialize to UTF-8 bytes (no str round trip)"""
+        options = self.OPTIONS | (orjson.OPT_INDENT_2 if indent else 0)
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(obj, default=self.default, option=options)
+        except TypeError:
+            # e.g. integers above 64 bits: the standard library handles them
+            return super().dumps(obj, indent=2 if indent else None).encode('utf-8')
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if kwargs.keys() - {'indent', 'separators'}:
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj, indent=bool(kwargs.get('indent'))).decode('utf-8')
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(
+            self.dumps_bytes(obj, indent=indent) + b'\n', mimetype=self.mimetype
+        )
+
+
+def json_bytes(obj: Any) -> bytes:
+    """Compact UTF-8 JSON of obj, outside of a request (e.g. precomputed payloads)"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=FastJSONProvider.OPTIONS)
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def init_json(app):
+    """Use the fast JSON provider if orjson is installed"""
+    if orjson is not None:
+        app.json = FastJSONProvider(app)
@@ -0,0 +1,359 @@
+"""
+Network Snapshot - Compiled columnar bus network loaded via mmap
+
+The JSON network is compiled once into a flat binary file:
+
+    MAGIC | uint32 header length | JSON header | 8-byte aligned arrays
+
+Every stop of every route becomes one row ("entry") in a set of parallel
+arrays. Coordinates are stored as int32 micro-degrees (~0.11 m precision)
+and every string (stop names, route ids, bus names, directions) is interned
+in a single UTF-8 string table. The walking transfers between stops are
+precomputed as a CSR footpath table (see app/utils/footpaths.py).
+Workers memory-map the file read-only, so loading is near-instant and the
+pages are shared through the OS page cache.
+
+Usage:
+    python -m app.utils.network_snapshot [bus_routes.json] [bus_routes.snapshot]
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+from config import Config
+
+MAGIC = b'TTNS'
+FORMAT_VERSION = 2
+ALIGNMENT = 8
+COORD_SCALE = 1_000_000  # micro-degrees
+
+# Footpath radius baked into the snapshot: the configured walking distance
+DEFAULT_FOOTPATH_RADIUS = Config.MAX_WALKING_DISTANCE
+
+
+def default_source_path() -> Path:
+    """Default path of bus_routes.json relative to project root"""
+    base_dir = Path(__file__).resolve().parent.parent.parent
+    return base_dir / 'data' / 'bus_routes.json'
+
+
+def snapshot_path_for(source_path: Union[str, Path]) -> Path:
+    """Snapshot file that belongs to a given JSON source file"""
+    return Path(source_path).with_suffix('.snapshot')
+
+
+def source_digest(source_path: Union[str, Path]) -> str:
+    """SHA-256 of the JSON source, used as the network version"""
+    with open(source_path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class NetworkSnapshot:
+    """Read-only columnar view of the bus network"""
+
+    def __init__(self, header: Dict, buffer, path: Optional[Path] = None):
+        self.header = header
+        self.path = path
+        self._buffer = buffer
+        self._strings: List[Optional[str]] = [None] * header['string_count']
+
+        for name, (dtype, offset, count) in header['arrays'].items():
+            array = np.frombuffer(buffer, dtype=dtype, count=count, offset=offset)
+            setattr(self, name, array)
+
+        self._route_index = {
+            self.string(string_id): i
+            for i, string_id in enumerate(self.route_id_sid)
+        }
+        self._stop_lat = None
+        self._stop_lon = None
+
+    # ------------------------------------------------------------------
+    # Metadata
+    # ------------------------------------------------------------------
+
+    @property
+    def version(self) -> str:
+        """Network version (hash of the JSON source the snapshot was built from)"""
+        return self.header['source_sha256']
+
+    @property
+    def network_type(self) -> str:
+        return self.header['type']
+
+    @property
+    def metadata(self) -> Dict:
+        return self.header['metadata']
+
+    @property
+    def footpath_radius(self) -> float:
+        """Walking radius the footpath table was built with"""
+        return self.header['footpath_radius']
+
+    @property
+    def route_count(self) -> int:
+        return len(self.route_offsets) - 1
+
+    @property
+    def stop_count(self) -> int:
+        return len(self.stop_lat_e6)
+
+    # ------------------------------------------------------------------
+    # Column accessors
+    # ------------------------------------------------------------------
+
+    @property
+    def stop_lat(self) -> np.ndarray:
+        """Stop latitudes in degrees (float64, computed once)"""
+        if self._stop_lat is None:
+            self._stop_lat = self.stop_lat_e6 / COORD_SCALE
+        return self._stop_lat
+
+    @property
+    def stop_lon(self) -> np.ndarray:
+        """Stop longitudes in degrees (float64, computed once)"""
+        if self._stop_lon is None:
+            self._stop_lon = self.stop_lon_e6 / COORD_SCALE
+        return self._stop_lon
+
+    def string(self, string_id: int) -> str:
+        """Decode an interned string (cached after first use)"""
+        string_id = int(string_id)
+        value = self._strings[string_id]
+        if value is None:
+            start = self.string_offsets[string_id]
+            end = self.string_offsets[string_id + 1]
+            value = self.string_data[start:end].tobytes().decode('utf-8')
+            self._strings[string_id] = value
+        return value
+
+    def route_index(self, route_id: str) -> Optional[int]:
+        """Index of a route by its id, or None"""
+        return self._route_index.get(route_id)
+
+    def route_slice(self, route_idx: int) -> slice:
+        """Entry range covered by a route"""
+        return slice(int(self.route_offsets[route_idx]),
+                     int(self.route_offsets[route_idx + 1]))
+
+    def footpaths(self, entry: int):
+        """
+        Walking transfers from a stop entry
+
+        Returns:
+            (target entries, distances in meters), nearest first
+        """
+        start = self.footpath_offsets[entry]
+        end = self.footpath_offsets[entry + 1]
+        return self.footpath_targets[start:end], self.footpath_distance[start:end]
+
+    # ------------------------------------------------------------------
+    # Dict views (same shape as bus_routes.json)
+    # ------------------------------------------------------------------
+
+    def stop_dict(self, entry: int) -> Dict:
+        """Build the JSON-shaped dict for one stop entry"""
+        return {
+            'stop_number': int(self.stop_number[entry]),
+            'stop_name': self.string(self.stop_name_sid[entry]),
+            'longitude': int(self.stop_lon_e6[entry]) / COORD_SCALE,
+            'latitude': int(self.stop_lat_e6[entry]) / COORD_SCALE
+        }
+
+    def route_dict(self, route_idx: int) -> Dict:
+        """Build the JSON-shaped dict for one route"""
+        entries = self.route_slice(route_idx)
+        return {
+            'id': self.string(self.route_id_sid[route_idx]),
+            'bus_name': self.string(self.route_bus_name_sid[route_idx]),
+            'type': self.string(self.route_type_sid[route_idx]),
+            'direction': self.string(self.route_direction_sid[route_idx]),
+            'stops': [self.stop_dict(e) for e in range(entries.start, entries.stop)]
+        }
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def open(cls, path: Union[str, Path]) -> 'NetworkSnapshot':
+        """Memory-map a compiled snapshot file"""
+        path = Path(path)
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(_read_header(buffer), buffer, path)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'NetworkSnapshot':
+        """Load a snapshot held in memory (used when the data dir is read-only)"""
+        return cls(_read_header(data), data)
+
+    # ------------------------------------------------------------------
+    # Compilation
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def build(cls, bus_data: Dict, source_sha256: str = '',
+              footpath_radius: float = DEFAULT_FOOTPATH_RADIUS) -> bytes:
+        """
+        Compile parsed bus_routes.json data into snapshot bytes
+
+        Args:
+            bus_data: Parsed bus_routes.json
+            source_sha256: Hash of the source file (network version)
+            footpath_radius: Walking radius for the footpath table in meters
+
+        Returns:
+            Snapshot file contents
+        """
+        from app.utils.footpaths import build_footpaths
+        strings: Dict[str, int] = {}
+
+        def intern(value: str) -> int:
+            if value not in strings:
+                strings[value] = len(strings)
+            return strings[value]
+
+        routes = bus_data['routes']
+        route_offsets = [0]
+        route_columns = {'id': [], 'bus_name': [], 'type': [], 'direction': []}
+        lat_e6, lon_e6, stop_number, stop_name_sid, stop_route = [], [], [], [], []
+
+        for route_idx, route in enumerate(routes):
+            for field, column in route_columns.items():
+                column.append(intern(str(route.get(field, ''))))
+
+            for stop in route['stops']:
+                lat_e6.append(round(stop['latitude'] * COORD_SCALE))
+                lon_e6.append(round(stop['longitude'] * COORD_SCALE))
+                stop_number.append(stop['stop_number'])
+                stop_name_sid.append(intern(stop['stop_name']))
+                stop_route.append(route_idx)
+
+            route_offsets.append(len(lat_e6))
+
+        encoded = [s.encode('utf-8') for s in strings]
+        string_offsets = np.zeros(len(encoded) + 1, dtype='<i4')
+        string_offsets[1:] = np.cumsum([len(b) for b in encoded])
+
+        arrays = {
+            'stop_lat_e6': np.asarray(lat_e6, dtype='<i4'),
+            'stop_lon_e6': np.asarray(lon_e6, dtype='<i4'),
+            'stop_number': np.asarray(stop_number, dtype='<i4'),
+            'stop_name_sid': np.asarray(stop_name_sid, dtype='<i4'),
+            'stop_route': np.asarray(stop_route, dtype='<i4'),
+            'route_offsets': np.asarray(route_offsets, dtype='<i4'),
+            'route_id_sid': np.asarray(route_columns['id'], dtype='<i4'),
+            'route_bus_name_sid': np.asarray(route_columns['bus_name'], dtype='<i4'),
+            'route_type_sid': np.asarray(route_columns['type'], dtype='<i4'),
+            'route_direction_sid': np.asarray(route_columns['direction'], dtype='<i4'),
+            'string_offsets': string_offsets,
+            'string_data': np.frombuffer(b''.join(encoded), dtype='u1'),
+        }
+
+        header = {
+            'format': FORMAT_VERSION,
+            'source_sha256': source_sha256,
+            'type': bus_data.get('type', 'bus'),
+            'metadata': bus_data.get('metadata', {}),
+            'string_count': len(encoded),
+            'footpath_radius': footpath_radius,
+            'arrays': {}
+        }
+
+        # Footpaths are computed from the stop columns themselves
+        empty = {
+            'footpath_offsets': np.zeros(len(lat_e6) + 1, dtype='<i4'),
+            'footpath_targets': np.empty(0, dtype='<i4'),
+            'footpath_distance': np.empty(0, dtype='<f4'),
+        }
+        stops_only = cls.from_bytes(_pack(dict(header, arrays={}), {**arrays, **empty}))
+        arrays.update(build_footpaths(stops_only, footpath_radius))
+
+        return _pack(header, arrays)
+
+    @classmethod
+    def compile(cls, source_path: Union[str, Path] = None,
+                snapshot_path: Union[str, Path] = None,
+                footpath_radius: float = DEFAULT_FOOTPATH_RADIUS) -> Path:
+        """
+        Compile bus_routes.json into a snapshot file (atomic write)
+
+        Returns:
+            Path of the written snapshot
+        """
+        source_path = Path(source_path or default_source_path())
+        snapshot_path = Path(snapshot_path or snapshot_path_for(source_path))
+
+        with open(source_path, 'rb') as f:
+            raw = f.read()
+        data = cls.build(json.loads(raw.decode('utf-8')),
+                         hashlib.sha256(raw).hexdigest(),
+                         footpath_radius)
+
+        fd, tmp_path = tempfile.mkstemp(dir=snapshot_path.parent,
+                                        prefix=snapshot_path.name + '.')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, snapshot_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        return snapshot_path
+
+
+def _pack(header: Dict, arrays: Dict[str, np.ndarray]) -> bytes:
+    """Lay out header + aligned arrays into a single byte string"""
+    # Header size depends on the offsets it records, so iterate until stable
+    header_len = 0
+    while True:
+        offset = _align(len(MAGIC) + 4 + header_len)
+        for name, array in arrays.items():
+            header['arrays'][name] = [array.dtype.str, offset, int(array.size)]
+            offset = _align(offset + array.nbytes)
+        header_bytes = json.dumps(header, sort_keys=True).encode('utf-8')
+        if len(header_bytes) == header_len:
+            break
+        header_len = len(header_bytes)
+
+    out = bytearray(MAGIC + struct.pack('<I', header_len) + header_bytes)
+    for name, array in arrays.items():
+        out.extend(b'\0' * (header['arrays'][name][1] - len(out)))
+        out.extend(array.tobytes())
+    return bytes(out)
+
+
+def _read_header(buffer) -> Dict:
+    if buffer[:len(MAGIC)] != MAGIC:
+        raise ValueError('Not a network snapshot file')
+    (header_len,) = struct.unpack_from('<I', buffer, len(MAGIC))
+    start = len(MAGIC) + 4
+    header = json.loads(bytes(buffer[start:start + header_len]).decode('utf-8'))
+    if header.get('format') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format: {header.get('format')}")
+    return header
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+if __name__ == '__main__':
+    source = sys.argv[1] if len(sys.argv) > 1 else None
+    target = sys.argv[2] if len(sys.argv) > 2 else None
+    written = NetworkSnapshot.compile(source, target)
+    snapshot = NetworkSnapshot.open(written)
+    print(f"✅ Compiled {snapshot.route_count} routes / {snapshot.stop_count} stops / "
+          f"{len(snapshot.footpath_targets)} footpaths "
+          f"into {written} ({written.stat().st_size // 1024} KB)")
@@ -0,0 +1,270 @@
+"""
+Rate Limiter - Throttling of calls to external APIs
+
+TokenBucketLimiter is shared by every worker on the machine: the bucket
+state lives in a small file updated under an exclusive file lock. Each
+caller reserves the next free slot while holding the lock and then
+sleeps until its slot outside of it, so requests are served in the order
+they reserved (GCRA, the reservation form of a token bucket).
+
+SingleFlight coalesces identical concurrent calls within a process: the
+first caller runs the function, the others wait and share its result.
+Both have coroutine variants for async views.
+"""
+import asyncio
+import os
+import struct
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: limiter only coordinates threads of one process
+    fcntl = None
+
+# Every limiter / single flight group created, by name, for the /metrics endpoint
+_limiters: Dict[str, 'TokenBucketLimiter'] = {}
+_flights: Dict[str, 'SingleFlight'] = {}
+
+_STATE = struct.Struct('<d')  # theoretical arrival time of the next request
+
+
+class RateLimitExceeded(Exception):
+    """The next free slot is further away than the caller is willing to wait"""
+
+
+class TokenBucketLimiter:
+    """Token bucket rate limiter shared across threads and processes"""
+
+    def __init__(self, name: str, rate: float, capacity: int = 1,
+                 state_path: Optional[str] = None):
+        """
+        Initialize limiter
+
+        Args:
+            name: Limiter name (key in limiter_stats())
+            rate: Tokens added per second
+            capacity: Bucket size (burst allowed after an idle period)
+            state_path: Shared state file, or None for a per-process limiter
+        """
+        self.name = name
+        self.interval = 1.0 / rate
+        self.tolerance = (capacity - 1) * self.interval
+        self.state_path = state_path if fcntl is not None else None
+
+        self._lock = threading.Lock()
+        self._tat = 0.0    # state when there is no state file
+        self._fd = None
+        self._fd_pid = None
+
+        self.waiting = 0
+        self.acquired = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+        if self.state_path:
+            directory = os.path.dirname(self.state_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+        _limiters[name] = self
+
+    def _file(self) -> int:
+        # One descriptor per process: a descriptor inherited across fork
+        # shares its lock with the parent
+        if self._fd is None or self._fd_pid != os.getpid():
+            self._fd = os.open(self.state_path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._fd_pid = os.getpid()
+        return self._fd
+
+    def _read_tat(self, fd: int) -> float:
+        data = os.pread(fd, _STATE.size, 0)
+        return _STATE.unpack(data)[0] if len(data) == _STATE.size else 0.0
+
+    def _reserve(self, max_wait: Optional[float]) -> float:
+        """Reserve the next slot, returns seconds to wait until it"""
+        with self._lock:
+            if self.state_path:
+                fd = self._file()
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                try:
+                    wait, tat = self._next_slot(self._read_tat(fd), max_wait)
+                    os.pwrite(fd, _STATE.pack(tat), 0)
+                finally:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                wait, self._tat = self._next_slot(self._tat, max_wait)
+
+            return wait
+
+    def _next_slot(self, tat: float, max_wait: Optional[float]):
+        now = time.time()
+        tat = max(tat, now)
+        wait = max(0.0, tat - self.tolerance - now)
+
+        if max_wait is not None and wait > max_wait:
+            self.rejected += 1
+            raise RateLimitExceeded(
+                f'{self.name}: next slot in {wait:.1f}s (max wait {max_wait:.1f}s)'
+            )
+
+        return wait, tat + self.interval
+
+    def acquire(self, max_wait: Optional[float] = None) -> float:
+        """
+        Wait for a token
+
+        Args:
+            max_wait: Give up (without taking a slot) if the wait would be
+                      longer than this many seconds
+
+        Returns:
+            Seconds waited
+
+        Raises:
+            RateLimitExceeded: if the wait would exceed max_wait
+        """
+        wait = self._reserve(max_wait)
+
+        if wait > 0:
+            with self._lock:
+                self.waiting += 1
+            try:
+                time.sleep(wait)
+            finally:
+                with self._lock:
+                    self.waiting -= 1
+
+        self._acquired(wait)
+        return wait
+
+    async def acquire_async(self, max_wait: Optional[float] = None) -> float:
+        """acquire() for coroutines: waits for the slot without blocking the event loop"""
+        wait = self._reserve(max_wait)
+
+        if wait > 0:
+            with self._lock:
+                self.waiting += 1
+            try:
+                await asyncio.sleep(wait)
+            finally:
+                with self._lock:
+                    self.waiting -= 1
+
+        self._acquired(wait)
+        return wait
+
+    def _acquired(self, wait: float):
+        with self._lock:
+            self.acquired += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def stats(self) -> Dict:
+        """
+        Queue depth and wait times
+
+        queue_depth counts the callers of this process waiting for their
+        slot; queue_seconds is how long a new caller would wait (all workers).
+        """
+        if self.state_path:
+            with self._lock:
+                tat = self._read_tat(self._file())
+        else:
+            tat = self._tat
+        queued = max(0.0, tat - self.tolerance - time.time())
+
+        return {
+            'rate_per_second': round(1.0 / self.interval, 3),
+            'shared': bool(self.state_path),
+            'queue_depth': self.waiting,
+            'queue_seconds': round(queued, 3),
+            'acquired': self.acquired,
+            'rejected': self.rejected,
+            'avg_wait_seconds': round(self.total_wait / self.acquired, 3) if self.acquired else None,
+            'max_wait_seconds': round(self.max_wait, 3)
+        }
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesce identical concurrent calls into one"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[str, _Call] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+
+        _flights[name] = self
+
+    def do(self, key: str, func: Callable[[], Any]) -> Any:
+        """
+        Run func, unless a call with the same key is already running:
+        then wait for it and return its result (or raise its exception)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        do() for coroutines: func() is awaited once per key at a time, on
+        the event loop of its first caller. A waiter giving up (cancelled)
+        doesn't cancel the call for the others.
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            self.calls += 1
+            task = self._tasks[key] = asyncio.ensure_future(func())
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict:
+        return {
+            'in_flight': len(self._calls) + len(self._tasks),
+            'calls': self.calls,
+            'coalesced': self.coalesced
+        }
+
+
+def limiter_stats() -> Dict[str, Dict]:
+    """Stats of every rate limiter and single flight group in this process"""
+    return {
+        **{name: limiter.stats() for name, limiter in _limiters.items()},
+        **{name: flight.stats() for name, flight in _flights.items()}
+    }
@@ -0,0 +1,171 @@
+"""
+Response Format - Compact route results, geometry and field projection
+
+Compact results refer to stops by id (snapshot entry, index into the stop
+table served by /api/stops) instead of repeating their name, number and
+coordinates, and drop values the client can derive. Geometry options
+encode and simplify paths (see app/utils/geometry.py). Field projection
+keeps only the requested (dotted) keys of every result.
+"""
+from typing import Callable, Dict, List, Optional
+
+from app.utils.geometry import ENCODINGS, format_path
+
+FORMATS = ('full', 'compact')
+
+# Keys holding a single stop summary
+STOP_KEYS = ('start_stop', 'end_stop', 'board_at', 'alight_at')
+
+
+def _compact_details(details: Dict) -> Dict:
+    """Walk segment details: stop names (and coordinates) replaced by stop ids"""
+    compact = {}
+    for key, value in details.items():
+        if key.endswith('_id') or (key == 'coordinates' and 'to_stop_id' in details):
+            continue
+        compact[key] = details.get(f'{key}_id', value)
+    return compact
+
+
+def compact_route(route: Dict) -> Dict:
+    """
+    Compact copy of a direct route or journey (the input is not modified)
+
+    Args:
+        route: Result of find_direct_routes() or find_journeys()
+
+    Returns:
+        Same structure with stops as ids and the validation valid flag
+        (a copy of route['valid']) removed
+    """
+    compact = {}
+    for key, value in route.items():
+        if key in STOP_KEYS:
+            compact[key] = value['stop_id']
+        elif key == 'intermediate_stops':
+            compact[key] = [stop['stop_id'] for stop in value]
+        elif key == 'segments':
+            compact[key] = [compact_route(segment) for segment in value]
+        elif key == 'details':
+            compact[key] = _compact_details(value)
+        elif key == 'validation':
+            compact[key] = {k: v for k, v in value.items() if k != 'valid'}
+        else:
+            compact[key] = value
+    return compact
+
+
+def project(result: Dict, fields: List[str]) -> Dict:
+    """
+    Keep only some fields of a result
+
+    Args:
+        result: Result dict
+        fields: Keys to keep, nested dict keys as dotted paths
+                (e.g. ['bus_line', 'walking.to_start_meters'])
+
+    Returns:
+        New dict with the fields present in result
+    """
+    projected = {}
+    for field in fields:
+        parts = field.split('.')
+        value = result
+        for part in parts:
+            if not isinstance(value, dict) or part not in value:
+                break
+            value = value[part]
+        else:
+            target = projected
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            target[parts[-1]] = value
+    return projected
+
+
+def parse_fields(fields) -> Optional[List[str]]:
+    """
+    Field list from a comma-separated string or a list of strings
+
+    Raises:
+        ValueError: for any other value
+    """
+    if fields is None:
+        return None
+    if isinstance(fields, str):
+        fields = fields.split(',')
+    elif not isinstance(fields, list) or not all(isinstance(f, str) for f in fields):
+        raise ValueError('fields must be a comma-separated string or a list of strings')
+    return [f.strip() for f in fields if f.strip()] or None
+
+
+def parse_geometry(get: Callable[[str], object]) -> Optional[Dict]:
+    """
+    Geometry options (format_path() arguments) of a request
+
+    Args:
+        get: Returns a request parameter by name, or None
+             ('geometry', 'tolerance' in meters, 'zoom')
+
+    Returns:
+        Dict of options, or None if the request has none
+
+    Raises:
+        ValueError: for invalid values
+    """
+    encoding, tolerance, zoom = get('geometry'), get('tolerance'), get('zoom')
+    if encoding is None and tolerance is None and zoom is None:
+        return None
+
+    encoding = encoding or 'coordinates'
+    if encoding not in ENCODINGS:
+        raise ValueError(f'geometry must be one of: {", ".join(ENCODINGS)}')
+    try:
+        tolerance = float(tolerance) if tolerance is not None else None
+        zoom = float(zoom) if zoom is not None else None
+    except (TypeError, ValueError):
+        raise ValueError('tolerance and zoom must be numbers')
+    if tolerance is not None and tolerance < 0:
+        raise ValueError('tolerance must be a non-negative number of meters')
+    if zoom is not None and not 0 <= zoom <= 22:
+        raise ValueError('zoom must be between 0 and 22')
+
+    return {'encoding': encoding, 'tolerance': tolerance, 'zoom': zoom}
+
+
+def route_geometry(route: Dict, geometry: Dict) -> Dict:
+    """
+    Copy of a direct route, journey or segment with its paths formatted
+
+    Walking paths are encoded / simplified, and routes and bus segments
+    get a 'line' through the stops they ride.
+    """
+    route = dict(route)
+    if isinstance(route.get('walking'), dict):
+        walking = route['walking'] = dict(route['walking'])
+        for key in ('to_start_path', 'from_end_path'):
+            if walking.get(key):
+                walking[key] = format_path(walking[key], **geometry)
+    if route.get('path'):
+        route['path'] = format_path(route['path'], **geometry)
+    if route.get('intermediate_stops'):
+        route['line'] = format_path([
+            [stop['coordinates']['latitude'], stop['coordinates']['longitude']]
+            for stop in route['intermediate_stops']
+        ], **geometry)
+    if 'segments' in route:
+        route['segments'] = [route_geometry(segment, geometry) for segment in route['segments']]
+    return route
+
+
+def format_routes(routes: List[Dict], compact: bool = False,
+                  fields: Optional[List[str]] = None,
+                  geometry: Optional[Dict] = None) -> List[Dict]:
+    """Route results in the requested format"""
+    if geometry:
+        routes = [route_geometry(route, geometry) for route in routes]
+    if compact:
+        routes = [compact_route(route) for route in routes]
+    if fields:
+        routes = [project(route, fields) for route in routes]
+    return routes
@@ -0,0 +1,182 @@
+"""
+Spatial Index - Uniform grid over all stops for radius queries
+
+Stops are projected to local metres (equirectangular around the network
+centre) and bucketed into square cells, by default sized to the maximum
+walking distance. A radius query only looks at the handful of cells that
+can contain a hit instead of the whole network.
+"""
+import math
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from app.services.distance_service import distance_service
+from app.utils.network_snapshot import NetworkSnapshot
+
+# Projection distortion over Greater Tunis is well under 1%,
+# pad the cell search so no stop at the edge of the radius is missed
+SEARCH_PADDING = 1.01
+
+
+class StopSpatialIndex:
+    """Grid index answering "which stops are within R metres of a point" """
+
+    def __init__(self, snapshot: NetworkSnapshot, cell_size: float = 500):
+        self.snapshot = snapshot
+        self.cell_size = float(cell_size)
+
+        lat = snapshot.stop_lat
+        lon = snapshot.stop_lon
+        self._lat0 = float((lat.min() + lat.max()) / 2) if len(lat) else 0.0
+        self._lon0 = float((lon.min() + lon.max()) / 2) if len(lon) else 0.0
+        self._x_scale = (math.radians(1) * distance_service.EARTH_RADIUS_METERS
+                         * math.cos(math.radians(self._lat0)))
+        self._y_scale = math.radians(1) * distance_service.EARTH_RADIUS_METERS
+
+        cx, cy = self._cells(lat, lon)
+        keys = self._keys(cx, cy)
+
+        # Entries grouped by cell (stable: entries keep network order in a cell)
+        self._order = np.argsort(keys, kind='stable').astype(np.int32)
+        sorted_keys = keys[self._order]
+        cell_keys, starts = np.unique(sorted_keys, return_index=True)
+        ends = np.append(starts[1:], len(sorted_keys))
+        self._cells_by_key: Dict[int, Tuple[int, int]] = {
+            int(k): (int(s), int(e)) for k, s, e in zip(cell_keys, starts, ends)
+        }
+
+        # Inverted index: routes serving each cell
+        self._routes_by_key: Dict[int, np.ndarray] = {
+            key: np.unique(snapshot.stop_route[self._order[start:end]])
+            for key, (start, end) in self._cells_by_key.items()
+        }
+
+    # ------------------------------------------------------------------
+    # Grid helpers
+    # ------------------------------------------------------------------
+
+    def _cells(self, lat, lon):
+        x = (np.asarray(lon, dtype=np.float64) - self._lon0) * self._x_scale
+        y = (np.asarray(lat, dtype=np.float64) - self._lat0) * self._y_scale
+        return (np.floor(x / self.cell_size).astype(np.int64),
+                np.floor(y / self.cell_size).astype(np.int64))
+
+    @staticmethod
+    def _keys(cx, cy):
+        # Cells fit comfortably in 32 bits each side
+        return (cx << 32) + (cy & 0xFFFFFFFF)
+
+    def cells_around(self, lat: float, lon: float, radius: float):
+        """Keys of the non-empty cells that may hold stops within radius"""
+        cx, cy = self._cells(lat, lon)
+        return self._cells_near(int(cx), int(cy), radius)
+
+    def _cells_near(self, cx: int, cy: int, radius: float):
+        span = int(math.ceil(radius * SEARCH_PADDING / self.cell_size))
+
+        keys = []
+        for dx in range(-span, span + 1):
+            for dy in range(-span, span + 1):
+                key = ((cx + dx) << 32) + ((cy + dy) & 0xFFFFFFFF)
+                if key in self._cells_by_key:
+                    keys.append(key)
+        return keys
+
+    def candidates(self, lat: float, lon: float, radius: float) -> np.ndarray:
+        """Entries in the cells around a point (superset of the radius hits)"""
+        chunks = [
+            self._order[start:end]
+            for start, end in (self._cells_by_key[k]
+                               for k in self.cells_around(lat, lon, radius))
+        ]
+        if not chunks:
+            return np.empty(0, dtype=np.int32)
+        return np.sort(np.concatenate(chunks))
+
+    def routes_near(self, lat: float, lon: float, radius: float) -> np.ndarray:
+        """
+        Routes with stops in the cells around a point, from the inverted
+        index (superset of the routes with a stop within radius)
+
+        Returns:
+            Sorted array of route indexes
+        """
+        chunks = [self._routes_by_key[k] for k in self.cells_around(lat, lon, radius)]
+        if not chunks:
+            return np.empty(0, dtype=np.int32)
+        return np.unique(np.concatenate(chunks))
+
+    def cell_neighbourhoods(self, radius: float):
+        """
+        Iterate over non-empty cells with the entries that may lie within
+        radius of any stop in the cell (used for bulk builds)
+
+        Yields:
+            (cell entries, candidate entries), both sorted by entry
+        """
+        for key, (start, end) in self._cells_by_key.items():
+            cx, cy = key >> 32, key & 0xFFFFFFFF
+            if cy >= 1 << 31:
+                cy -= 1 << 32
+            chunks = [self._order[s:e] for s, e in
+                      (self._cells_by_key[k] for k in self._cells_near(cx, cy, radius))]
+            yield np.sort(self._order[start:end]), np.sort(np.concatenate(chunks))
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def query_radius(self, lat: float, lon: float, radius: float,
+                     routes: Optional[np.ndarray] = None,
+                     among: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find all stop entries within radius metres of a point
+
+        Args:
+            lat, lon: Query point
+            radius: Search radius in meters
+            routes: Only consider stops of these route indexes (optional)
+            among: Sorted superset of the hits to search instead of the
+                   cells around the point (e.g. shared by nearby queries)
+
+        Returns:
+            (entries, distances) sorted by distance; ties keep network order
+        """
+        entries = self.candidates(lat, lon, radius) if among is None else among
+        if routes is not None:
+            entries = entries[np.isin(self.snapshot.stop_route[entries], routes)]
+        distances = distance_service.haversine_many(
+            lat, lon, self.snapshot.stop_lat[entries], self.snapshot.stop_lon[entries]
+        )
+
+        within = distances <= radius
+        entries = entries[within]
+        distances = distances[within]
+
+        order = np.argsort(distances, kind='stable')
+        return entries[order], distances[order]
+
+    def nearest_by_route(self, lat: float, lon: float, radius: float,
+                         routes: Optional[np.ndarray] = None,
+                         among: Optional[np.ndarray] = None) -> Dict[int, Tuple[int, float]]:
+        """
+        Nearest stop of every route that has a stop within radius
+
+        Args:
+            lat, lon: Query point
+            radius: Search radius in meters
+            routes: Only consider these route indexes (optional)
+            among: Superset of the hits, as for query_radius() (optional)
+
+        Returns:
+            Dict mapping route index to (entry, distance)
+        """
+        entries, distances = self.query_radius(lat, lon, radius, routes, among)
+
+        # Hits are sorted by distance: the first hit of each route is its nearest
+        routes, first = np.unique(self.snapshot.stop_route[entries], return_index=True)
+        return {
+            int(route_idx): (int(entries[i]), float(distances[i]))
+            for route_idx, i in zip(routes, first)
+        }
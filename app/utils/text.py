@@ -0,0 +1,63 @@
+"""
+Text utilities - Normalization of addresses and stop names
+"""
+import re
+import unicodedata
+
+# Common abbreviations in Tunisian addresses (French / transliterated Arabic)
+ABBREVIATIONS = {
+    'av': 'avenue',
+    'ave': 'avenue',
+    'bd': 'boulevard',
+    'bld': 'boulevard',
+    'blvd': 'boulevard',
+    'r': 'rue',
+    'pl': 'place',
+    'rte': 'route',
+    'imp': 'impasse',
+    'res': 'residence',
+    'cte': 'cite',
+    'sq': 'square',
+    'zi': 'zone industrielle',
+    'zt': 'zone touristique',
+    'hai': 'hay',
+    'bn': 'ben',
+}
+
+# Trailing country names add nothing: searches are restricted to Tunisia
+COUNTRY_SUFFIXES = ('tunisie', 'tunisia')
+
+# Punctuation and whitespace; letters of any script (Latin, Arabic) are kept
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def fold_accents(text: str) -> str:
+    """Case-folded text without accents (e.g. 'PÉPINIÉRE' -> 'pepiniere')"""
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def tokenize(text: str):
+    """Accent-folded words of a text, punctuation removed"""
+    return _NON_WORD.sub(' ', fold_accents(text)).split()
+
+
+def normalize_address(address: str) -> str:
+    """
+    Canonical form of an address, used as cache key
+
+    Case, accents, punctuation and whitespace are ignored and common
+    abbreviations expanded, so that "Av. Habib Bourguiba, TUNIS" and
+    "avenue habib bourguiba tunis" normalize to the same string. Empty
+    for an address without any letter or digit: such a key identifies
+    nothing and must not be cached.
+    """
+    words = [ABBREVIATIONS.get(word, word) for word in tokenize(address)]
+    normalized = ' '.join(words)
+
+    for suffix in COUNTRY_SUFFIXES:
+        if normalized.endswith(' ' + suffix):
+            normalized = normalized[:-len(suffix) - 1]
+            break
+
+    return normalized
@@ -0,0 +1,17 @@
+"""
+TransTu Project - ASGI Entry Point
+Async views (geocoding, walking paths, address searches) run on the
+event loop, calling Nominatim and OSRM through an async HTTP client.
+
+Run: uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 4
+"""
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from app import create_app
+from app.asgi import create_asgi_app
+
+app = create_asgi_app(create_app())
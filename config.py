@@ -37,6 +37,11 @@ class Config:
     
     # CORS
     CORS_ORIGINS = ['*']
+    
+    # Response compression (gzip, or brotli if installed)
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))  # bytes
+    COMPRESS_GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', 6))
+    COMPRESS_BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', 4))
 
 class DevelopmentConfig(Config):
     """Development configuration"""
@@ -0,0 +1,68 @@
+"""
+TransTu Project - Production server (gunicorn)
+Run: gunicorn -c gunicorn.conf.py
+
+The app is loaded in the master (preload_app): the network snapshot is
+mapped, indexed and warmed up once (warmup_service), then the workers are
+forked and share it copy-on-write. /ready answers 200 in every worker.
+
+Workers are recycled after GUNICORN_MAX_REQUESTS requests (with jitter,
+so not all at once); a new worker is forked from the warm master and
+serves immediately. Reloads:
+    kill -HUP <master>    new workers, same preloaded app and network
+    kill -USR2 <master>   new master loading the current code and network,
+                          then kill -QUIT the old master once the new
+                          one is ready (zero-downtime upgrade)
+"""
+import gc
+import multiprocessing
+import os
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# ASGI app with uvicorn workers (async views, see asgi.py); for a plain
+# WSGI setup: GUNICORN_APP=run:app GUNICORN_WORKER_CLASS=gthread
+wsgi_app = os.getenv('GUNICORN_APP', 'asgi:app')
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'uvicorn.workers.UvicornWorker')
+threads = int(os.getenv('GUNICORN_THREADS', 8))        # gthread workers only
+
+bind = f"{os.getenv('API_HOST', '0.0.0.0')}:{os.getenv('PORT', 5000)}"
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+
+preload_app = True
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 5000))
+max_requests_jitter = max_requests // 10
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))                  # seconds
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))  # seconds, to finish requests
+keepalive = 5
+
+accesslog = '-'
+
+
+def when_ready(server):
+    """Master: app loaded, warm up before the first worker is forked"""
+    from app.services.warmup_service import warmup_service
+
+    timings = warmup_service.run()
+    server.log.info(f"Warm-up done in {timings['total']:.0f} ms: {timings}")
+
+
+def pre_fork(server, worker):
+    # Keep the warmed objects out of the collector: its passes would
+    # write to (and so copy) every shared page in each worker
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    server.log.info(f"Worker {worker.pid} forked")
+
+
+def post_worker_init(worker):
+    """Worker: warm already if forked from the preloaded master, else warm up now"""
+    from app.services.warmup_service import warmup_service
+
+    warmup_service.run()
+    worker.log.info(f"Worker {worker.pid} ready")
@@ -4,6 +4,7 @@ Run this file to start the Flask development server
 """
 
 from app import create_app
+from app.services.warmup_service import warmup_service
 import os
 from dotenv import load_dotenv
 
@@ -25,4 +26,8 @@ if __name__ == '__main__':
     print(f" Debug mode: {debug}")
     print("=" * 70)
     
+    # Warm up before taking requests (/ready answers 200 from then on)
+    timings = warmup_service.run()
+    print(f" Warm-up done in {timings['total']:.0f} ms")
+    
     app.run(host=host, port=port, debug=debug)
\ No newline at end of file
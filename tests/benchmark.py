@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+BENCHMARK: Routing hot paths
+Run: python tests/benchmark.py
+"""
+
+import sys
+import os
+import time
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from app.services.distance_service import distance_service
+from app.utils.data_loader import data_loader
+
+# Sample points around Greater Tunis
+POINTS = [
+    (36.8008, 10.1865),    # TUNIS MARINE
+    (36.7927, 10.0944),    # PÉPINIÉRE
+    (36.7181, 9.8944),     # RELAIS BORJ EL AMRI
+    (36.8065, 10.1815),    # Avenue Habib Bourguiba
+    (36.5528, 9.9026),     # EPICIER LAGRAA
+    (36.8600, 10.3000),    # La Marsa
+]
+
+
+def timed(func, repeat):
+    """Average time per call in milliseconds"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def report(name, ms, baseline_ms=None):
+    line = f"  {name:<45} {ms:10.3f} ms"
+    if baseline_ms:
+        line += f"   ({baseline_ms / ms:,.0f}x faster)"
+    print(line)
+
+
+def bench_nearest_stop_lookup():
+    """Stops within MAX_WALKING_DISTANCE of a point: full scan vs grid index"""
+    print("\n  Nearest-stop lookup (per query)")
+    print("-" * 70)
+
+    routes = data_loader.get_all_routes()
+    index = data_loader.get_stop_index(500)
+
+    def full_scan():
+        for lat, lon in POINTS:
+            for route in routes:
+                for stop in route['stops']:
+                    distance_service.haversine_distance(
+                        lat, lon, stop['latitude'], stop['longitude']
+                    )
+
+    def vectorized_scan():
+        snapshot = data_loader.load_snapshot()
+        for lat, lon in POINTS:
+            distance_service.haversine_many(lat, lon, snapshot.stop_lat, snapshot.stop_lon)
+
+    def indexed():
+        for lat, lon in POINTS:
+            index.query_radius(lat, lon, 500)
+
+    scan_ms = timed(full_scan, 3) / len(POINTS)
+    vectorized_ms = timed(vectorized_scan, 200) / len(POINTS)
+    index_ms = timed(indexed, 200) / len(POINTS)
+    report("full scan (haversine per stop)", scan_ms)
+    report("full scan (haversine_many)", vectorized_ms, scan_ms)
+    report("grid index", index_ms, scan_ms)
+
+
+def bench_transfer_search():
+    """Journey search between sample points (RAPTOR)"""
+    from app.services.transfer_routing_service import transfer_routing_service
+    import contextlib
+    import io
+
+    print("\n  Transfer search (per origin/destination pair)")
+    print("-" * 70)
+
+    pairs = [(a, b) for a in POINTS for b in POINTS if a != b]
+    for max_transfers in (1, 2):
+        def search():
+            with contextlib.redirect_stdout(io.StringIO()):
+                for start, end in pairs:
+                    transfer_routing_service.find_journeys(
+                        *start, *end, max_transfers=max_transfers
+                    )
+        report(f"max_transfers={max_transfers}", timed(search, 3) / len(pairs))
+
+
+def bench_direct_search():
+    """Direct route search between sample points, walking paths not resolved"""
+    from app.services.routing_service import routing_service
+
+    print("\n  Direct search (per origin/destination pair)")
+    print("-" * 70)
+
+    pairs = [(a, b) for a in POINTS for b in POINTS if a != b]
+
+    def search():
+        for start, end in pairs:
+            routing_service.find_direct_routes(*start, *end, walking_top_k=0)
+
+    report("walking_top_k=0", timed(search, 20) / len(pairs))
+
+
+def bench_serialization():
+    """Response body of a transfer search: encoding, compression and transfer time"""
+    from app.services.transfer_routing_service import transfer_routing_service
+    from app.utils.compression import ENCODINGS, compress
+    from app.utils.json_provider import json_bytes, orjson
+    import contextlib
+    import io
+    import json
+
+    print("\n  Serialization (transfer search response, 10 journeys)")
+    print("-" * 70)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        routes = transfer_routing_service.find_journeys(
+            *POINTS[4], *POINTS[0], max_results=10, max_transfers=2
+        )
+    body = {'success': True, 'routes_found': len(routes), 'routes': routes}
+
+    stdlib_ms = timed(lambda: json.dumps(body, separators=(',', ':')).encode('utf-8'), 50)
+    report("json (standard library)", stdlib_ms)
+    if orjson is not None:
+        report("orjson", timed(lambda: json_bytes(body), 50), stdlib_ms)
+
+    # Transfer time of each encoding on a 10 Mbit/s link
+    data = json_bytes(body)
+    link_bytes_per_ms = 10e6 / 8 / 1000
+    print(f"  {'identity':<45} {len(data):>10,} bytes  {len(data) / link_bytes_per_ms:8.1f} ms transfer")
+    for encoding, level in [(e, l) for e in ENCODINGS for l in ((4, 11) if e == 'br' else (6, 9))]:
+        compressed = compress(data, encoding, level)
+        ms = timed(lambda: compress(data, encoding, level), 10)
+        print(f"  {f'{encoding} level {level} ({ms:.2f} ms)':<45} {len(compressed):>10,} bytes"
+              f"  {len(compressed) / link_bytes_per_ms:8.1f} ms transfer")
+
+
+def bench_matrix():
+    """200 x 200 travel time matrix vs one pair search per cell"""
+    from app.services.matrix_service import matrix_service
+    from app.services.transfer_routing_service import transfer_routing_service
+    import contextlib
+    import io
+    import random
+
+    print("\n  Travel time matrix (200 x 200, max_transfers=2)")
+    print("-" * 70)
+
+    rng = random.Random(1)
+    points = [(36.75 + rng.random() * 0.15, 10.05 + rng.random() * 0.2) for _ in range(200)]
+
+    sample = list(zip(points[:20], points[20:40]))
+
+    def pair_searches():
+        with contextlib.redirect_stdout(io.StringIO()):
+            for start, end in sample:
+                transfer_routing_service.find_journeys(*start, *end, max_results=1, max_transfers=2)
+    pairs_ms = timed(pair_searches, 1) / len(sample) * len(points) ** 2
+    report("pair searches (estimated)", pairs_ms)
+    report("matrix", timed(lambda: matrix_service.travel_times(points, points), 1), pairs_ms)
+
+
+def main():
+    print("\n" + "=" * 70)
+    print("  BENCHMARK: TransTu routing")
+    print("=" * 70)
+
+    bench_nearest_stop_lookup()
+    bench_direct_search()
+    bench_transfer_search()
+    bench_serialization()
+    bench_matrix()
+
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Test the ASGI serving mode: async views on the event loop
+"""
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import create_app
+from app.asgi import create_asgi_app
+from app.services.walking_service import walking_service
+from app.utils import async_io
+from tests.test_walking_service import osrm  # noqa: F401 (fixture)
+
+pytestmark = pytest.mark.skipif(async_io.httpx is None, reason='httpx is not installed')
+
+
+async def call(app, method, path, body=None):
+    """One HTTP request through the ASGI app: (status, headers, body)"""
+    messages = [{'type': 'http.request', 'body': json.dumps(body).encode() if body is not None else b''}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    path, _, query = path.partition('?')
+    await app({
+        'type': 'http', 'method': method, 'path': path, 'root_path': '',
+        'query_string': query.encode(), 'http_version': '1.1',
+        'headers': [(b'content-type', b'application/json')]
+    }, receive, send)
+    return sent[0]['status'], dict(sent[0]['headers']), b''.join(m.get('body', b'') for m in sent[1:])
+
+
+async def serving(app, requests):
+    """Run the lifespan (shared HTTP client) around concurrent requests"""
+    await async_io.open_http_client()
+    try:
+        return await asyncio.gather(*(call(app, *request) for request in requests))
+    finally:
+        await async_io.close_http_client()
+
+
+def test_upstream_calls_in_flight_without_threads(osrm, monkeypatch):
+    """Walking paths of concurrent requests are all in flight at once"""
+    host, port = osrm.server_address
+    monkeypatch.setattr(walking_service, 'base_url', f'http://{host}:{port}/route/v1/foot')
+    monkeypatch.setattr(walking_service, 'cache', None)
+    app = create_asgi_app(create_app('testing'))
+
+    requests = [
+        ('POST', '/api/routes/walking-path', {
+            'start_lat': 36.80, 'start_lon': 10.18 + i / 10000, 'end_lat': 36.81, 'end_lon': 10.19
+        })
+        for i in range(40)
+    ]
+    responses = asyncio.run(serving(app, requests))
+
+    assert all(status == 200 for status, _, _ in responses)
+    bodies = [json.loads(body) for _, _, body in responses]
+    assert all(body['distance_meters'] == 250 and 'fallback' not in body for body in bodies)
+    # More than the CPU thread pool could hold
+    assert osrm.max_in_flight > async_io.EXECUTOR_WORKERS
+
+    # Same response as the WSGI app, where the view falls back to the sync client
+    client = create_app('testing').test_client()
+    assert client.post('/api/routes/walking-path', json=requests[0][2]).get_json() == bodies[0]
+
+
+def test_sync_views_and_hooks_still_apply():
+    app = create_asgi_app(create_app('testing'))
+    (health, _, _), (geocode, headers, body), (missing, _, _) = asyncio.run(serving(app, [
+        ('GET', '/health'),
+        ('POST', '/api/geocode', {'address': 'TUNIS MARINE'}),
+        ('POST', '/api/geocode', {})
+    ]))
+
+    assert health == 200
+    assert geocode == 200 and json.loads(body)['source'] == 'gazetteer'
+    assert headers[b'access-control-allow-origin'] == b'*'
+    assert missing == 400
+
+
+def test_lifespan_startup_warms_up(monkeypatch):
+    """Served without gunicorn (uvicorn asgi:app), the worker still becomes ready"""
+    from app.services.warmup_service import warmup_service
+
+    monkeypatch.setattr(warmup_service, 'state', 'pending')
+    monkeypatch.setattr(warmup_service, 'timings_ms', {})
+    app = create_asgi_app(create_app('testing'))
+
+    async def startup_then_ready():
+        messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        before = await call(app, 'GET', '/ready')
+        await app({'type': 'lifespan'}, receive, send)
+        return before, await call(app, 'GET', '/ready'), sent
+
+    (before, _, _), (after, _, body), sent = asyncio.run(startup_then_ready())
+
+    assert sent == ['lifespan.startup.complete', 'lifespan.shutdown.complete']
+    assert (before, after) == (503, 200)
+    assert 'total' in json.loads(body)['warmup_ms']
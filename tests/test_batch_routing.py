@@ -0,0 +1,89 @@
+"""
+Test batch routing on the process pool
+"""
+import contextlib
+import io
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import create_app
+from app.services.batch_routing_service import BatchRoutingService
+from app.services.transfer_routing_service import transfer_routing_service
+
+TUNIS_MARINE = (36.8008, 10.1865)
+EPICIER_LAGRAA = (36.5528, 9.9026)
+PEPINIERE = (36.7927, 10.0944)
+
+
+def test_batch_matches_single_searches():
+    """Pool results equal one-by-one searches, in input order"""
+    pairs = [
+        (0, *EPICIER_LAGRAA, *TUNIS_MARINE),
+        (1, *PEPINIERE, *TUNIS_MARINE),
+        (2, *EPICIER_LAGRAA, *PEPINIERE),
+        (3, *EPICIER_LAGRAA, *TUNIS_MARINE),
+    ]
+    service = BatchRoutingService(workers=1, chunk_size=2)
+
+    # Pairs with the same origin are routed one after the other
+    order = [pair[0] for chunk in service.chunks(pairs) for pair in chunk]
+    assert order in ([0, 2, 3, 1], [1, 0, 2, 3])
+
+    results = list(service.route(pairs, options={'max_results': 5, 'max_transfers': 2}))
+    assert [r['index'] for r in results] == [0, 1, 2, 3]
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = transfer_routing_service.find_transfer_routes(
+            *EPICIER_LAGRAA, *TUNIS_MARINE, max_results=5, max_transfers=2
+        )
+    assert results[0]['routes'] == expected
+    assert results[3]['routes'] == expected
+
+    unordered = list(service.route(pairs, mode='direct', ordered=False))
+    assert sorted(r['index'] for r in unordered) == [0, 1, 2, 3]
+
+
+def test_nearby_points_share_stop_lookups():
+    """Points of one grid cell share the lookup and keep their own exact candidates"""
+    from app.services import batch_routing_service as batch
+    from app.services.routing_service import routing_service
+
+    batch._cell_stops.cache_clear()
+    points = [TUNIS_MARINE, (TUNIS_MARINE[0] + 0.0004, TUNIS_MARINE[1] - 0.0004)]
+    for lat, lon in points:
+        entries, distances = batch._candidates('journeys', lat, lon)
+        expected_entries, expected_distances = transfer_routing_service.stops_near(lat, lon)
+        assert np.array_equal(entries, expected_entries)
+        assert np.array_equal(distances, expected_distances)
+        assert batch._candidates('direct', lat, lon) == routing_service.nearest_stops_by_route(lat, lon)
+
+    info = batch._cell_stops.cache_info()
+    assert (info.misses, info.hits) == (2, 2)     # one lookup per mode for the cell
+
+
+def test_batch_endpoint_streams_ndjson():
+    client = create_app().test_client()
+    pairs = [
+        {'start': {'latitude': a[0], 'longitude': a[1]}, 'end': {'latitude': b[0], 'longitude': b[1]}}
+        for a, b in [(EPICIER_LAGRAA, TUNIS_MARINE), (PEPINIERE, TUNIS_MARINE)]
+    ]
+
+    response = client.post('/api/routes/batch', json={
+        'pairs': pairs, 'mode': 'journeys', 'format': 'compact', 'fields': ['total_time_minutes']
+    })
+    assert response.mimetype == 'application/x-ndjson'
+
+    lines = [json.loads(line) for line in response.data.splitlines()]
+    assert [line['index'] for line in lines[:-1]] == [0, 1]
+    assert all(set(route) == {'total_time_minutes'} for route in lines[0]['routes'])
+    assert lines[-1]['summary']['total'] == 2
+
+    bad = client.post('/api/routes/batch', json={'pairs': [{'start': {'latitude': 'x'}}]})
+    assert bad.status_code == 400
+    assert client.post('/api/routes/batch', json={'pairs': pairs, 'mode': 'fly'}).status_code == 400
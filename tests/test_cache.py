@@ -0,0 +1,107 @@
+"""
+Test two-tier cache
+"""
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.utils.cache import TwoTierCache, cache_stats
+
+
+def test_memory_lru_eviction_and_ttl():
+    """Memory tier keeps the most recently used entries and drops expired ones"""
+    cache = TwoTierCache('test_memory', ttl=60, memory_entries=2)
+
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1      # 'a' is now more recent than 'b'
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+
+    cache.set('short', 'value', ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get('short', 'default') == 'default'
+
+    stats = cache_stats()['test_memory']
+    assert stats['memory_hits'] == 3
+    assert stats['misses'] == 2
+    assert stats['memory_evictions'] == 2
+
+
+def test_disk_tier_shared_between_instances(tmp_path):
+    """A second cache on the same file (another worker) finds entries on disk"""
+    path = str(tmp_path / 'cache.sqlite')
+    writer = TwoTierCache('test_disk', ttl=60, disk_path=path)
+    writer.set('walk', {'path': [[36.8, 10.1], [36.81, 10.11]]})
+    writer.set('gone', 1, ttl=-1)
+
+    reader = TwoTierCache('test_disk', ttl=60, disk_path=path)
+    assert reader.get('walk') == {'path': [[36.8, 10.1], [36.81, 10.11]]}
+    assert reader.get('walk') == {'path': [[36.8, 10.1], [36.81, 10.11]]}
+    assert reader.get('gone') is None
+
+    stats = reader.stats()
+    assert (stats['disk_hits'], stats['memory_hits'], stats['misses']) == (1, 1, 1)
+    assert stats['disk_entries'] == 2
+
+
+def test_disk_eviction_keeps_permanent_entries(tmp_path):
+    """Size eviction drops least recently used entries with a TTL first"""
+    cache = TwoTierCache('test_evict', ttl=60, disk_path=str(tmp_path / 'cache.sqlite'),
+                         disk_entries=3)
+    cache.set('stop', 'permanent', permanent=True)
+    for i in range(5):
+        cache.set(f'key{i}', i)
+        time.sleep(0.001)
+
+    cache.disk.evict()
+    cache.memory.clear()
+
+    assert len(cache.disk) == 3
+    assert cache.get('stop') == 'permanent'
+    assert cache.get('key0') is None
+    assert cache.get('key4') == 4
+
+
+def test_disk_connection_reopened_after_fork(tmp_path, monkeypatch):
+    """A child process does not reuse the connection its parent opened"""
+    import os
+
+    cache = TwoTierCache('test_fork', ttl=60, disk_path=str(tmp_path / 'cache.sqlite'))
+    cache.set('key', 'value')
+    parent_db = cache.disk._connection()
+
+    monkeypatch.setattr(os, 'getpid', lambda: -1)
+    child_db = cache.disk._connection()
+    assert child_db is not parent_db
+    assert child_db is cache.disk._connection()
+    assert cache.disk.get('key')[0] == 'value'
+
+
+def test_disk_reads_do_not_write(tmp_path):
+    """Disk hits only queue coarse accessed_at refreshes, written with the next write"""
+    path = str(tmp_path / 'cache.sqlite')
+    TwoTierCache('test_touch', ttl=60, disk_path=path).set('a', 1)
+
+    reader = TwoTierCache('test_touch', ttl=60, disk_path=path)
+    db = reader.disk._connection()
+    (accessed_at,), = db.execute("SELECT accessed_at FROM test_touch WHERE key = 'a'")
+    changes = db.total_changes
+
+    assert reader.get('a') == 1                      # fresh: within touch_interval (ttl / 10)
+    assert reader.disk._touched == {}
+    reader.disk.touch_interval = 0
+    reader.memory.clear()
+    assert reader.get('a') == 1
+    assert db.total_changes == changes and not db.in_transaction
+    assert 'a' in reader.disk._touched
+
+    reader.set('b', 2)
+    (refreshed,), = db.execute("SELECT accessed_at FROM test_touch WHERE key = 'a'")
+    assert refreshed > accessed_at and reader.disk._touched == {}
@@ -0,0 +1,85 @@
+"""
+Test JSON provider and response compression
+"""
+import gzip
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import create_app
+from app.utils.compression import negotiate
+from app.utils.json_provider import orjson
+
+DIRECT = {
+    'start': {'latitude': 36.7927, 'longitude': 10.0944},
+    'end': {'latitude': 36.7181, 'longitude': 9.8944},
+    'walking_top_k': 0
+}
+
+
+def test_negotiate():
+    assert negotiate(None) is None
+    assert negotiate('gzip, deflate') == 'gzip'
+    assert negotiate('gzip;q=0, deflate') is None
+    assert negotiate('identity') is None
+    assert negotiate('*') is not None
+
+
+def test_large_responses_are_gzipped():
+    """Responses above the threshold are compressed if the client accepts it"""
+    client = create_app().test_client()
+
+    plain = client.post('/api/routes/direct', json=DIRECT)
+    zipped = client.post('/api/routes/direct', json=DIRECT, headers={'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in plain.headers
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in zipped.headers['Vary']
+    assert len(zipped.data) * 5 < len(plain.data)
+    assert gzip.decompress(zipped.data) == plain.data
+
+    small = client.get('/health', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in small.headers
+
+
+def test_precompressed_payload_etags():
+    """Static payloads: one strong ETag per encoding, any of them revalidates"""
+    client = create_app().test_client()
+
+    plain = client.get('/api/stops')
+    zipped = client.get('/api/stops', headers={'Accept-Encoding': 'gzip'})
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(zipped.data) == plain.data
+    assert zipped.headers['ETag'] != plain.headers['ETag']
+    assert not zipped.headers['ETag'].startswith('W/')
+
+    again = client.get('/api/stops', headers={
+        'Accept-Encoding': 'gzip', 'If-None-Match': zipped.headers['ETag']
+    })
+    assert again.status_code == 304
+
+
+@pytest.mark.skipif(orjson is None, reason='orjson not installed')
+def test_json_provider_serializes_numpy():
+    """Numpy values in results don't need converting first"""
+    app = create_app('production')
+    with app.app_context():
+        body = app.json.response({'count': np.int64(3), 'lat': np.float64(36.8)}).get_data()
+    assert body == b'{"count":3,"lat":36.8}\n'
+
+
+def test_index_page_precompressed():
+    """index.html is compressed once when templates don't auto-reload"""
+    client = create_app('production').test_client()
+
+    page = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert page.headers['Content-Encoding'] == 'gzip'
+    assert b'<html' in gzip.decompress(page.data).lower()
+
+    again = client.get('/', headers={'Accept-Encoding': 'gzip', 'If-None-Match': page.headers['ETag']})
+    assert again.status_code == 304
@@ -0,0 +1,52 @@
+"""
+Test batched distance calculations
+"""
+import random
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.distance_service import distance_service
+
+rng = random.Random(7)
+ORIGINS = [(rng.uniform(36.5, 37.1), rng.uniform(9.6, 10.4)) for _ in range(5)]
+TARGETS = [(rng.uniform(36.5, 37.1), rng.uniform(9.6, 10.4)) for _ in range(50)]
+LATS = [lat for lat, _ in TARGETS]
+LONS = [lon for _, lon in TARGETS]
+
+
+def test_haversine_many_matches_scalar():
+    """One origin to many targets agrees with haversine_distance"""
+    for lat, lon in ORIGINS:
+        batch = distance_service.haversine_many(lat, lon, LATS, LONS)
+        assert batch.shape == (len(TARGETS),)
+        scalar = [distance_service.haversine_distance(lat, lon, t_lat, t_lon)
+                  for t_lat, t_lon in TARGETS]
+        assert np.allclose(batch, scalar, rtol=1e-12, atol=1e-6)
+
+
+def test_haversine_many_matrix():
+    """N origins give an N x M matrix"""
+    lats = [lat for lat, _ in ORIGINS]
+    lons = [lon for _, lon in ORIGINS]
+    matrix = distance_service.haversine_many(lats, lons, LATS, LONS)
+    assert matrix.shape == (len(ORIGINS), len(TARGETS))
+    for i, (lat, lon) in enumerate(ORIGINS):
+        assert np.allclose(matrix[i], distance_service.haversine_many(lat, lon, LATS, LONS))
+
+
+def test_equirectangular_error_bound():
+    """Sub-kilometre distances stay within the documented 0.1 mm bound"""
+    lat, lon = 36.8008, 10.1865
+    lats = lat + np.array([rng.uniform(-0.009, 0.009) for _ in range(500)])
+    lons = lon + np.array([rng.uniform(-0.011, 0.011) for _ in range(500)])
+
+    exact = distance_service.haversine_many(lat, lon, lats, lons)
+    fast = distance_service.equirectangular_many(lat, lon, lats, lons)
+    under_1km = exact < 1000
+    assert under_1km.any()
+    assert np.max(np.abs(fast - exact)[under_1km]) < 1e-4
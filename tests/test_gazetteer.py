@@ -0,0 +1,66 @@
+"""
+Test stop-name gazetteer
+"""
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.gazetteer_service import gazetteer_service, place_key
+
+
+def test_place_key():
+    assert place_key('CITE BEN NASR-ALLER') == 'cite ben nasr'
+    assert place_key('ZAHROUNI-RETOUR') == 'zahrouni'
+    assert place_key('DEPOT ZAHROUNI ALLER') == 'depot zahrouni'
+    assert place_key('PÉPINIÉRE') == place_key('pepiniere')
+
+
+def test_geocode_stop_names():
+    """Exact, accent-insensitive, generic-word-insensitive and fuzzy matches"""
+    marine = gazetteer_service.geocode('TERMINUS TUNIS MARINE BUS')
+    assert marine['source'] == 'gazetteer'
+    assert marine['importance'] == 1.0
+
+    for query in ['tunis marine', 'Tunis Marine', 'tunis marin']:
+        result = gazetteer_service.geocode(query)
+        assert (result['latitude'], result['longitude']) == (marine['latitude'], marine['longitude'])
+        assert result['address'] == query
+
+    pepiniere = gazetteer_service.geocode('Pépinière')
+    assert abs(pepiniere['latitude'] - 36.7928) < 0.01
+
+    # Streets are left to Nominatim
+    assert gazetteer_service.geocode('Avenue Habib Bourguiba, Tunis') is None
+    assert gazetteer_service.geocode('   ') is None
+
+
+def test_autocomplete():
+    names = [place['name'] for place in gazetteer_service.autocomplete('bab s')]
+    assert names[0] == 'BAB SAADOUN'
+    # Prefix matches first, then fuzzy ones
+    prefix = [name for name in names if name.startswith('BAB S')]
+    assert names[:len(prefix)] == prefix and len(prefix) >= 2
+
+    # Word prefixes inside names, typos
+    assert 'TERMINUS TUNIS MARINE BUS' in [p['name'] for p in gazetteer_service.autocomplete('tunis ma')]
+    assert 'ZAHROUNI' in [p['name'] for p in gazetteer_service.autocomplete('zhrouni')]
+    assert len(gazetteer_service.autocomplete('cite', limit=3)) == 3
+
+
+def test_autocomplete_endpoint_latency():
+    from app import create_app
+
+    client = create_app('testing').test_client()
+    response = client.get('/api/autocomplete?q=tunis%20ma&limit=5')
+    data = response.get_json()
+    assert response.status_code == 200
+    assert data['results'][0]['name'] == 'TERMINUS TUNIS MARINE BUS'
+    assert client.get('/api/autocomplete?q=tunis&limit=50').status_code == 400
+
+    start = time.perf_counter()
+    for query in ['t', 'tu', 'tun', 'tuni', 'tunis', 'tunis m', 'cite e', 'bab', 'zahr', 'pepin']:
+        client.get(f'/api/autocomplete?q={query}')
+    assert (time.perf_counter() - start) / 10 < 0.01
@@ -0,0 +1,169 @@
+"""
+Test geocoding cache and address normalization
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.geocoding_service import GeocodingService
+from app.utils.cache import TwoTierCache
+from app.utils.text import normalize_address
+
+
+class FakeResponse:
+    def __init__(self, results):
+        self.results = results
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.results
+
+
+@pytest.fixture
+def nominatim(monkeypatch, tmp_path):
+    """Fake Nominatim: knows one address, counts requests and rate limiter waits"""
+    calls = {'requests': 0, 'waits': 0}
+
+    def fake_get(url, params=None, headers=None, timeout=None):
+        calls['requests'] += 1
+        if normalize_address(params['q']) == 'avenue habib bourguiba tunis':
+            return FakeResponse([{
+                'lat': '36.8000', 'lon': '10.1800',
+                'display_name': 'Avenue Habib Bourguiba, Tunis', 'type': 'road'
+            }])
+        return FakeResponse([])
+
+    def fake_wait():
+        calls['waits'] += 1
+
+    cache = TwoTierCache('test_geocoding', ttl=60, disk_path=str(tmp_path / 'geocoding.sqlite'))
+    monkeypatch.setattr(GeocodingService, 'CACHE', cache)
+    monkeypatch.setattr(GeocodingService, '_wait_for_rate_limit', fake_wait)
+    monkeypatch.setattr('app.services.geocoding_service.requests.get', fake_get)
+    return calls
+
+
+def test_normalize_address():
+    assert normalize_address('Av. Habib Bourguiba, TUNIS') == 'avenue habib bourguiba tunis'
+    assert normalize_address('  avenue   Habib-Bourguiba  Tunis, Tunisie ') == 'avenue habib bourguiba tunis'
+    assert normalize_address('Cité El Khadra') == 'cite el khadra'
+    assert normalize_address('Bd du 7 Novembre') == 'boulevard du 7 novembre'
+    assert normalize_address('شارع الحبيب بورقيبة، تونس') == 'شارع الحبيب بورقيبة تونس'
+    assert normalize_address('?!') == ''
+
+
+def test_cache_hits_skip_rate_limiter(nominatim):
+    """Equivalent spellings are looked up once, hits neither wait nor query"""
+    first = GeocodingService.geocode_address('Avenue Habib Bourguiba, Tunis')
+    second = GeocodingService.geocode_address('av. habib bourguiba TUNIS')
+
+    assert nominatim == {'requests': 1, 'waits': 1}
+    assert second['latitude'] == first['latitude'] == 36.8
+    assert second['address'] == 'av. habib bourguiba TUNIS'
+
+
+def test_arabic_addresses_get_their_own_results(nominatim, monkeypatch):
+    """Non-Latin addresses keep their letters: distinct keys, distinct lookups"""
+    places = {'شارع الحبيب بورقيبة': ('36.8000', '10.1800'), 'المرسى': ('36.8780', '10.3250')}
+
+    def fake_get(url, params=None, headers=None, timeout=None):
+        nominatim['requests'] += 1
+        lat, lon = places[params['q']]
+        return FakeResponse([{'lat': lat, 'lon': lon, 'display_name': params['q']}])
+    monkeypatch.setattr('app.services.geocoding_service.requests.get', fake_get)
+
+    avenue = GeocodingService.geocode_address('شارع الحبيب بورقيبة')
+    marsa = GeocodingService.geocode_address('المرسى')
+
+    assert nominatim['requests'] == 2
+    assert (avenue['latitude'], marsa['latitude']) == (36.8, 36.878)
+
+    resolved = list(GeocodingService.geocode_stream(['المرسى', 'شارع الحبيب بورقيبة', 'المرسى']))
+    assert sorted(indexes for indexes, _ in resolved) == [[0, 2], [1]]
+
+
+def test_negative_results_cached_with_short_ttl(nominatim, monkeypatch):
+    monkeypatch.setattr(GeocodingService, 'NEGATIVE_CACHE_TTL', 5)
+
+    assert GeocodingService.geocode_address('Nowhere street') is None
+    assert GeocodingService.geocode_address('nowhere   STREET') is None
+    assert nominatim['requests'] == 1
+
+    key = normalize_address('Nowhere street')
+    _, expires_at = GeocodingService.CACHE.disk.get(key)
+    GeocodingService.geocode_address('Avenue Habib Bourguiba, Tunis')
+    _, positive_expires_at = GeocodingService.CACHE.disk.get('avenue habib bourguiba tunis')
+    assert expires_at < positive_expires_at
+
+
+def test_concurrent_lookups_share_one_request(nominatim, monkeypatch):
+    import threading
+    import time
+
+    def slow_wait():
+        nominatim['waits'] += 1
+        time.sleep(0.1)
+    monkeypatch.setattr(GeocodingService, '_wait_for_rate_limit', slow_wait)
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda address=address: results.append(
+            GeocodingService.geocode_address(address)))
+        for address in ['Av Habib Bourguiba Tunis', 'avenue habib bourguiba, tunis'] * 3
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert nominatim == {'requests': 1, 'waits': 1}
+    assert all(result['latitude'] == 36.8 for result in results)
+
+
+def test_geocode_stream_dedupes_and_yields_local_hits_first(nominatim):
+    GeocodingService.geocode_address('Avenue Habib Bourguiba, Tunis')  # cached
+    nominatim['requests'] = 0
+    misses = GeocodingService.CACHE.stats()['misses']
+
+    addresses = [
+        'Nowhere street',
+        'TUNIS MARINE',                    # gazetteer
+        'av habib bourguiba, tunis',       # cache
+        'nowhere  STREET',                 # duplicate of 0
+        '',
+    ]
+    resolved = list(GeocodingService.geocode_stream(addresses))
+
+    assert nominatim['requests'] == 1
+    assert GeocodingService.CACHE.stats()['misses'] == misses + 1   # looked up once, counted once
+    assert sorted(i for indexes, _ in resolved for i in indexes) == [0, 1, 2, 3, 4]
+    # Upstream lookups come last
+    assert resolved[-1] == ([0, 3], None)
+    by_index = {i: result for indexes, result in resolved for i in indexes}
+    assert by_index[1]['source'] == 'gazetteer'
+    assert by_index[2]['latitude'] == 36.8
+
+
+def test_geocode_batch_endpoint_streams_ndjson(nominatim):
+    import json
+    from app import create_app
+
+    client = create_app('testing').test_client()
+    addresses = ['TUNIS MARINE', 'Avenue Habib Bourguiba, Tunis', 'Tunis Marine'] + ['Nowhere'] * 100
+    response = client.post('/api/geocode/batch', json={'addresses': addresses, 'stream': True})
+
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert lines[-1] == {'summary': {'total': 103, 'found': 3}}
+    assert [line['index'] for line in lines[:2]] == [0, 2]
+    assert sorted(line['index'] for line in lines[:-1]) == list(range(103))
+    assert nominatim['requests'] == 2
+
+    response = client.post('/api/geocode/batch', json={'addresses': addresses[:3]})
+    assert [r['found'] for r in response.get_json()['results']] == [True, True, True]
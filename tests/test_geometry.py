@@ -0,0 +1,72 @@
+"""
+Test polyline encoding and path simplification
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import create_app
+from app.utils.geometry import convex_hull, decode_polyline, encode_polyline, simplify, zoom_tolerance
+
+
+def test_polyline_round_trip():
+    """Google's reference example encodes and decodes back (to 1e-5 degrees)"""
+    points = [[38.5, -120.2], [40.7, -120.95], [43.252, -126.453]]
+    assert encode_polyline(points) == '_p~iF~ps|U_ulLnnqC_mqNvxq`@'
+
+    path = [[36.80651, 10.18153], [36.80661, 10.18163], [36.80013, 10.17652]]
+    decoded = decode_polyline(encode_polyline(path))
+    assert all(abs(a - b) < 1e-5 for p, q in zip(path, decoded) for a, b in zip(p, q))
+
+
+def test_convex_hull():
+    """Inner and collinear points are dropped, the ring is closed"""
+    square = [[0, 0], [0, 1], [1, 1], [1, 0]]
+    inner = [[0.5, 0.5], [0.2, 0.7], [0, 0.5]]
+    hull = convex_hull(square + inner)
+
+    assert hull[0] == hull[-1]
+    assert sorted(map(tuple, hull[:-1])) == sorted(map(tuple, square))
+    assert convex_hull([[1, 2], [1, 2]]) == [[1, 2]]
+
+
+def test_simplify_keeps_shape_within_tolerance():
+    """Points closer than the tolerance to the simplified line are dropped"""
+    # Straight line east with 2 m wiggles, then a 90° turn north
+    path = [[36.8 + (0.00002 if i % 2 else 0), 10.18 + i * 0.0001] for i in range(50)]
+    path += [[36.8 + i * 0.0001, 10.18 + 49 * 0.0001] for i in range(1, 50)]
+
+    simplified = simplify(path, tolerance=5)
+    assert simplified[0] == path[0] and simplified[-1] == path[-1]
+    assert len(simplified) <= 4
+    assert path[49] in simplified                  # the corner
+
+    assert len(simplify(path, tolerance=1)) > 50   # wiggles above 1 m are kept
+    assert zoom_tolerance(15, 36.8) < zoom_tolerance(12, 36.8)
+
+
+def test_routes_with_polyline_geometry():
+    """Route results carry encoded walking paths and a line through their stops"""
+    client = create_app().test_client()
+    body = {
+        'start': {'latitude': 36.7927, 'longitude': 10.0944},
+        'end': {'latitude': 36.7181, 'longitude': 9.8944},
+        'walking_top_k': 0
+    }
+
+    full = client.post('/api/routes/direct', json=body).get_json()
+    encoded = client.post('/api/routes/direct?format=compact&geometry=polyline', json=body).get_json()
+
+    route, compact = full['routes'][0], encoded['routes'][0]
+    line = decode_polyline(compact['line'])
+    assert len(line) == len(route['intermediate_stops'])
+    assert abs(line[0][0] - route['start_stop']['coordinates']['latitude']) < 1e-5
+    assert 'line' not in route
+
+    simplified = client.post('/api/routes/direct', json={**body, 'zoom': 10}).get_json()
+    assert len(simplified['routes'][0]['line']) < len(route['intermediate_stops'])
+
+    bad = client.post('/api/routes/direct?geometry=wkt', json=body)
+    assert bad.status_code == 400
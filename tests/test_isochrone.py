@@ -0,0 +1,79 @@
+"""
+Test isochrones (stops and area reachable within a time budget)
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import create_app
+from app.services.isochrone_service import IsochroneService
+from app.services.transfer_routing_service import transfer_routing_service
+
+TUNIS_MARINE = (36.8008, 10.1865)
+
+
+def inside(polygon, lat, lon):
+    """Point inside (or on) a counterclockwise convex ring"""
+    for (y1, x1), (y2, x2) in zip(polygon, polygon[1:]):
+        if (x2 - x1) * (lat - y1) - (y2 - y1) * (lon - x1) < -1e-9:
+            return False
+    return True
+
+
+def test_isochrone_stops_and_polygon():
+    service = IsochroneService(grid=100, cache_entries=10)
+    small = service.isochrone(*TUNIS_MARINE, 20)
+    large = service.isochrone(*TUNIS_MARINE, 40)
+
+    assert 0 < small['stops_count'] < large['stops_count']
+    assert all(stop['minutes'] <= 20 for stop in small['stops'])
+    assert [s['minutes'] for s in large['stops']] == sorted(s['minutes'] for s in large['stops'])
+    assert {s['stop_id'] for s in small['stops']} <= {s['stop_id'] for s in large['stops']}
+
+    polygon = large['polygon']
+    assert polygon[0] == polygon[-1]
+    assert all(inside(polygon, s['latitude'], s['longitude']) for s in large['stops'])
+
+    # Arrival times are those of an unbounded search: by bus, or walking after it
+    origin = (large['origin']['latitude'], large['origin']['longitude'])
+    result = transfer_routing_service.raptor.search(*origin, max_transfers=2)
+    for stop in large['stops'][::25]:
+        k, entry = stop['buses'], stop['stop_id']
+        labels = [result.board[k][entry]] if k < len(result.board) else []
+        if k:
+            labels.append(result.ride[k][entry])
+        assert round(float(min(labels)), 1) == stop['minutes']
+
+
+def test_isochrone_cached_per_snapped_origin():
+    service = IsochroneService(grid=100, cache_entries=10)
+    first = service.isochrone(*TUNIS_MARINE, 30)
+    nearby = service.isochrone(TUNIS_MARINE[0] + 0.00001, TUNIS_MARINE[1], 30)
+
+    assert nearby is first
+    assert service.cache.cache.stats()['memory_hits'] == 1
+
+
+def test_isochrone_endpoint():
+    client = create_app().test_client()
+
+    response = client.get('/api/isochrone?latitude=36.8008&longitude=10.1865&minutes=15')
+    data = response.get_json()
+    assert response.status_code == 200
+    assert data['stops'] and data['polygon'][0] == data['polygon'][-1]
+
+    encoded = client.post('/api/isochrone', json={
+        'latitude': 36.8008, 'longitude': 10.1865, 'minutes': 15, 'geometry': 'polyline'
+    }).get_json()
+    assert isinstance(encoded['polygon'], str)
+
+    assert client.get('/api/isochrone?latitude=36.8&longitude=10.18').status_code == 400
+    assert client.get('/api/isochrone?latitude=36.8&longitude=10.18&minutes=500').status_code == 400
+
+    origin = {'latitude': 36.8008, 'longitude': 10.1865, 'minutes': 15}
+    for max_transfers in (2.7, True, '1', -1, 9):
+        assert client.post('/api/isochrone', json={**origin, 'max_transfers': max_transfers}).status_code == 400
+    assert client.get('/api/isochrone?latitude=36.8&longitude=10.18&minutes=15&max_transfers=1.5').status_code == 400
+    assert client.get('/api/isochrone?latitude=36.8&longitude=10.18&minutes=15&max_transfers=1').status_code == 200
@@ -0,0 +1,81 @@
+"""
+Test the travel time matrix
+"""
+import contextlib
+import io
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import create_app
+from app.services.matrix_service import matrix_service
+from app.services.transfer_routing_service import transfer_routing_service
+
+TUNIS_MARINE = (36.8008, 10.1865)
+EPICIER_LAGRAA = (36.5528, 9.9026)
+PEPINIERE = (36.7927, 10.0944)
+SEA = (36.9000, 10.5000)
+
+
+def test_matrix_matches_pair_searches():
+    """Every cell holds the fastest journey of a pair search"""
+    origins = [EPICIER_LAGRAA, PEPINIERE, EPICIER_LAGRAA]
+    destinations = [TUNIS_MARINE, PEPINIERE, SEA]
+    matrix = matrix_service.travel_times(origins, destinations, max_transfers=2)
+
+    assert matrix['origins'] == 3 and matrix['destinations'] == 3
+    assert matrix['times_minutes'][0] == matrix['times_minutes'][2]
+
+    for i, origin in enumerate(origins[:2]):
+        for j, destination in enumerate(destinations):
+            targets = transfer_routing_service.stops_near(*destination)
+            result = transfer_routing_service.raptor.search(*origin, max_transfers=2)
+            arrivals = result.destination_arrivals(*targets)
+
+            if not arrivals:
+                assert matrix['times_minutes'][i][j] is None
+                assert matrix['transfers'][i][j] is None
+                continue
+            minutes, rides, _, _ = arrivals[0]
+            assert matrix['times_minutes'][i][j] == round(minutes, 1)
+            assert matrix['transfers'][i][j] == rides - 1
+
+    # No stops within walking distance of the sea
+    assert all(row[2] is None for row in matrix['times_minutes'])
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        journeys = transfer_routing_service.find_journeys(
+            *EPICIER_LAGRAA, *TUNIS_MARINE, max_results=1, max_transfers=2
+        )
+    assert journeys[0]['summary']['total_transfers'] == matrix['transfers'][0][0]
+
+
+def test_matrix_time_limit():
+    full = matrix_service.travel_times([EPICIER_LAGRAA], [TUNIS_MARINE, PEPINIERE])
+    fastest = min(t for t in full['times_minutes'][0] if t is not None)
+    limited = matrix_service.travel_times(
+        [EPICIER_LAGRAA], [TUNIS_MARINE, PEPINIERE], max_minutes=fastest + 1
+    )
+
+    assert limited['reachable'] == 1
+    assert fastest in limited['times_minutes'][0]
+
+
+def test_matrix_endpoint():
+    client = create_app().test_client()
+    points = [{'latitude': lat, 'longitude': lon} for lat, lon in [EPICIER_LAGRAA, TUNIS_MARINE]]
+
+    response = client.post('/api/routes/matrix', json={'origins': points, 'destinations': points})
+    data = response.get_json()
+    assert response.status_code == 200
+    assert len(data['times_minutes']) == 2 and len(data['transfers'][0]) == 2
+
+    assert client.post('/api/routes/matrix', json={'origins': [], 'destinations': points}).status_code == 400
+    assert client.post('/api/routes/matrix', json={
+        'origins': points, 'destinations': [{'latitude': 'x'}]
+    }).status_code == 400
+    assert client.post('/api/routes/matrix', json={
+        'origins': points, 'destinations': points, 'max_minutes': -5
+    }).status_code == 400
@@ -0,0 +1,71 @@
+"""
+Test network data endpoints
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import create_app
+from app.utils.data_loader import data_loader
+from app.utils.geometry import decode_polyline
+
+
+def test_network_lists_every_line():
+    client = create_app().test_client()
+    network = client.get('/api/network').get_json()
+
+    assert network['network_version'] == data_loader.network_version
+    assert len(network['lines']) == network['route_count'] == len(data_loader.get_all_routes())
+
+    line = network['lines'][0]
+    assert line['last_stop_id'] - line['first_stop_id'] + 1 == line['stops_count']
+    assert len(decode_polyline(line['line'])) == line['stops_count']
+
+
+def test_line_details_and_revalidation():
+    client = create_app().test_client()
+    route = data_loader.get_all_routes()[5]
+
+    response = client.get(f"/api/lines/{route['id']}")
+    line = response.get_json()
+    assert line['bus_line'] == route['bus_name']
+    assert [s['name'] for s in line['stops']] == [s['stop_name'] for s in route['stops']]
+
+    again = client.get(f"/api/lines/{route['id']}",
+                       headers={'If-None-Match': response.headers['ETag']})
+    assert again.status_code == 304
+
+    # Another line has another ETag
+    other = client.get(f"/api/lines/{data_loader.get_all_routes()[6]['id']}",
+                       headers={'If-None-Match': response.headers['ETag']})
+    assert other.status_code == 200
+
+    assert client.get('/api/lines/no_such_route').status_code == 404
+
+
+def test_tiles():
+    """Tiles hold the lines crossing them, and their stops from STOP_MIN_ZOOM on"""
+    from app.services.tile_service import tile_bounds, tile_service, tiles_covering
+
+    client = create_app().test_client()
+    tunis_marine = (36.8008, 10.1865, 36.8008, 10.1865)
+
+    (x, y), = tiles_covering(tunis_marine, 15)
+    tile = client.get(f'/api/tiles/15/{x}/{y}').get_json()
+    south, west, north, east = tile_bounds(15, x, y)
+    assert tile['lines'] and tile['stops']
+    assert all(south <= s['latitude'] < north and west <= s['longitude'] < east
+               for s in tile['stops'])
+
+    (x, y), = tiles_covering(tunis_marine, 11)
+    tile = client.get(f'/api/tiles/11/{x}/{y}').get_json()
+    assert tile['lines'] and not tile['stops']
+
+    # Built once per network version
+    assert tile_service.tile_payload(11, x, y) is tile_service.tile_payload(11, x, y)
+    assert tile_service.prerender([8]) >= 1
+
+    assert client.get('/api/tiles/30/0/0').status_code == 400
+    assert client.get('/api/tiles/15/99999/0').status_code == 400
@@ -0,0 +1,67 @@
+"""
+Test compiled network snapshot
+"""
+import json
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.utils.data_loader import data_loader
+from app.utils.network_snapshot import NetworkSnapshot, default_source_path
+
+
+def test_snapshot_matches_json():
+    """Dict views built from the snapshot match bus_routes.json"""
+    with open(default_source_path(), encoding='utf-8') as f:
+        source = json.load(f)
+
+    routes = data_loader.get_all_routes()
+    assert len(routes) == len(source['routes'])
+
+    for expected, route in zip(source['routes'], routes):
+        for field in ['id', 'bus_name', 'type', 'direction']:
+            assert route[field] == expected[field]
+        assert len(route['stops']) == len(expected['stops'])
+
+        for expected_stop, stop in zip(expected['stops'], route['stops']):
+            assert stop['stop_name'] == expected_stop['stop_name']
+            assert stop['stop_number'] == expected_stop['stop_number']
+            # Micro-degree precision (~0.11 m)
+            assert abs(stop['latitude'] - expected_stop['latitude']) <= 1e-6
+            assert abs(stop['longitude'] - expected_stop['longitude']) <= 1e-6
+
+
+def test_get_route_by_id():
+    route = data_loader.get_route_by_id('bus_23_aller')
+    assert route['bus_name'] == '23'
+    assert route['direction'] == 'aller'
+    assert data_loader.get_route_by_id('does_not_exist') is None
+
+
+def test_snapshot_round_trip(tmp_path):
+    """Compiling and memory-mapping a small network keeps every column"""
+    bus_data = {
+        'type': 'bus',
+        'metadata': {'source': 'test'},
+        'routes': [{
+            'id': 'bus_1_aller', 'bus_name': '1', 'type': 'bus', 'direction': 'aller',
+            'stops': [
+                {'stop_number': 1, 'stop_name': 'PÉPINIÉRE-ALLER',
+                 'latitude': 36.7927628745637, 'longitude': 10.0944179893849},
+                {'stop_number': 2, 'stop_name': 'TUNIS MARINE',
+                 'latitude': 36.8008, 'longitude': 10.1865}
+            ]
+        }]
+    }
+    path = tmp_path / 'network.snapshot'
+    path.write_bytes(NetworkSnapshot.build(bus_data, 'abc123'))
+
+    snapshot = NetworkSnapshot.open(path)
+    assert snapshot.version == 'abc123'
+    assert snapshot.route_count == 1
+    assert snapshot.stop_count == 2
+    assert snapshot.metadata == {'source': 'test'}
+    assert snapshot.route_dict(0)['stops'][0]['stop_name'] == 'PÉPINIÉRE-ALLER'
+    assert list(snapshot.stop_lat_e6) == [36792763, 36800800]
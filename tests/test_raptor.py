@@ -0,0 +1,119 @@
+"""
+Test RAPTOR journey search
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.distance_service import distance_service
+from app.services.transfer_routing_service import transfer_routing_service
+from app.utils.data_loader import data_loader
+
+PAIRS = [
+    ((36.7927, 10.0944), (36.7181, 9.8944)),     # PÉPINIÉRE → RELAIS BORJ EL AMRI
+    ((36.5528, 9.9026), (36.8008, 10.1865)),     # EPICIER LAGRAA → TUNIS MARINE
+    ((36.8400, 10.1900), (36.8000, 10.1000)),
+    ((36.8300, 10.1500), (36.8600, 10.3000)),
+]
+
+
+def best_direct_minutes(start, end):
+    """Brute force: fastest single-bus trip over every route and stop pair"""
+    snapshot = data_loader.load_snapshot()
+    speed = distance_service.WALKING_SPEED_M_PER_MIN
+    walk_from = distance_service.haversine_many(*start, snapshot.stop_lat, snapshot.stop_lon) / speed
+    walk_to = distance_service.haversine_many(*end, snapshot.stop_lat, snapshot.stop_lon) / speed
+    walk_from[walk_from * speed > 500] = np.inf
+    walk_to[walk_to * speed > 500] = np.inf
+
+    best = np.inf
+    for route_idx in range(snapshot.route_count):
+        stops = snapshot.route_slice(route_idx)
+        for i in range(stops.start, stops.stop):
+            if not np.isfinite(walk_from[i]):
+                continue
+            for j in range(i + 1, stops.stop):
+                total = walk_from[i] + (j - i) * distance_service.MINUTES_PER_STOP + walk_to[j]
+                best = min(best, total)
+    return best
+
+
+def test_single_bus_round_is_optimal():
+    """Round 1 finds the same fastest direct trip as a full enumeration"""
+    raptor = transfer_routing_service.raptor
+    index = transfer_routing_service.stop_index
+
+    for start, end in PAIRS:
+        targets, distances = index.query_radius(*end, 500)
+        result = raptor.search(*start, max_transfers=0)
+        arrivals = result.destination_arrivals(targets, distances)
+        found = arrivals[0][0] if arrivals else np.inf
+        assert np.isclose(found, best_direct_minutes(start, end))
+
+
+def test_more_transfers_never_slower():
+    raptor = transfer_routing_service.raptor
+    index = transfer_routing_service.stop_index
+
+    for start, end in PAIRS:
+        targets, distances = index.query_radius(*end, 500)
+        best = []
+        for max_transfers in range(3):
+            result = raptor.search(*start, max_transfers=max_transfers)
+            arrivals = result.destination_arrivals(targets, distances)
+            best.append(arrivals[0][0] if arrivals else np.inf)
+        assert best[0] >= best[1] >= best[2]
+
+
+def test_footpaths_without_table_match_table():
+    """Walks beyond the footpath table radius come from the stop index: same labels"""
+    from app.services.raptor_service import RaptorService
+
+    table = transfer_routing_service.raptor
+    assert table._use_footpath_table
+    fallback = RaptorService(table.max_walking_distance)
+    fallback._use_footpath_table = False
+
+    for start, _ in PAIRS[:2]:
+        expected = table.search(*start, max_transfers=2)
+        found = fallback.search(*start, max_transfers=2)
+        for k in range(1, expected.max_rides + 1):
+            assert np.allclose(found.ride[k], expected.ride[k])    # table distances are float32
+
+
+def test_journey_segments_are_consistent():
+    """Segments alternate walk/bus, ride forward and add up to the total"""
+    routes = transfer_routing_service.find_journeys(
+        36.5528, 9.9026, 36.8008, 10.1865, max_transfers=2
+    )
+    assert routes
+
+    for route in routes:
+        segments = route['segments']
+        types = [s['type'] for s in segments]
+        assert types[0] == 'walk' and types[-1] == 'walk'
+        assert all(a != b for a, b in zip(types, types[1:]))
+        assert [s['step'] for s in segments] == list(range(1, len(segments) + 1))
+        assert route['total_time_minutes'] == sum(s['duration_minutes'] for s in segments)
+
+        buses = [s for s in segments if s['type'] == 'bus']
+        assert route['summary']['total_transfers'] == len(buses) - 1
+        for bus in buses:
+            assert bus['stops_count'] > 0
+            assert len(bus['intermediate_stops']) == bus['stops_count'] + 1
+
+        for walk in segments[2:-1:2]:
+            assert walk['details']['is_transfer']
+            assert walk['distance_meters'] <= 500
+
+
+def test_transfer_routes_have_transfers():
+    routes = transfer_routing_service.find_transfer_routes(
+        36.7927, 10.0944, 36.7181, 9.8944, max_transfers=2
+    )
+    assert routes
+    assert all(1 <= r['summary']['total_transfers'] <= 2 for r in routes)
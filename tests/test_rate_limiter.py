@@ -0,0 +1,111 @@
+"""
+Test token bucket rate limiter and request coalescing
+"""
+import multiprocessing
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.utils.rate_limiter import (
+    RateLimitExceeded, SingleFlight, TokenBucketLimiter, fcntl, limiter_stats
+)
+
+RATE = 20  # requests per second
+
+
+def _worker(state_path, count, queue):
+    limiter = TokenBucketLimiter('test_shared', rate=RATE, state_path=state_path)
+    for _ in range(count):
+        limiter.acquire()
+        queue.put(time.time())
+
+
+@pytest.mark.skipif(fcntl is None, reason='file locks not available')
+def test_limiter_shared_across_processes(tmp_path):
+    """Two worker processes together never exceed the rate"""
+    state_path = str(tmp_path / 'limiter.state')
+    context = multiprocessing.get_context('fork')
+    queue = context.Queue()
+    workers = [
+        context.Process(target=_worker, args=(state_path, 4, queue))
+        for _ in range(2)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(10)
+
+    times = sorted(queue.get(timeout=1) for _ in range(8))
+    gaps = [b - a for a, b in zip(times, times[1:])]
+    assert min(gaps) > 1 / RATE * 0.8
+
+
+def test_limiter_burst_and_max_wait():
+    """Capacity allows a burst; callers that would wait too long don't take a slot"""
+    limiter = TokenBucketLimiter('test_burst', rate=RATE, capacity=3)
+
+    start = time.time()
+    for _ in range(3):
+        assert limiter.acquire() == 0
+    assert time.time() - start < 1 / RATE
+
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire(max_wait=0.01)
+    # The rejected caller did not push the queue back
+    assert limiter.acquire(max_wait=1) <= 1 / RATE + 0.01
+
+    stats = limiter_stats()['test_burst']
+    assert (stats['acquired'], stats['rejected']) == (4, 1)
+
+
+def test_limiter_serves_threads_in_reservation_order():
+    limiter = TokenBucketLimiter('test_fifo', rate=RATE)
+    served = []
+
+    def caller(i):
+        limiter.acquire()
+        served.append(i)
+
+    threads = []
+    for i in range(5):
+        threads.append(threading.Thread(target=caller, args=(i,)))
+        threads[-1].start()
+        time.sleep(0.005)
+    for thread in threads:
+        thread.join()
+
+    assert served == list(range(5))
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    flight = SingleFlight('test_flight')
+    calls = []
+    results = []
+
+    def slow_lookup():
+        calls.append(1)
+        time.sleep(0.1)
+        return {'latitude': 36.8}
+
+    threads = [
+        threading.Thread(target=lambda: results.append(flight.do('key', slow_lookup)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{'latitude': 36.8}] * 5
+    assert flight.stats() == {'in_flight': 0, 'calls': 1, 'coalesced': 4}
+
+    # Next call runs again, errors reach the caller
+    with pytest.raises(ValueError):
+        flight.do('key', lambda: int('not a number'))
@@ -0,0 +1,73 @@
+"""
+Test compact route responses and the stop table
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import create_app
+from app.utils.response_format import project
+
+DIRECT = {
+    'start': {'latitude': 36.7927, 'longitude': 10.0944},   # Near PÉPINIÉRE
+    'end': {'latitude': 36.7181, 'longitude': 9.8944},      # Near RELAIS BORJ EL AMRI
+    'walking_top_k': 0
+}
+
+
+def test_compact_direct_routes_use_stop_table_ids():
+    """Compact results are smaller and their stop ids resolve to the same stops"""
+    client = create_app().test_client()
+
+    full = client.post('/api/routes/direct', json=DIRECT)
+    compact = client.post('/api/routes/direct?format=compact', json=DIRECT)
+    assert len(compact.data) * 3 < len(full.data)
+
+    full, compact = full.get_json(), compact.get_json()
+    assert 'valid_routes_only' not in compact
+    assert compact['routes_found'] == full['routes_found']
+
+    table = client.get('/api/stops').get_json()
+    assert compact['network_version'] == table['network_version']
+
+    for full_route, compact_route in zip(full['routes'], compact['routes']):
+        stop = full_route['start_stop']
+        stop_id = compact_route['start_stop']
+        assert table['names'][table['name'][stop_id]] == stop['name']
+        assert table['latitude'][stop_id] == stop['coordinates']['latitude']
+        assert compact_route['intermediate_stops'] == [
+            s['stop_id'] for s in full_route['intermediate_stops']
+        ]
+
+
+def test_fields_projection():
+    """fields= keeps only the requested (dotted) keys"""
+    route = {'bus_line': '94', 'walking': {'to_start_meters': 7, 'from_end_meters': 12}}
+    assert project(route, ['bus_line', 'walking.to_start_meters', 'missing.key']) == {
+        'bus_line': '94', 'walking': {'to_start_meters': 7}
+    }
+
+    client = create_app().test_client()
+    response = client.post('/api/routes/direct', json={
+        **DIRECT, 'format': 'compact', 'fields': ['route_id', 'total_time_minutes']
+    }).get_json()
+    assert response['routes']
+    assert all(set(r) <= {'route_id', 'total_time_minutes'} for r in response['routes'])
+
+    bad = client.post('/api/routes/direct?format=tiny', json=DIRECT)
+    assert bad.status_code == 400
+
+
+def test_stop_table_revalidation():
+    """The stop table is sent once per network version"""
+    client = create_app().test_client()
+
+    first = client.get('/api/stops')
+    assert first.status_code == 200
+    assert first.get_json()['count'] == len(first.get_json()['latitude'])
+
+    again = client.get('/api/stops', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+    assert again.data == b''
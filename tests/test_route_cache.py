@@ -0,0 +1,79 @@
+"""
+Test route search result cache
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import create_app
+from app.services import route_cache as module
+from app.services.route_cache import RouteCache
+from app.utils.data_loader import data_loader
+
+
+def counting(result):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return result
+    return compute, calls
+
+
+def test_nearby_searches_share_a_result():
+    """Endpoints in the same grid cells and same parameters hit the cache"""
+    cache = RouteCache(grid=25, ttl=60, max_entries=10)
+    compute, calls = counting(['route'])
+
+    # Cell centers, then a few meters / ~110 m away
+    step = 25 / 111320
+    coordinates = tuple(round(value / step) * step for value in (36.8, 10.18, 36.85, 10.2))
+    nearby = tuple(value + 0.00003 for value in coordinates)
+    far = (coordinates[0] + 0.001,) + coordinates[1:]
+
+    assert cache.get_or_compute('direct', coordinates, {'walking_top_k': 3}, compute) == ['route']
+    assert cache.get_or_compute('direct', nearby, {'walking_top_k': 3}, compute) == ['route']
+    assert len(calls) == 1
+
+    cache.get_or_compute('direct', far, {'walking_top_k': 3}, compute)
+    cache.get_or_compute('direct', coordinates, {'walking_top_k': 0}, compute)
+    cache.get_or_compute('transfer', coordinates, {'walking_top_k': 3}, compute)
+    assert len(calls) == 4
+
+
+def test_new_network_version_recomputes(monkeypatch):
+    """Results of an older snapshot are never served"""
+    cache = RouteCache(grid=25, ttl=60, max_entries=10)
+    coordinates = (36.8, 10.18, 36.85, 10.2)
+
+    cache.get_or_compute('direct', coordinates, {}, lambda: 'old')
+    assert cache.get_or_compute('direct', coordinates, {}, lambda: 'new') == 'old'
+
+    class NewLoader:
+        network_version = data_loader.network_version + '-next'
+    monkeypatch.setattr(module, 'data_loader', NewLoader())
+
+    assert cache.get_or_compute('direct', coordinates, {}, lambda: 'new') == 'new'
+
+
+def test_endpoint_serves_cached_routes(monkeypatch):
+    """Repeated direct searches compute the routes once"""
+    cache = RouteCache(grid=25, ttl=60, max_entries=10)
+    monkeypatch.setattr('app.routes.routing.route_cache', cache)
+
+    client = create_app().test_client()
+    body = {
+        'start': {'latitude': 36.8065, 'longitude': 10.1815},
+        'end': {'latitude': 36.8380, 'longitude': 10.2150},
+        'walking_top_k': 0
+    }
+
+    first = client.post('/api/routes/direct', json=body).get_json()
+    second = client.post('/api/routes/direct', json=body).get_json()
+
+    assert first['routes'] == second['routes']
+    stats = cache.cache.stats()
+    assert stats['misses'] == 1
+    assert stats['memory_hits'] == 1
@@ -63,5 +63,62 @@ def test_direct_routes():
     print("✅ TESTS COMPLETE")
     print("=" * 70)
 
+def test_walking_paths_only_for_top_k(monkeypatch):
+    """Only the best valid routes query OSRM, the others get a path reference"""
+    from app.services import routing_service as module
+    
+    calls = []
+    def fake_walking_route(start_lat, start_lon, end_lat, end_lon, timeout=None):
+        calls.append((start_lat, start_lon, end_lat, end_lon))
+        return None
+    monkeypatch.setattr(module.walking_service, 'get_walking_route', fake_walking_route)
+    
+    routes = routing_service.find_direct_routes(
+        36.7927, 10.0944, 36.7181, 9.8944, walking_top_k=1
+    )
+    valid = [r for r in routes if r['valid']]
+    assert len(valid) >= 2
+    assert len(calls) == 2
+    
+    resolved = valid[0]['walking']
+    assert not resolved['estimated']
+    assert resolved['to_start_path'] and resolved['from_end_path']
+    assert 'to_start_path_ref' not in resolved
+    
+    for route in routes[1:]:
+        walking = route['walking']
+        assert walking['estimated']
+        assert walking['to_start_path'] is None
+        ref = walking['to_start_path_ref']
+        assert (ref['start_lat'], ref['start_lon']) == (36.7927, 10.0944)
+        assert ref['end_lat'] == route['start_stop']['coordinates']['latitude']
+        assert walking['to_start_meters'] <= routing_service.max_walking_distance
+    
+    # Ranking does not depend on which routes got paths
+    unresolved = routing_service.find_direct_routes(
+        36.7927, 10.0944, 36.7181, 9.8944, walking_top_k=0
+    )
+    assert len(calls) == 2
+    assert [r['route_id'] for r in unresolved] == [r['route_id'] for r in routes]
+
+
 if __name__ == "__main__":
-    test_direct_routes()
\ No newline at end of file
+    test_direct_routes()
+
+def test_endpoints_reject_boolean_integers():
+    """true / false are not integers: max_transfers, max_results, walking_top_k"""
+    from app import create_app
+
+    client = create_app('testing').test_client()
+    ends = {'start': {'latitude': 36.7927, 'longitude': 10.0944},
+            'end': {'latitude': 36.7181, 'longitude': 9.8944}}
+    for option in [{'max_transfers': True}, {'max_transfers': 1, 'max_results': True},
+                   {'walking_top_k': False}]:
+        response = client.post('/api/routes/direct', json={**ends, **option})
+        assert response.status_code == 400, option
+
+    transfer = client.post('/api/routes/transfer', json={
+        'from': 'TUNIS MARINE', 'to': 'PEPINIERE', 'max_transfers': True
+    })
+    assert transfer.status_code == 400
+    assert client.post('/api/routes/direct', json={**ends, 'max_transfers': 1}).status_code == 200
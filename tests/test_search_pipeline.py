@@ -0,0 +1,76 @@
+"""
+Test pipelined address search
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.geocoding_service import GeocodingService
+from app.services.routing_service import routing_service
+from app.services.search_pipeline import search_pipeline
+
+PLACES = {
+    'pepiniere': (36.7927, 10.0944),
+    'borj el amri': (36.7181, 9.8944),
+}
+UPSTREAM_SECONDS = 0.2
+
+
+@pytest.fixture
+def slow_geocoder(monkeypatch):
+    """Every address takes UPSTREAM_SECONDS to geocode"""
+    def geocode(address):
+        time.sleep(UPSTREAM_SECONDS)
+        if address not in PLACES:
+            return None
+        lat, lon = PLACES[address]
+        return {'latitude': lat, 'longitude': lon, 'display_name': address, 'address': address}
+
+    monkeypatch.setattr(GeocodingService, 'geocode_address', staticmethod(geocode))
+
+
+def test_endpoints_resolved_concurrently(slow_geocoder):
+    resolved = asyncio.run(search_pipeline.resolve_async(
+        'pepiniere', 'borj el amri', routing_service.nearest_stops_by_route
+    ))
+
+    timings = resolved['timings_ms']
+    assert timings['resolve'] < 1.5 * UPSTREAM_SECONDS * 1000
+    assert set(timings) == {'geocode_from', 'candidates_from', 'geocode_to', 'candidates_to', 'resolve'}
+    assert resolved['from_candidates'] == routing_service.nearest_stops_by_route(*PLACES['pepiniere'])
+
+    missing = asyncio.run(search_pipeline.resolve_async(
+        'pepiniere', 'nowhere', routing_service.nearest_stops_by_route
+    ))
+    assert missing['to'] is None and missing['to_candidates'] is None
+    assert 'candidates_to' not in missing['timings_ms']
+
+
+def test_address_search_matches_coordinate_search(slow_geocoder):
+    from app import create_app
+
+    client = create_app('testing').test_client()
+    by_address = client.post('/api/routes/search', json={
+        'from': 'pepiniere', 'to': 'borj el amri', 'walking_top_k': 0
+    }).get_json()
+    by_coordinates = routing_service.find_direct_routes(
+        *PLACES['pepiniere'], *PLACES['borj el amri'], walking_top_k=0
+    )
+
+    assert by_address['success']
+    assert by_address['routes'] == by_coordinates
+    assert by_address['timings_ms']['total'] >= by_address['timings_ms']['resolve']
+
+    transfer = client.post('/api/routes/transfer', json={
+        'from': 'pepiniere', 'to': 'borj el amri'
+    }).get_json()
+    assert 'routing' in transfer['timings_ms']
+
+    response = client.post('/api/routes/search', json={'from': 'pepiniere', 'to': 'nowhere'})
+    assert response.status_code == 404
@@ -0,0 +1,90 @@
+"""
+Test stop spatial index
+"""
+import random
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.distance_service import distance_service
+from app.utils.data_loader import data_loader
+
+
+def brute_force(lat, lon, radius):
+    snapshot = data_loader.load_snapshot()
+    hits = []
+    for entry in range(snapshot.stop_count):
+        distance = distance_service.haversine_distance(
+            lat, lon, snapshot.stop_lat[entry], snapshot.stop_lon[entry]
+        )
+        if distance <= radius:
+            hits.append((distance, entry))
+    return [entry for _, entry in sorted(hits)]
+
+
+def test_query_radius_matches_full_scan():
+    """Grid query returns exactly the stops a full scan finds, nearest first"""
+    index = data_loader.get_stop_index(500)
+    rng = random.Random(42)
+
+    for _ in range(25):
+        lat = rng.uniform(36.70, 36.90)
+        lon = rng.uniform(9.95, 10.30)
+        for radius in (200, 500, 1200):
+            entries, distances = index.query_radius(lat, lon, radius)
+            assert list(entries) == brute_force(lat, lon, radius)
+            assert all(d <= radius for d in distances)
+            assert list(distances) == sorted(distances)
+
+
+def test_nearest_by_route():
+    """Each route maps to its closest stop around the point"""
+    index = data_loader.get_stop_index(500)
+    snapshot = data_loader.load_snapshot()
+    lat, lon = 36.8008, 10.1865  # TUNIS MARINE
+
+    nearest = index.nearest_by_route(lat, lon, 500)
+    assert nearest
+
+    for route_idx, (entry, distance) in nearest.items():
+        assert snapshot.stop_route[entry] == route_idx
+        stops = snapshot.route_slice(route_idx)
+        closest = min(
+            distance_service.haversine_distance(
+                lat, lon, snapshot.stop_lat[e], snapshot.stop_lon[e]
+            )
+            for e in range(stops.start, stops.stop)
+        )
+        assert abs(distance - closest) < 1e-6
+
+
+def test_footpaths_match_radius_query():
+    """Footpath table lists every other-route stop within the walking radius"""
+    index = data_loader.get_stop_index(500)
+    snapshot = data_loader.load_snapshot()
+    radius = snapshot.footpath_radius
+    rng = random.Random(3)
+
+    for entry in rng.sample(range(snapshot.stop_count), 200):
+        entries, _ = index.query_radius(snapshot.stop_lat[entry], snapshot.stop_lon[entry], radius)
+        expected = [e for e in entries if snapshot.stop_route[e] != snapshot.stop_route[entry]]
+
+        targets, distances = snapshot.footpaths(entry)
+        assert sorted(targets) == sorted(expected)
+        assert list(distances) == sorted(distances)
+
+
+def test_routes_near_covers_radius_hits():
+    """Inverted cell index never misses a route with a stop in range"""
+    index = data_loader.get_stop_index(500)
+    snapshot = data_loader.load_snapshot()
+    rng = random.Random(11)
+
+    for _ in range(50):
+        lat = rng.uniform(36.70, 36.90)
+        lon = rng.uniform(9.95, 10.30)
+        entries, _ = index.query_radius(lat, lon, 500)
+        routes = set(index.routes_near(lat, lon, 500).tolist())
+        assert set(snapshot.stop_route[entries].tolist()) <= routes
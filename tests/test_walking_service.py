@@ -0,0 +1,191 @@
+"""
+Test walking service against a local fake OSRM server
+"""
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.walking_service import WalkingService
+
+# Legs starting at this longitude are answered after SLOW_SECONDS
+SLOW_LON = 10.5
+SLOW_SECONDS = 1.0
+
+
+class FakeOSRMHandler(BaseHTTPRequestHandler):
+    """Answers /route/v1/foot/<lon,lat;lon,lat> with a straight 3-point route"""
+
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            server.clients.add(self.client_address)
+            server.requests += 1
+
+        coords = self.path.split('?')[0].rsplit('/', 1)[-1]
+        (start_lon, start_lat), (end_lon, end_lat) = [
+            [float(value) for value in point.split(',')] for point in coords.split(';')
+        ]
+        time.sleep(SLOW_SECONDS if start_lon == SLOW_LON else 0.05)
+
+        body = json.dumps({
+            'code': 'Ok',
+            'routes': [{
+                'distance': 250.0,
+                'duration': 180.0,
+                'geometry': {'coordinates': [
+                    [start_lon, start_lat],
+                    [(start_lon + end_lon) / 2, (start_lat + end_lat) / 2],
+                    [end_lon, end_lat]
+                ]}
+            }]
+        }).encode()
+
+        with server.lock:
+            server.in_flight -= 1
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def osrm():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeOSRMHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.in_flight = 0
+    server.max_in_flight = 0
+    server.clients = set()
+    server.requests = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def service_for(server, **kwargs):
+    host, port = server.server_address
+    return WalkingService(f'http://{host}:{port}/route/v1/foot', **kwargs)
+
+
+def test_walking_route_reuses_connection(osrm):
+    """Sequential calls go through one kept-alive connection"""
+    service = service_for(osrm)
+
+    for _ in range(3):
+        walk = service.get_walking_route(36.80, 10.18, 36.81, 10.19)
+        assert walk['distance_meters'] == 250
+        assert walk['duration_minutes'] == 3.0
+        assert walk['path'][0] == [36.80, 10.18]
+        assert walk['path'][-1] == [36.81, 10.19]
+
+    assert len(osrm.clients) == 1
+
+
+def test_walking_routes_concurrency_cap(osrm):
+    """Legs are fetched concurrently, never more than max_concurrency at once"""
+    service = service_for(osrm)
+    legs = [(36.80, 10.18 + i / 1000, 36.81, 10.19) for i in range(12)]
+
+    start = time.perf_counter()
+    walks = service.get_walking_routes(legs, max_concurrency=4)
+    elapsed = time.perf_counter() - start
+
+    assert [walk['path'][0] for walk in walks] == [[lat, lon] for lat, lon, _, _ in legs]
+    assert all(len(walk['path']) == 3 for walk in walks)
+    assert 1 < osrm.max_in_flight <= 4
+    assert elapsed < 12 * 0.05
+
+
+def test_walking_routes_deadline_fallback(osrm):
+    """Legs not answered within the deadline get the straight line fallback"""
+    service = service_for(osrm)
+    legs = [
+        (36.80, 10.18, 36.81, 10.19),
+        (36.80, SLOW_LON, 36.81, 10.19),
+        (36.82, 10.18, 36.81, 10.19),
+    ]
+
+    start = time.perf_counter()
+    walks = service.get_walking_routes(legs, deadline=0.5)
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < SLOW_SECONDS
+    assert len(walks[0]['path']) == 3
+    assert len(walks[2]['path']) == 3
+    assert walks[1] == WalkingService.get_straight_line_fallback(*legs[1])
+
+
+def test_walking_routes_unreachable_server():
+    """Connection errors fall back to straight lines"""
+    service = WalkingService('http://127.0.0.1:9/route/v1/foot')
+    legs = [(36.80, 10.18, 36.81, 10.19)]
+
+    assert service.get_walking_routes(legs) == [WalkingService.get_straight_line_fallback(*legs[0])]
+
+
+def test_walking_route_cache(osrm, tmp_path):
+    """Nearby endpoints share a cache entry, stop-to-stop walks are permanent"""
+    from app.utils.cache import TwoTierCache
+
+    cache = TwoTierCache('test_walking', ttl=60, disk_path=str(tmp_path / 'walking.sqlite'))
+    service = service_for(osrm, cache=cache, cache_grid=25)
+
+    first = service.get_walking_route(36.80000, 10.18000, 36.81, 10.19)
+    # ~5 m away: same grid cell
+    assert service.get_walking_route(36.80004, 10.18003, 36.81, 10.19) == first
+    assert osrm.requests == 1
+
+    key = service.stop_cache_key('v1', 10, 20)
+    service.get_walking_route(36.80, 10.18, 36.82, 10.20, cache_key=key, permanent=True)
+    assert cache.disk.get(key)[1] is None  # no expiry
+
+    stats = cache.stats()
+    assert (stats['memory_hits'], stats['misses']) == (1, 2)
+
+
+def test_stop_walk_endpoint_ignores_client_coordinates(osrm, tmp_path, monkeypatch):
+    """The permanent stop-to-stop entry is the walk between the stops, not between sent coordinates"""
+    from app import create_app
+    from app.services.walking_service import walking_service
+    from app.utils.cache import TwoTierCache
+    from app.utils.data_loader import data_loader
+
+    host, port = osrm.server_address
+    cache = TwoTierCache('test_stop_walks', ttl=60, disk_path=str(tmp_path / 'walking.sqlite'))
+    monkeypatch.setattr(walking_service, 'base_url', f'http://{host}:{port}/route/v1/foot')
+    monkeypatch.setattr(walking_service, 'cache', cache)
+    snapshot = data_loader.load_snapshot()
+    client = create_app('testing').test_client()
+
+    ref = {'from_stop': 0, 'to_stop': 1, 'network_version': data_loader.network_version}
+    response = client.post('/api/routes/walking-path', json={
+        **ref, 'start_lat': 10.0, 'start_lon': 10.0, 'end_lat': 11.0, 'end_lon': 11.0
+    })
+    assert response.status_code == 200
+
+    key = walking_service.stop_cache_key(data_loader.network_version, 0, 1)
+    path = cache.get(key)['path']
+    assert path[0] == [float(snapshot.stop_lat[0]), float(snapshot.stop_lon[0])]
+    assert path[-1] == [float(snapshot.stop_lat[1]), float(snapshot.stop_lon[1])]
+
+    for bad in ({'to_stop': snapshot.stop_count}, {'from_stop': True}, {'from_stop': None}):
+        assert client.post('/api/routes/walking-path', json={**ref, **bad}).status_code == 400
@@ -0,0 +1,39 @@
+"""
+Test warm-up and readiness
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import create_app
+from app.services.warmup_service import WarmupService, warmup_service
+
+
+def test_warmup_runs_every_stage_once():
+    service = WarmupService()
+    assert not service.ready
+
+    timings = service.run()
+    stages = [name for name, _ in service._stages()]
+    assert list(timings) == stages + ['total']
+    assert timings['total'] >= max(timings[name] for name in stages)
+    assert service.ready and service.status()['state'] == 'ready'
+
+    assert service.run() is timings     # already warm: nothing runs again
+
+
+def test_ready_endpoint(monkeypatch):
+    client = create_app().test_client()
+
+    monkeypatch.setattr(warmup_service, 'state', 'pending')
+    response = client.get('/ready')
+    assert response.status_code == 503
+    assert response.get_json()['ready'] is False
+
+    monkeypatch.setattr(warmup_service, 'state', 'ready')
+    status = client.get('/ready')
+    assert status.status_code == 200
+    assert status.get_json()['ready'] is True
+    assert status.get_json()['network_version']